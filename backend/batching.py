@@ -0,0 +1,127 @@
+"""Regroupement (micro-batching) des requêtes /predict-one.
+
+Les handlers synchrones déposent leur ligne dans une file ; un thread
+dispatcher attend quelques millisecondes (ou jusqu'à ``max_batch`` lignes),
+score le tout en une seule matrice puis résout le futur de chaque appelant
+avec sa propre probabilité.
+
+Un appelant qui abandonne (client déconnecté, délai dépassé) annule son futur :
+la ligne est écartée au moment où le dispatcher la retire de la file, et une
+erreur de livraison sur un futur ne peut pas arrêter le thread.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Mapping, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    def __init__(self, score_fn: Callable[[Sequence[Mapping]], np.ndarray],
+                 max_batch: int = 32, max_wait_ms: float = 2.0):
+        if max_batch < 1:
+            raise ValueError("max_batch doit être >= 1")
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        # compteurs simples (taille moyenne des lots = rows / batches)
+        self.batches = 0
+        self.rows = 0
+
+    def start(self) -> "MicroBatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = 5.0):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def alive(self) -> bool:
+        """Le thread dispatcher tourne (sinon aucun futur soumis ne serait résolu)."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, row: Mapping) -> Future:
+        fut: Future = Future()
+        self._queue.put((row, fut))
+        return fut
+
+    def score(self, row: Mapping, timeout: float | None = 30.0) -> float:
+        """Bloque jusqu'au score du lot contenant ``row`` et renvoie sa probabilité."""
+        return self.submit(row).result(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = self._take([], item)
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                self._take(batch, item)
+            self._dispatch(batch)
+
+        # résout ce qui reste en file pour ne bloquer aucun appelant
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._take(pending, item)
+        self._dispatch(pending)
+
+    @staticmethod
+    def _take(batch: list, item) -> list:
+        """Ajoute ``item`` au lot, sauf si l'appelant a déjà annulé son futur."""
+        if item[1].set_running_or_notify_cancel():
+            batch.append(item)
+        return batch
+
+    def _dispatch(self, batch):
+        if not batch:
+            return
+        rows = [row for row, _ in batch]
+        try:
+            probs = self.score_fn(rows)
+        except Exception as e:
+            for _, fut in batch:
+                _deliver(fut.set_exception, e)
+            return
+        self.batches += 1
+        self.rows += len(rows)
+        for (_, fut), prob in zip(batch, probs):
+            _deliver(fut.set_result, float(prob))
+
+
+def _deliver(setter, value):
+    # un futur déjà résolu ne doit pas faire tomber le dispatcher (les autres appelants attendent)
+    try:
+        setter(value)
+    except Exception:
+        logger.exception("Résultat du micro-batcher non livré")
@@ -0,0 +1,249 @@
+"""Scoring par table de cellules catégorielles (mode accéléré optionnel).
+
+Les six catégorielles du modèle ne forment qu'une grille finie de
+combinaisons (192 avec les vocabulaires actuels). Au chargement du modèle,
+chaque cellule de la grille est pré-évaluée une fois :
+
+- estimateur linéaire (LogisticRegression, LinearDiscriminantAnalysis) :
+  contribution des catégorielles + intercept, un flottant par cellule ;
+- arbres (XGBoost gbtree, DecisionTree, RandomForest, ExtraTrees, et leur
+  forme ``MappedTrees``) : chaque
+  arbre est élagué de ses splits catégoriels, déjà tranchés dans la cellule.
+  Les arbres devenus constants sont sommés dans un biais par cellule, les
+  autres ne gardent que des splits sur les numériques standardisées.
+
+Une ligne se score alors avec ses numériques standardisées et un index de
+cellule, sans reconstruire le vecteur one-hot. Pour les arbres, le gain vaut
+pour les petits lots (/predict-one, micro-batchs) : au-delà de
+``max_tree_rows`` lignes, l'estimateur natif est appelé. Les estimateurs non couverts
+lèvent ``UnsupportedPipeline`` (repli sur ``FastScorer``). Les lignes hors
+grille, par exemple une catégorie inconnue ignorée par l'encodeur, passent
+par le chemin ``FastScorer`` hérité. L'exactitude se vérifie comme pour le
+moteur rapide avec ``parity_gap``.
+"""
+from __future__ import annotations
+
+from itertools import product
+from typing import Mapping
+
+import numpy as np
+from scipy.special import expit
+
+from .fast_scoring import FastScorer, UnsupportedPipeline
+from .mapped_trees import SKLEARN_TREES, MappedTrees, map_estimator
+
+
+class CellTableScorer(FastScorer):
+    """``FastScorer`` dont les catégorielles sont résolues par table de cellules."""
+
+    kind = "cell_table"
+    # arbres: au-delà, l'estimateur natif (C) reste plus rapide que le parcours NumPy
+    max_tree_rows = 32
+
+    def __init__(self, pipeline):
+        super().__init__(pipeline)
+        if not self.cat_specs:
+            raise UnsupportedPipeline("aucune variable catégorielle à tabuler")
+        self._radix = np.array([len(cats) for _, cats, _, _ in self.cat_specs], dtype=np.intp)
+        self._stride = np.concatenate([np.cumprod(self._radix[::-1])[::-1][1:], [1]]).astype(np.intp)
+        self.n_cells = int(np.prod(self._radix))
+        # index de catégorie par valeur (chemin unitaire)
+        self._cat_index = [(col, {str(c): k for k, c in enumerate(cats)}) for col, cats, _, _ in self.cat_specs]
+
+        # partie catégorielle du vecteur de features de chaque cellule
+        templates = np.zeros((self.n_cells, self.n_features))
+        for cell, combo in enumerate(product(*[range(r) for r in self._radix])):
+            for (_, _, positions, _), k in zip(self.cat_specs, combo):
+                if positions[k] >= 0:
+                    templates[cell, positions[k]] = 1.0
+
+        est = self.estimator
+        name = type(est).__name__
+        if name in ("LogisticRegression", "LinearDiscriminantAnalysis"):
+            self._build_linear(templates)
+        elif isinstance(est, MappedTrees):
+            self._build_trees(templates, *est.tree_dicts())
+        elif name == "XGBClassifier" or name in SKLEARN_TREES:
+            # même extraction que la projection mmap: une seule lecture des noeuds et de la marge de base
+            self._build_trees(templates, *map_estimator(est, keep_native=False).tree_dicts())
+        else:
+            raise UnsupportedPipeline(f"estimateur non tabulable: {name}")
+
+    # -----------------------------
+    # Construction
+    # -----------------------------
+    def _build_linear(self, templates: np.ndarray):
+        est = self.estimator
+        coef = np.asarray(est.coef_, dtype=float)
+        if coef.shape[0] != 1:
+            raise UnsupportedPipeline("estimateur linéaire binaire attendu")
+        if type(est).__name__ == "LogisticRegression" and getattr(est, "multi_class", "auto") == "multinomial":
+            raise UnsupportedPipeline("LogisticRegression multinomiale non supportée")
+        w = coef[0]
+        self.mode = "linear"
+        self._w_num = w[self._num_pos]
+        self._cell_margin = templates @ w + float(np.ravel(est.intercept_)[0])
+
+    def _build_trees(self, templates: np.ndarray, trees: list[dict], combine: str, base: float, strict: bool):
+        """Élague chaque arbre pour chaque cellule; les sous-arbres identiques sont partagés.
+
+        ``trees``: dicts de tableaux (feature, threshold, left, right, value), feature -1 = feuille.
+        ``strict``: split ``x < seuil`` (XGBoost) plutôt que ``x <= seuil`` (sklearn).
+        """
+        num_index = {int(p): j for j, p in enumerate(self._num_pos)}
+        feat, thr, left, right, value, depth = [], [], [], [], [], []
+
+        def add(f, t, l, r, v, d) -> int:
+            feat.append(f); thr.append(t); left.append(l); right.append(r); value.append(v); depth.append(d)
+            return len(feat) - 1
+
+        def prune(tree: dict, node: int, cell_x: np.ndarray, memo: dict) -> int:
+            f = int(tree["feature"][node])
+            if f < 0:
+                key = ("leaf", node)
+                if key not in memo:
+                    i = len(feat)
+                    memo[key] = add(0, 0.0, i, i, float(tree["value"][node]), 0)
+                return memo[key]
+            t = tree["threshold"][node]
+            if f not in num_index:
+                # split catégoriel: tranché par la cellule (comparaison en float32, comme l'estimateur)
+                x = np.float32(cell_x[f])
+                go_left = x < t if strict else x <= t
+                return prune(tree, int(tree["left"][node] if go_left else tree["right"][node]), cell_x, memo)
+            l = prune(tree, int(tree["left"][node]), cell_x, memo)
+            r = prune(tree, int(tree["right"][node]), cell_x, memo)
+            key = (node, l, r)
+            if key not in memo:
+                memo[key] = add(num_index[f], t, l, r, 0.0, 1 + max(depth[l], depth[r]))
+            return memo[key]
+
+        roots = np.empty((self.n_cells, len(trees)), dtype=np.intp)
+        for k, tree in enumerate(trees):
+            split = tree["feature"] >= 0
+            used = sorted({int(f) for f in tree["feature"][split] if int(f) not in num_index})
+            memo: dict = {}
+            by_signature: dict[tuple, int] = {}
+            for cell in range(self.n_cells):
+                # deux cellules d'accord sur les features de l'arbre partagent le même élagage
+                signature = tuple(templates[cell, used])
+                if signature not in by_signature:
+                    by_signature[signature] = prune(tree, 0, templates[cell], memo)
+                roots[cell, k] = by_signature[signature]
+
+        self.mode = "trees"
+        self._combine, self._strict = combine, strict
+        self._feat = np.asarray(feat, dtype=np.intp)
+        self._thr = np.asarray(thr, dtype=np.float32 if strict else np.float64)
+        self._left = np.asarray(left, dtype=np.intp)
+        self._right = np.asarray(right, dtype=np.intp)
+        self._value = np.asarray(value, dtype=float)
+        node_depth = np.asarray(depth, dtype=np.intp)
+        self._n_trees = len(trees)
+        # arbres constants dans la cellule -> biais; seuls les autres sont parcourus
+        leaf = node_depth[roots] == 0
+        self._cell_bias = base + np.where(leaf, self._value[roots], 0.0).sum(axis=1)
+        self._cell_roots = [r[~l] for r, l in zip(roots, leaf)]
+        self._cell_depth = np.array([node_depth[r].max(initial=0) for r in self._cell_roots], dtype=np.intp)
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    def _scaled(self, num: np.ndarray) -> np.ndarray:
+        z = (num - self._num_mean) / self._num_scale
+        # les arbres comparent des features float32 (XGBoost et sklearn convertissent X)
+        return z.astype(np.float32) if self.mode == "trees" else z
+
+    def _proba(self, margin: np.ndarray) -> np.ndarray:
+        if self.mode == "linear" or self._combine == "logistic":
+            return expit(margin)
+        return margin / self._n_trees  # moyenne des probabilités des arbres
+
+    def _tree_sum(self, cell: int, z: np.ndarray) -> np.ndarray:
+        """Somme des feuilles atteintes par les lignes ``z`` (n, numériques) dans ``cell``."""
+        idx = np.broadcast_to(self._cell_roots[cell], (len(z), len(self._cell_roots[cell]))).copy()
+        rows = np.arange(len(z))[:, None]
+        for _ in range(self._cell_depth[cell]):
+            x = z[rows, self._feat[idx]]
+            t = self._thr[idx]
+            idx = np.where(x < t if self._strict else x <= t, self._left[idx], self._right[idx])
+        return self._value[idx].sum(axis=1)
+
+    def _margins(self, cells: np.ndarray, z: np.ndarray) -> np.ndarray:
+        if self.mode == "linear":
+            return self._cell_margin[cells] + z @ self._w_num
+        margin = self._cell_bias[cells].copy()
+        order = np.argsort(cells, kind="stable")
+        bounds = np.flatnonzero(np.diff(cells[order])) + 1
+        for group in np.split(order, bounds):
+            if len(group):
+                margin[group] += self._tree_sum(int(cells[group[0]]), z[group])
+        return margin
+
+    def predict_proba_one(self, row: Mapping) -> float:
+        cell = 0
+        for (col, index), stride in zip(self._cat_index, self._stride):
+            k = index.get(str(row[col]))
+            if k is None:
+                return super().predict_proba_one(row)
+            cell += k * stride
+        num = np.array([float(row[c]) for c in self.num_columns])
+        return float(self._proba(self._margins(np.array([cell]), self._scaled(num)[None, :]))[0])
+
+    def predict_proba_frame(self, df) -> np.ndarray:
+        first = self.num_columns[0] if self.num_columns else self.cat_specs[0][0]
+        n = len(df[first])
+        if self.mode == "trees" and n > self.max_tree_rows:
+            return super().predict_proba_frame(df)
+        cells = np.zeros(n, dtype=np.intp)
+        known = np.ones(n, dtype=bool)
+        for (col, cats, _, _), stride in zip(self.cat_specs, self._stride):
+            column = df[col]
+            cats_str = cats.astype(str)
+            if hasattr(column, "cat"):
+                labels = np.asarray(column.cat.categories).astype(str)
+                k = np.minimum(np.searchsorted(cats_str, labels), len(cats_str) - 1)
+                k = np.where(cats_str[k] == labels, k, -1)
+                codes = column.cat.codes.to_numpy()
+                k = np.where(codes >= 0, k[codes], -1)
+            else:
+                values = np.asarray(column).astype(str)
+                k = np.minimum(np.searchsorted(cats_str, values), len(cats_str) - 1)
+                k = np.where(cats_str[k] == values, k, -1)
+            known &= k >= 0
+            cells += np.maximum(k, 0) * stride
+        probs = np.empty(n)
+        if not known.all():
+            # hors grille (catégorie inconnue): chemin one-hot complet
+            probs[~known] = super().predict_proba_frame(_take(df, ~known))
+        if known.any():
+            num = np.column_stack([np.asarray(df[c], dtype=float)[known] for c in self.num_columns])
+            probs[known] = self._proba(self._margins(cells[known], self._scaled(num)))
+        return probs
+
+
+def _take(df, mask: np.ndarray):
+    if hasattr(df, "loc"):
+        return df.loc[mask]
+    return {c: np.asarray(v)[mask] for c, v in df.items()}
+
+
+if __name__ == "__main__":
+    # Vérification d'exactitude : python -m backend.cell_table
+    import sys
+    import time
+
+    import joblib
+    import pandas as pd
+
+    from .fast_scoring import parity_gap
+    from .main import MODEL_PATH, TRAIN_DATA_PATH, PARITY_TOLERANCE
+
+    pipeline = joblib.load(MODEL_PATH)
+    t0 = time.perf_counter()
+    scorer = CellTableScorer(pipeline)
+    print(f"{scorer.n_cells} cellules ({scorer.mode}) construites en {time.perf_counter() - t0:.2f}s")
+    data = pd.read_csv(TRAIN_DATA_PATH)
+    gap = parity_gap(scorer, pipeline, data)
+    print(f"{len(data)} lignes, écart max de probabilité: {gap:.3e}")
+    sys.exit(0 if gap <= PARITY_TOLERANCE else 1)
@@ -0,0 +1,174 @@
+"""Log de prédictions columnaire (Parquet), partitionné par jour.
+
+Chaque flush du LogSink écrit un segment Parquet typé et horodaté dans
+``<root>/date=AAAA-MM-JJ/``. Les noms de segments sont uniques (horloge + pid),
+donc plusieurs workers écrivent sans verrou ; un segment n'apparaît qu'une fois
+complet (écriture dans un fichier temporaire puis ``os.replace``).
+
+Les requêtes ne lisent que les partitions du jour couvertes par la fenêtre
+demandée et que les colonnes nécessaires. Les lignes migrées depuis l'ancien
+CSV (sans horodatage) vivent dans ``<root>/legacy/`` et ne sont incluses que
+dans les requêtes sans borne temporelle.
+"""
+from __future__ import annotations
+
+import io
+import itertools
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Mapping
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .lazy import lazy_import
+from .log_sink import file_lock
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP = "timestamp"
+LEGACY_DIR = "legacy"
+_TS_TYPE = pa.timestamp("us", tz="UTC")
+
+
+def _utc(dt: datetime | None) -> datetime | None:
+    """``dt`` en UTC (les partitions ``date=`` sont des jours UTC); une date naïve est lue comme UTC."""
+    if dt is None:
+        return dt
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class ColumnarLog:
+    """``types``: colonne -> alias de type Arrow (``"string"``, ``"double"``, ``"int64"``...)."""
+
+    def __init__(self, root: Path, types: Mapping[str, str]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.schema = pa.schema([(c, pa.type_for_alias(t)) for c, t in types.items()] + [(TIMESTAMP, _TS_TYPE)])
+        self._seq = itertools.count()
+
+    # -----------------------------
+    # Écriture
+    # -----------------------------
+    def append(self, records: list[Mapping]) -> None:
+        """Écrit ``records`` (un segment par jour touché). Writer du LogSink."""
+        now = datetime.now(timezone.utc)
+        by_day: dict[date, list[Mapping]] = {}
+        for r in records:
+            ts = _utc(r.get(TIMESTAMP)) or now
+            by_day.setdefault(ts.date(), []).append({**r, TIMESTAMP: ts})
+        for day, rows in by_day.items():
+            self._write_segment(self.root / f"date={day.isoformat()}", self._table(rows))
+
+    def _table(self, rows: list[Mapping]) -> pa.Table:
+        return pa.table({f.name: pa.array([r.get(f.name) for r in rows], type=f.type) for f in self.schema},
+                        schema=self.schema)
+
+    def _write_segment(self, partition: Path, table: pa.Table, prefix: str = "part") -> Path:
+        partition.mkdir(parents=True, exist_ok=True)
+        name = f"{prefix}-{time.time_ns()}-{os.getpid()}-{next(self._seq)}.parquet"
+        tmp = partition / f".{name}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, partition / name)
+        return partition / name
+
+    # -----------------------------
+    # Lecture
+    # -----------------------------
+    def partitions(self, start: datetime | None = None, end: datetime | None = None) -> list[Path]:
+        start, end = _utc(start), _utc(end)
+        parts = []
+        legacy = self.root / LEGACY_DIR
+        if start is None and end is None and legacy.is_dir():
+            parts.append(legacy)  # lignes les plus anciennes en premier
+        for p in sorted(self.root.iterdir()):
+            if p.is_dir() and p.name.startswith("date="):
+                day = date.fromisoformat(p.name[5:])
+                if (start is None or day >= start.date()) and (end is None or day <= end.date()):
+                    parts.append(p)
+        return parts
+
+    def segments(self, start: datetime | None = None, end: datetime | None = None) -> list[Path]:
+        return [f for p in self.partitions(start, end) for f in sorted(p.glob("*.parquet"))]
+
+    def query(self, start: datetime | None = None, end: datetime | None = None,
+              columns: list[str] | None = None) -> pd.DataFrame:
+        """Lignes dont l'horodatage est dans ``[start, end)``, restreintes à ``columns``."""
+        start, end = _utc(start), _utc(end)
+        columns = list(columns) if columns else self.schema.names
+        read_cols = columns if (start is None and end is None) or TIMESTAMP in columns else columns + [TIMESTAMP]
+        files = self.segments(start, end)
+        if not files:
+            return pd.DataFrame({c: pd.Series(dtype=object) for c in columns})
+        table = pa.concat_tables([pq.read_table(f, columns=read_cols, schema=self.schema) for f in files])
+        if start is not None:
+            table = table.filter(pc.greater_equal(table[TIMESTAMP], pa.scalar(start, _TS_TYPE)))
+        if end is not None:
+            table = table.filter(pc.less(table[TIMESTAMP], pa.scalar(end, _TS_TYPE)))
+        return table.select(columns).to_pandas()
+
+    # -----------------------------
+    # Maintenance
+    # -----------------------------
+    def migrate_csv(self, csv_path: Path) -> int:
+        """Importe (une fois) les lignes de l'ancien CSV dans ``legacy/``. Renvoie le nombre de lignes.
+
+        L'offset migré est mémorisé : si un worker encore en mode CSV a ajouté
+        des lignes depuis, seules celles-ci sont importées au prochain démarrage.
+        """
+        csv_path = Path(csv_path)
+        marker = self.root / "_csv_migrated.json"
+        with file_lock(self.root / ".migrate.lock"):
+            offset = json.loads(marker.read_text())["offset"] if marker.exists() else 0
+            if not csv_path.exists() or csv_path.stat().st_size <= offset:
+                return 0
+            with open(csv_path, "rb") as f:
+                header = f.readline()
+                f.seek(offset)
+                chunk = f.read()
+            chunk = chunk[: chunk.rfind(b"\n") + 1]
+            consumed = len(chunk)
+            if offset > 0:
+                chunk = header + chunk
+            strings = [f.name for f in self.schema if pa.types.is_string(f.type)]
+            df = pd.read_csv(io.BytesIO(chunk), dtype={c: str for c in strings})
+            n = len(df)
+            if n:
+                df = df.reindex(columns=self.schema.names)
+                df[TIMESTAMP] = pd.Series(pd.NaT, index=df.index, dtype="datetime64[us, UTC]")
+                self._write_segment(self.root / LEGACY_DIR,
+                                    pa.Table.from_pandas(df, schema=self.schema, preserve_index=False), "csv")
+            marker.write_text(json.dumps({"offset": offset + consumed}))
+        logger.info("%d lignes migrées depuis %s", n, csv_path.name)
+        return n
+
+    def compact(self, before: date | None = None) -> int:
+        """Fusionne les segments des jours clos (< ``before``, aujourd'hui par défaut) en un fichier par jour.
+
+        Un lecteur concurrent peut, pendant l'instant qui sépare l'écriture du
+        fichier fusionné de la suppression des segments, voir des doublons.
+        """
+        before = before or datetime.now(timezone.utc).date()
+        merged = 0
+        with file_lock(self.root / ".compact.lock"):
+            for part in self.partitions():
+                if part.name == LEGACY_DIR or date.fromisoformat(part.name[5:]) >= before:
+                    continue
+                files = sorted(part.glob("*.parquet"))
+                if len(files) < 2:
+                    continue
+                table = pa.concat_tables([pq.read_table(f, schema=self.schema) for f in files])
+                self._write_segment(part, table.sort_by(TIMESTAMP), "compacted")
+                for f in files:
+                    f.unlink()
+                merged += len(files)
+        return merged
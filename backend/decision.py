@@ -0,0 +1,213 @@
+"""Couche de décision : calibrage des probabilités et seuil d'approbation selon les coûts.
+
+À l'entraînement, à partir des probabilités hors fold du modèle retenu :
+
+- ``fit_calibration`` ajuste un calibrateur monotone, ``sigmoid`` (Platt, sur
+  le logit) ou ``isotonic`` ;
+- ``sweep_costs`` balaie en une passe vectorisée tous les seuils utiles (un
+  par score distinct, scores triés une seule fois) pour une grille de ratios
+  de coût. Le coût est ``ratio * faux accords + faux refus``, où le ratio est
+  le coût d'un prêt accordé à tort (défaut) rapporté à celui d'un bon dossier
+  refusé. Chaque ratio reçoit le seuil de coût minimal.
+
+Le résultat est enregistré à côté de l'artefact (``<modèle>.decision.json``),
+sauf si ``decision_issue`` le juge inexploitable : AUC hors fold trop proche
+de 0,5, ou seuil retenu qui accorde ou refuse tous les dossiers.
+À l'inférence, ``DecisionPolicy`` applique le calibrateur à la probabilité
+déjà calculée, puis le seuil : une seule passe ``predict_proba``, pas de
+second ``predict``. Sans fichier, la probabilité est celle du modèle et le
+seuil vaut 0,5, comme ``predict``.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+CALIBRATIONS = ("sigmoid", "isotonic", "none")
+# ratios de coût balayés à l'entraînement (faux accord / faux refus), grille logarithmique
+COST_RATIOS = np.geomspace(0.01, 100, 2001)
+_LOGIT_CLIP = 1e-6  # probabilités bornées avant logit (0 et 1 exacts)
+# AUC hors fold minimale: en dessous, les scores ne classent guère mieux que le hasard
+MIN_OOF_AUC = 0.55
+
+
+# -----------------------------
+# Entraînement
+# -----------------------------
+def _logit(probs: np.ndarray) -> np.ndarray:
+    p = np.clip(np.asarray(probs, dtype=float), _LOGIT_CLIP, 1 - _LOGIT_CLIP)
+    return np.log(p / (1 - p))
+
+
+def fit_calibration(probs: np.ndarray, y: np.ndarray, method: str = "sigmoid") -> dict:
+    """Calibrateur (paramètres JSON) qui ramène ``probs`` aux fréquences observées de ``y``."""
+    if method == "none":
+        return {"method": "none"}
+    if method == "sigmoid":
+        from sklearn.linear_model import LogisticRegression
+
+        lr = LogisticRegression(C=1e6).fit(_logit(probs)[:, None], y)
+        return {"method": "sigmoid", "a": float(lr.coef_[0, 0]), "b": float(lr.intercept_[0])}
+    if method == "isotonic":
+        from sklearn.isotonic import IsotonicRegression
+
+        iso = IsotonicRegression(out_of_bounds="clip", y_min=0.0, y_max=1.0).fit(probs, y)
+        return {"method": "isotonic", "x": iso.X_thresholds_.tolist(), "y": iso.y_thresholds_.tolist()}
+    raise ValueError(f"Calibrage inconnu: {method!r} (attendu: {', '.join(CALIBRATIONS)})")
+
+
+def sweep_costs(probs: np.ndarray, y: np.ndarray, ratios: np.ndarray = COST_RATIOS) -> dict[str, np.ndarray]:
+    """Seuil de coût minimal pour chaque ratio de ``ratios``, en une passe sur les scores triés.
+
+    Accorder les dossiers de score > seuil revient à accorder un préfixe des
+    scores triés par ordre décroissant : les cumuls des vrais et faux accords
+    donnent la matrice des coûts (ratios x seuils) d'un seul calcul. Les seuils
+    candidats sont les milieux entre scores distincts voisins, plus 0 et 1.
+    Renvoie par ratio : seuil, coût moyen par dossier, taux d'accord, rappel
+    et précision des accords.
+    """
+    probs, y = np.asarray(probs, dtype=float), np.asarray(y, dtype=int)
+    order = np.argsort(-probs, kind="stable")
+    scores, labels = probs[order], y[order]
+    ends = np.flatnonzero(np.r_[scores[1:] != scores[:-1], True])  # dernier dossier de chaque score distinct
+    tp = np.r_[0, np.cumsum(labels)[ends]]
+    fp = np.r_[0, np.cumsum(1 - labels)[ends]]
+    distinct = scores[ends]
+    thresholds = np.r_[1.0, (distinct[:-1] + distinct[1:]) / 2, 0.0]  # k scores distincts accordés
+    positives = tp[-1]
+    cost = ratios[:, None] * fp[None, :] + (positives - tp)[None, :]
+    best = cost.argmin(axis=1)
+    approved = tp[best] + fp[best]
+    return {
+        "cost_ratios": np.asarray(ratios, dtype=float),
+        "thresholds": thresholds[best],
+        "expected_cost": cost[np.arange(len(ratios)), best] / len(y),
+        "approval_rate": approved / len(y),
+        "recall": tp[best] / max(positives, 1),
+        "precision": np.divide(tp[best], approved, out=np.ones(len(best)), where=approved > 0),
+    }
+
+
+def fit_decision(probs: np.ndarray, y: np.ndarray, cost_ratio: float = 1.0, method: str = "sigmoid",
+                 ratios: np.ndarray = COST_RATIOS) -> dict:
+    """Calibrateur, balayage des coûts et seuil retenu pour ``cost_ratio`` (dict JSON, cf. ``write_decision``)."""
+    from sklearn.metrics import roc_auc_score
+
+    probs, y = np.asarray(probs, dtype=float), np.asarray(y, dtype=int)
+    calibration = fit_calibration(probs, y, method)
+    calibrated = DecisionPolicy(calibration=calibration).calibrate(probs)
+    table = sweep_costs(calibrated, y, ratios)
+    i = _ratio_index(table, cost_ratio)
+    decision = {
+        "calibration": calibration,
+        "cost_ratio": float(cost_ratio),
+        "threshold": float(table["thresholds"][i]),
+        "approval_rate": float(table["approval_rate"][i]),
+        "oof_rows": int(len(y)),
+        "oof_auc": float(roc_auc_score(y, probs)),
+        "brier": {"raw": float(np.mean((probs - y) ** 2)), "calibrated": float(np.mean((calibrated - y) ** 2))},
+        "sweep": {k: v.tolist() for k, v in table.items()},
+    }
+    return decision
+
+
+def decision_issue(decision: dict) -> str | None:
+    """Raison de ne pas servir ``decision`` (cf. ``fit_decision``), None si elle est exploitable."""
+    if decision["oof_auc"] < MIN_OOF_AUC:
+        return f"AUC hors fold {decision['oof_auc']:.3f} < {MIN_OOF_AUC:g}: scores proches du hasard"
+    if decision["approval_rate"] in (0.0, 1.0):
+        verdict = "accorde" if decision["approval_rate"] == 1.0 else "refuse"
+        return f"le seuil {decision['threshold']:.4f} {verdict} tous les dossiers hors fold"
+    return None
+
+
+def _ratio_index(table: dict, cost_ratio: float) -> int:
+    """Indice du ratio de la grille le plus proche de ``cost_ratio`` en échelle log."""
+    ratios = np.asarray(table["cost_ratios"], dtype=float)
+    if not ratios[0] <= cost_ratio <= ratios[-1]:
+        raise ValueError(f"Ratio de coût {cost_ratio} hors de la grille [{ratios[0]:g}, {ratios[-1]:g}]")
+    return int(np.argmin(np.abs(np.log(ratios / cost_ratio))))
+
+
+def threshold_for(table: dict, cost_ratio: float) -> float:
+    """Seuil du balayage pour ``cost_ratio`` (ratio de la grille le plus proche en échelle log)."""
+    return float(np.asarray(table["thresholds"])[_ratio_index(table, cost_ratio)])
+
+
+# -----------------------------
+# Fichier à côté de l'artefact
+# -----------------------------
+def decision_path(model_path: Path) -> Path:
+    return Path(model_path).with_suffix(".decision.json")
+
+
+def write_decision(model_path: Path, decision: dict) -> Path:
+    """Écrit ``decision`` (cf. ``fit_decision``) à côté de ``model_path`` (remplacement atomique)."""
+    path = decision_path(model_path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp.write_text(json.dumps(decision), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def remove_decision(model_path: Path):
+    """Supprime la couche de décision d'un export précédent de ``model_path`` (seuil 0,5 à nouveau)."""
+    decision_path(model_path).unlink(missing_ok=True)
+
+
+def read_decision(model_path: Path) -> dict | None:
+    """Couche de décision exportée avec ``model_path``, None s'il n'y en a pas."""
+    try:
+        return json.loads(decision_path(model_path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+# -----------------------------
+# Inférence
+# -----------------------------
+class DecisionPolicy:
+    """Calibrateur et seuil appliqués aux probabilités du modèle (décision: probabilité calibrée > seuil)."""
+
+    def __init__(self, threshold: float = 0.5, calibration: dict | None = None, cost_ratio: float | None = None):
+        self.threshold = float(threshold)
+        self.cost_ratio = cost_ratio
+        self.calibration = calibration or {"method": "none"}
+        method = self.calibration["method"]
+        if method == "sigmoid":
+            self._a, self._b = self.calibration["a"], self.calibration["b"]
+        elif method == "isotonic":
+            self._x, self._y = np.asarray(self.calibration["x"]), np.asarray(self.calibration["y"])
+        elif method != "none":
+            raise ValueError(f"Calibrage inconnu: {method!r}")
+        self.method = method
+
+    @classmethod
+    def load(cls, model_path: Path, cost_ratio: float | None = None) -> "DecisionPolicy":
+        """Politique exportée avec ``model_path``; ``cost_ratio`` reprend le seuil du balayage pour ce ratio."""
+        return cls.from_dict(read_decision(model_path), cost_ratio)
+
+    @classmethod
+    def from_dict(cls, decision: dict | None, cost_ratio: float | None = None) -> "DecisionPolicy":
+        """Politique d'un résultat de ``fit_decision`` (None: probabilités brutes, seuil 0,5)."""
+        if decision is None:
+            return cls()
+        if cost_ratio is None:
+            return cls(decision["threshold"], decision["calibration"], decision["cost_ratio"])
+        return cls(threshold_for(decision["sweep"], cost_ratio), decision["calibration"], cost_ratio)
+
+    def calibrate(self, probs):
+        """Probabilités calibrées (un flottant ou un tableau, même calcul dans les deux cas)."""
+        if self.method == "none":
+            return probs
+        if self.method == "sigmoid":
+            out = 1.0 / (1.0 + np.exp(-(self._a * _logit(probs) + self._b)))
+        else:
+            out = np.interp(probs, self._x, self._y)
+        return float(out) if np.ndim(out) == 0 else out
+
+    def info(self) -> dict:
+        return {"threshold": self.threshold, "calibration": self.method, "cost_ratio": self.cost_ratio}
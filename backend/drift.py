@@ -0,0 +1,337 @@
+"""Dérive du trafic par rapport aux données d'entraînement (/drift).
+
+Le profil de référence est calculé à l'export ou à la publication d'un modèle
+et enregistré à côté de l'artefact (``<modèle>.drift.json``) :
+
+- variables numériques : bornes des déciles d'entraînement et part de chaque
+  classe ;
+- variables catégorielles : part de chaque modalité ;
+- probabilité prédite : 20 classes de largeur 0,05, parts calculées sur les
+  données d'entraînement.
+
+Chaque variable a en plus une classe « hors référence » : valeur manquante,
+ou modalité inconnue à l'entraînement.
+
+``DriftMonitor`` est alimenté par le même appel que le log de prédictions. Il
+ne garde que des compteurs par classe, dans un anneau de ``buckets`` tranches
+de temps qui couvrent la fenêtre glissante. La mémoire est donc fixe, une
+requête coûte O(variables) et le log n'est jamais relu. Sur la fenêtre, chaque
+variable reçoit :
+
+- un PSI (population stability index) ;
+- un score de type KS : écart maximal entre fonctions de répartition aux
+  bornes des classes pour les numériques et la probabilité, distance en
+  variation totale pour les catégorielles.
+
+Les compteurs sont propres à chaque worker : avec ``backend.serve``, chaque
+worker observe un échantillon du trafic.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Mapping
+
+import numpy as np
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+PROFILE_BINS = 10  # déciles d'entraînement par variable numérique
+PROBABILITY_EDGES = np.linspace(0, 1, 21)[1:-1]  # bornes intérieures, pas de 0.05 comme /stats
+PSI_FLOOR = 1e-4  # part minimale d'une classe dans le PSI (évite log(0))
+# seuils usuels du PSI: < 0.1 stable, 0.1-0.25 dérive modérée, au-delà dérive forte
+PSI_WARNING = 0.1
+PSI_ALERT = 0.25
+
+
+# -----------------------------
+# Profil de référence
+# -----------------------------
+def _numeric_profile(values: np.ndarray, edges: np.ndarray | None = None) -> dict:
+    values = np.asarray(values, dtype=float)
+    present = values[~np.isnan(values)]
+    if edges is None:
+        edges = np.unique(np.quantile(present, np.linspace(0, 1, PROFILE_BINS + 1)[1:-1])) if len(present) else []
+    counts = np.bincount(np.searchsorted(edges, present, side="right"), minlength=len(edges) + 1)
+    counts = np.append(counts, len(values) - len(present))
+    return {"edges": [float(e) for e in edges], "reference": (counts / max(len(values), 1)).tolist()}
+
+
+def _categorical_profile(values) -> dict:
+    labels = pd.Series(values).astype(object)
+    missing = labels.isna()
+    shares = labels[~missing].astype(str).value_counts(sort=False).sort_index() / max(len(labels), 1)
+    return {"categories": shares.index.tolist(), "reference": [*shares.tolist(), float(missing.mean())]}
+
+
+def build_profile(reference, probabilities: np.ndarray) -> dict:
+    """Profil de ``reference`` (DataFrame des variables d'entrée) et des probabilités prédites dessus."""
+    features = {}
+    for col in reference.columns:
+        if pd.api.types.is_numeric_dtype(reference[col]) and not pd.api.types.is_bool_dtype(reference[col]):
+            features[col] = {"type": "numeric", **_numeric_profile(reference[col].to_numpy(dtype=float))}
+        else:
+            features[col] = {"type": "categorical", **_categorical_profile(reference[col])}
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "rows": int(len(reference)),
+        "features": features,
+        "probability": {"type": "numeric", **_numeric_profile(probabilities, PROBABILITY_EDGES)},
+    }
+
+
+def profile_path(model_path: Path) -> Path:
+    return Path(model_path).with_suffix(".drift.json")
+
+
+def write_profile(model_path: Path, profile: dict) -> Path:
+    """Écrit ``profile`` à côté de ``model_path`` (remplacement atomique)."""
+    path = profile_path(model_path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp.write_text(json.dumps(profile, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def read_profile(model_path: Path) -> dict | None:
+    """Profil exporté avec ``model_path``, None s'il n'y en a pas (artefact antérieur)."""
+    try:
+        return json.loads(profile_path(model_path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+# -----------------------------
+# Scores
+# -----------------------------
+def psi(reference: np.ndarray, live: np.ndarray) -> float:
+    """PSI entre deux répartitions (parts par classe, plancher ``PSI_FLOOR``)."""
+    q = np.maximum(reference, PSI_FLOOR)
+    p = np.maximum(live, PSI_FLOOR)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+def ks(reference: np.ndarray, live: np.ndarray) -> float:
+    """Écart maximal entre fonctions de répartition aux bornes des classes (classes ordonnées)."""
+    return float(np.max(np.abs(np.cumsum(live) - np.cumsum(reference)), initial=0.0))
+
+
+def tvd(reference: np.ndarray, live: np.ndarray) -> float:
+    """Distance en variation totale (classes non ordonnées)."""
+    return float(np.abs(live - reference).sum() / 2)
+
+
+def drift_status(value: float | None) -> str:
+    if value is None:
+        return "insufficient_data"
+    return "drift" if value >= PSI_ALERT else "warning" if value >= PSI_WARNING else "stable"
+
+
+# -----------------------------
+# Compteurs glissants
+# -----------------------------
+class _Layout:
+    """Classes de toutes les variables d'un profil, à la suite dans un seul vecteur de compteurs."""
+
+    def __init__(self, profile: dict):
+        self.specs = []  # (nom, type, offset, bornes ou index des modalités, nombre de classes)
+        self._edges = {}  # bornes en tableau numpy pour les batchs
+        offset = 0
+        for name, spec in [*profile["features"].items(), ("probability", profile["probability"])]:
+            if spec["type"] == "numeric":
+                key = [float(e) for e in spec["edges"]]
+                self._edges[name] = np.asarray(key)
+            else:
+                key = {c: i for i, c in enumerate(spec["categories"])}
+            size = len(spec["reference"])
+            self.specs.append((name, spec["type"], offset, key, size))
+            offset += size
+        self.size = offset
+        self.signature = tuple((name, kind, tuple(key)) for name, kind, _, key, _ in self.specs)
+        self._indexes = {}  # pd.Index des modalités, construit au premier batch
+
+    def cells_rows(self, rows: list[Mapping], probs) -> list[int]:
+        """Classes touchées par des lignes (dicts), sans numpy ni pandas: le cas de /predict-one."""
+        cells = []
+        for name, kind, offset, key, size in self.specs:
+            values = probs if name == "probability" else [row.get(name) for row in rows]
+            for v in values:
+                if kind == "numeric":
+                    v = math.nan if v is None else float(v)
+                    i = size - 1 if math.isnan(v) else bisect_right(key, v)
+                else:
+                    i = key.get(str(v), size - 1) if v is not None else size - 1
+                cells.append(offset + i)
+        return cells
+
+    def cells_frame(self, df, probs) -> np.ndarray:
+        """Classes touchées par un batch (DataFrame enrichi), une recherche vectorisée par variable."""
+        parts = []
+        for name, kind, offset, key, size in self.specs:
+            if kind == "numeric":
+                values = np.asarray(probs if name == "probability" else df[name], dtype=float)
+                idx = np.where(np.isnan(values), size - 1, np.searchsorted(self._edges[name], values, side="right"))
+            else:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = self._indexes[name] = pd.Index(list(key))
+                col = df[name]
+                if isinstance(col.dtype, pd.CategoricalDtype):
+                    lookup = index.get_indexer(col.cat.categories.astype(str))
+                    codes = col.cat.codes.to_numpy()
+                    idx = np.where(codes >= 0, lookup[codes], -1)
+                else:
+                    idx = index.get_indexer(col.astype(str).where(col.notna(), None))
+                idx = np.where(idx >= 0, idx, size - 1)
+            parts.append(offset + idx)
+        return np.concatenate(parts)
+
+
+class DriftMonitor:
+    """Répartition du trafic sur une fenêtre glissante, comparée au profil du modèle qui l'a scoré.
+
+    La fenêtre de ``window_seconds`` est découpée en ``buckets`` tranches : la
+    plus ancienne est remise à zéro quand le temps la réutilise. Si un nouveau
+    modèle a les mêmes classes (mêmes données d'entraînement), seules les parts
+    de référence changent ; sinon les compteurs repartent de zéro.
+    """
+
+    def __init__(self, window_seconds: float = 3600, buckets: int = 12, min_rows: int = 200):
+        self.window_seconds = float(window_seconds)
+        self.buckets = int(buckets)
+        self.bucket_seconds = self.window_seconds / self.buckets
+        self.min_rows = min_rows
+        self._lock = threading.Lock()
+        self.profile: dict | None = None
+        self._layout: _Layout | None = None
+        self._counts = self._epochs = None
+
+    def _use(self, profile: dict) -> _Layout:
+        with self._lock:
+            if profile is not self.profile:
+                layout = _Layout(profile)
+                if self._layout is None or layout.signature != self._layout.signature:
+                    self._layout = layout
+                    self._counts = np.zeros((self.buckets, layout.size), dtype=np.int64)
+                    self._epochs = np.full(self.buckets, -1, dtype=np.int64)
+                self.profile = profile
+            return self._layout
+
+    def observe(self, data, probs, profile: dict | None, now: float | None = None):
+        """Compte un batch: ``data`` est un DataFrame enrichi ou une liste de lignes (dicts).
+
+        ``profile`` est celui du modèle qui a produit ``probs`` (None: pas de
+        profil, rien n'est compté).
+        """
+        if profile is None:
+            return
+        layout = self._layout if profile is self.profile else self._use(profile)
+        if isinstance(data, list):
+            cells = layout.cells_rows(data, probs)
+        else:
+            cells = np.bincount(layout.cells_frame(data, probs), minlength=layout.size)
+        epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        slot = epoch % self.buckets
+        with self._lock:
+            if layout is not self._layout:
+                return  # classes changées pendant le calcul (nouveau modèle): batch ignoré
+            counts = self._counts[slot]
+            if self._epochs[slot] != epoch:
+                counts[:] = 0
+                self._epochs[slot] = epoch
+            if isinstance(cells, list):
+                for c in cells:
+                    counts[c] += 1
+            else:
+                counts += cells
+
+    def window_counts(self, now: float | None = None) -> tuple[dict | None, _Layout | None, np.ndarray | None]:
+        """(profil, classes, compteurs de la fenêtre), lus ensemble."""
+        epoch = int((time.time() if now is None else now) // self.bucket_seconds)
+        with self._lock:
+            if self._layout is None:
+                return None, None, None
+            return self.profile, self._layout, self._counts[self._epochs > epoch - self.buckets].sum(axis=0)
+
+    def report(self, detail: bool = False, now: float | None = None) -> dict[str, Any]:
+        """Scores par variable sur la fenêtre (``detail``: bornes et parts par classe)."""
+        profile, layout, counts = self.window_counts(now)
+        out = {"window_seconds": self.window_seconds, "rows": 0, "min_rows": self.min_rows,
+               "reference_rows": None, "status": "insufficient_data", "max_psi": None,
+               "features": {}, "probability": None}
+        if counts is None:
+            return out
+        specs = {**profile["features"], "probability": profile["probability"]}
+        for name, kind, offset, _, size in layout.specs:
+            live_counts = counts[offset:offset + size]
+            n = int(live_counts.sum())
+            ref = np.asarray(specs[name]["reference"])
+            entry = {"type": kind, "rows": n, "psi": None, "ks" if kind == "numeric" else "tvd": None}
+            if n:
+                live = live_counts / n
+                entry["psi"] = psi(ref, live)
+                entry["ks" if kind == "numeric" else "tvd"] = ks(ref, live) if kind == "numeric" else tvd(ref, live)
+            entry["status"] = drift_status(entry["psi"] if n >= self.min_rows else None)
+            if detail:
+                entry["edges" if kind == "numeric" else "categories"] = specs[name][
+                    "edges" if kind == "numeric" else "categories"]
+                entry["reference"] = ref.tolist()
+                entry["live"] = (live_counts / n).tolist() if n else None
+            if name == "probability":
+                out["probability"] = entry
+            else:
+                out["features"][name] = entry
+        rows = out["probability"]["rows"]
+        scores = [e["psi"] for e in [*out["features"].values(), out["probability"]] if e["psi"] is not None]
+        out.update(rows=rows, reference_rows=profile["rows"], max_psi=max(scores, default=None),
+                   status=drift_status(max(scores, default=None) if rows >= self.min_rows else None))
+        return out
+
+
+if __name__ == "__main__":
+    # Coût par requête et sensibilité: python -m backend.drift
+    import sys
+
+    from .main import MODEL_PATH, TRAIN_DATA_PATH
+    from .model_registry import load_artifact
+
+    profile = read_profile(MODEL_PATH)
+    if profile is None:
+        sys.exit(f"Pas de profil de dérive pour {MODEL_PATH.name}: python src/model_training.py --export")
+    pipeline = load_artifact(MODEL_PATH, mmap=False)
+    data = pd.read_csv(TRAIN_DATA_PATH).drop(columns="Loan_Status")
+    shifted = data.assign(ApplicantIncome=data["ApplicantIncome"] * 1.3, LoanAmount=data["LoanAmount"] * 1.5,
+                          LoanAmount_log=np.log(data["LoanAmount"] * 1.5), InterestRate=data["InterestRate"] + 1.0)
+
+    for label, frame in [("données d'entraînement", data), ("revenus +30 %, montants +50 %, taux +1 pt", shifted)]:
+        monitor = DriftMonitor()
+        monitor.observe(frame, pipeline.predict_proba(frame)[:, 1], profile)
+        report = monitor.report()
+        print(f"{label}: statut {report['status']}, PSI max {report['max_psi']:.3f}")
+        for name, e in [*report["features"].items(), ("probability", report["probability"])]:
+            print(f"  {name:18s} PSI {e['psi']:7.3f}  {'KS ' if 'ks' in e else 'TVD'} {e.get('ks', e.get('tvd')):.3f}")
+
+    # coût d'une requête /predict-one (liste d'une ligne) avant et après 1 million de lignes observées
+    monitor = DriftMonitor()
+    rows = data.head(1).to_dict(orient="records")
+    big = pd.concat([data] * -(-1_000_000 // len(data)), ignore_index=True)
+    big_probs = np.random.default_rng(0).random(len(big))
+    timings = []
+    for _ in range(2):
+        t0 = time.perf_counter()
+        for _ in range(10_000):
+            monitor.observe(rows, [0.7], profile)
+        timings.append((time.perf_counter() - t0) / 10_000 * 1e6)
+        t0 = time.perf_counter()
+        monitor.observe(big, big_probs, profile)
+        t_batch = time.perf_counter() - t0
+    print(f"observe, 1 ligne: {timings[0]:.1f} µs à vide, {timings[1]:.1f} µs après {2 * len(big)} lignes; "
+          f"batch de {len(big)} lignes: {t_batch:.2f} s ({t_batch / len(big) * 1e6:.2f} µs/ligne)")
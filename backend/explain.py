@@ -0,0 +1,135 @@
+"""Contributions par feature pour des batchs entiers (/explain-batch, ``?explain=true``).
+
+Calculées en une passe vectorisée sur la matrice encodée, sans perturber les
+lignes une à une :
+
+- linéaire (LogisticRegression, LinearDiscriminantAnalysis) : ``w_j * x_j``,
+  exact. Une numérique compte par rapport à sa moyenne d'entraînement (elle
+  est standardisée), une catégorielle par rapport à sa modalité de référence
+  (colonne supprimée par le OneHotEncoder) ;
+- arbres (XGBoost, forêts, ``MappedTrees``) : contributions le long du chemin
+  de décision (méthode de Saabas), via ``approx_contribs`` de XGBoost pour un
+  booster natif, ``MappedTrees.contributions`` sinon.
+
+Les colonnes one-hot sont regroupées par variable d'entrée. Pour chaque ligne,
+``base_value + somme des contributions`` redonne la sortie du modèle, en
+log-odds (linéaire, XGBoost) ou en probabilité (forêts sklearn) : voir
+``Explainer.output``.
+
+Avec une couche de décision (``backend.decision``), l'explication suit la
+probabilité calibrée servie par l'API. Un calibrateur ``sigmoid`` est affine
+en log-odds : les contributions sont multipliées par sa pente et son
+intercept s'ajoute à ``base_value``. Un calibrateur non linéaire
+(``isotonic``), ou une sortie en probabilité, ne se décompose pas ainsi :
+l'explication reste celle du modèle et ``output`` est préfixé par
+``uncalibrated_``.
+"""
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+from .decision import DecisionPolicy
+from .fast_scoring import FastScorer, UnsupportedPipeline
+from .mapped_trees import MappedTrees, map_estimator
+
+LINEAR = ("LogisticRegression", "LinearDiscriminantAnalysis")
+
+
+class Explainer(FastScorer):
+    """Reprend l'encodage de ``FastScorer`` et décompose la sortie de l'estimateur par variable d'entrée."""
+
+    kind = "explain"
+
+    def __init__(self, pipeline, decision: DecisionPolicy | None = None):
+        super().__init__(pipeline)
+        est = self.estimator
+        name = type(est).__name__
+        self.features = [*self.num_columns, *(col for col, _, _, _ in self.cat_specs)]
+        # colonne encodée -> variable d'entrée
+        self._groups = np.zeros((self.n_features, len(self.features)))
+        self._groups[self._num_pos, np.arange(len(self.num_columns))] = 1.0
+        for i, (_, _, positions, _) in enumerate(self.cat_specs, start=len(self.num_columns)):
+            self._groups[positions[positions >= 0], i] = 1.0
+
+        self._coef = self._booster = self._trees = None
+        if name in LINEAR:
+            coef = np.atleast_2d(est.coef_)
+            if coef.shape[0] != 1:
+                raise UnsupportedPipeline("estimateur linéaire binaire attendu")
+            self._coef, self._intercept = coef[0], float(np.ravel(est.intercept_)[0])
+            self.output = "log_odds"
+        elif name == "XGBClassifier":
+            self._booster = est.get_booster()
+            objective = json.loads(self._booster.save_config())["learner"]["objective"]["name"]
+            if objective != "binary:logistic":
+                raise UnsupportedPipeline(f"XGBoost: objectif non supporté: {objective}")
+            best = getattr(est, "best_iteration", None)
+            self._iteration_range = (0, best + 1) if best is not None else (0, 0)
+            self.output = "log_odds"
+        else:
+            self._trees = est if isinstance(est, MappedTrees) else map_estimator(est, keep_native=False)
+            self.output = "log_odds" if self._trees.combine == "logistic" else "probability"
+
+        # calibrateur de la couche de décision replié dans la décomposition s'il est affine en log-odds
+        self._scale, self._shift = 1.0, 0.0
+        method = decision.method if decision is not None else "none"
+        if method == "sigmoid" and self.output == "log_odds":
+            self._scale, self._shift = decision.calibration["a"], decision.calibration["b"]
+        elif method != "none":
+            self.output = f"uncalibrated_{self.output}"
+
+    def contributions(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(valeur de base par ligne, contributions lignes x ``features``) pour une matrice encodée."""
+        if self._coef is not None:
+            base, contrib = np.full(len(X), self._intercept), X * self._coef
+        elif self._booster is not None:
+            from xgboost import DMatrix
+
+            out = self._booster.predict(DMatrix(X), pred_contribs=True, approx_contribs=True,
+                                        iteration_range=self._iteration_range).astype(np.float64)
+            base, contrib = out[:, -1], out[:, :-1]
+        else:
+            bias, contrib = self._trees.contributions(X)
+            base = np.full(len(X), bias)
+        return self._scale * base + self._shift, self._scale * (contrib @ self._groups)
+
+    def explain_frame(self, df) -> tuple[np.ndarray, np.ndarray]:
+        """Comme ``contributions``, pour un DataFrame enrichi (ou un dict de colonnes)."""
+        return self.contributions(self.encode_frame(df))
+
+
+if __name__ == "__main__":
+    # Additivité et coût : python -m backend.explain
+    import sys
+    import time
+
+    import joblib
+    import pandas as pd
+    from scipy.special import expit
+
+    from .main import MODEL_PATH, TRAIN_DATA_PATH
+
+    pipeline = joblib.load(MODEL_PATH)
+    policy = DecisionPolicy.load(MODEL_PATH)
+    explainer = Explainer(pipeline, policy)
+    data = pd.read_csv(TRAIN_DATA_PATH)
+    base, contrib = explainer.explain_frame(data)
+    output = base + contrib.sum(axis=1)
+    prob = expit(output) if explainer.output.endswith("log_odds") else output
+    served = pipeline.predict_proba(data)[:, 1]
+    if not explainer.output.startswith("uncalibrated_"):
+        served = policy.calibrate(served)
+    gap = float(np.max(np.abs(prob - served), initial=0.0))
+    print(f"{len(data)} lignes, sortie {explainer.output}, écart max base + contributions / probabilité: {gap:.3e}")
+
+    big = pd.concat([data] * -(-100_000 // len(data)), ignore_index=True)
+    t0 = time.perf_counter()
+    pipeline.predict_proba(big)
+    t_score = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    explainer.explain_frame(big)
+    t_explain = time.perf_counter() - t0
+    print(f"{len(big)} lignes: scoring {t_score:.2f}s, explication {t_explain:.2f}s")
+    sys.exit(0 if gap <= 1e-5 else 1)
@@ -0,0 +1,223 @@
+"""Moteur de scoring compilé (sans pandas) pour le chemin /predict-one.
+
+Le pipeline servi (ColumnTransformer -> [SMOTE ->] estimateur) est
+« déplié » une seule fois au démarrage : moyennes/écarts du StandardScaler,
+catégories du OneHotEncoder et estimateur final. Un client validé est ensuite
+écrit directement dans un vecteur NumPy préalloué, puis scoré avec un seul
+appel à ``predict_proba``.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from typing import Mapping
+
+import numpy as np
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+
+class UnsupportedPipeline(ValueError):
+    """Le pipeline contient une étape que le moteur rapide ne sait pas reproduire."""
+
+
+class FastScorer:
+    """Reproduit ``pipeline.predict_proba`` sur des lignes déjà validées."""
+
+    kind = "compiled"
+
+    def __init__(self, pipeline):
+        steps = list(getattr(pipeline, "steps", []))
+        if len(steps) < 2:
+            raise UnsupportedPipeline("pipeline attendu: préprocesseur -> ... -> estimateur")
+
+        preprocessor = steps[0][1]
+        # Les samplers (SMOTE...) ne font rien à l'inférence : on les ignore.
+        for name, step in steps[1:-1]:
+            if not hasattr(step, "fit_resample"):
+                raise UnsupportedPipeline(f"étape intermédiaire non supportée: {name}")
+
+        self.estimator = steps[-1][1]
+        if not hasattr(self.estimator, "predict_proba"):
+            raise UnsupportedPipeline("l'estimateur final n'expose pas predict_proba")
+        self.classes_ = np.asarray(self.estimator.classes_)
+        if len(self.classes_) != 2:
+            raise UnsupportedPipeline("classification binaire attendue")
+
+        self.num_columns: list[str] = []
+        num_mean: list[float] = []
+        num_scale: list[float] = []
+        num_pos: list[int] = []
+        # (colonne, catégories triées, position de sortie par catégorie ou -1, inconnue -> erreur ?)
+        self.cat_specs: list[tuple[str, np.ndarray, np.ndarray, bool]] = []
+
+        offset = 0
+        for name, trans, cols in getattr(preprocessor, "transformers_", []):
+            if trans == "drop" or len(cols) == 0:
+                continue
+            if isinstance(trans, StandardScaler):
+                mean = trans.mean_ if trans.mean_ is not None else np.zeros(len(cols))
+                scale = trans.scale_ if trans.scale_ is not None else np.ones(len(cols))
+                for i, col in enumerate(cols):
+                    self.num_columns.append(col)
+                    num_mean.append(float(mean[i]))
+                    num_scale.append(float(scale[i]))
+                    num_pos.append(offset + i)
+                offset += len(cols)
+            elif isinstance(trans, OneHotEncoder):
+                if any(c is not None for c in (getattr(trans, "infrequent_categories_", None) or [])):
+                    raise UnsupportedPipeline(f"catégories rares non supportées: {name}")
+                drop_idx = trans.drop_idx_
+                for i, col in enumerate(cols):
+                    cats = np.asarray(trans.categories_[i])
+                    dropped = None if drop_idx is None else drop_idx[i]
+                    positions = np.full(len(cats), -1, dtype=np.intp)
+                    for k in range(len(cats)):
+                        if k == dropped:
+                            continue
+                        positions[k] = offset
+                        offset += 1
+                    self.cat_specs.append((col, cats, positions, trans.handle_unknown == "error"))
+            else:
+                raise UnsupportedPipeline(f"transformeur non supporté: {name} ({type(trans).__name__})")
+
+        n_expected = getattr(self.estimator, "n_features_in_", offset)
+        if offset != n_expected:
+            raise UnsupportedPipeline(f"{offset} features produites, {n_expected} attendues")
+
+        self.n_features = offset
+        self._num_mean = np.asarray(num_mean, dtype=float)
+        self._num_scale = np.asarray(num_scale, dtype=float)
+        self._num_pos = np.asarray(num_pos, dtype=np.intp)
+        # Accès O(1) valeur -> position pour le chemin unitaire
+        self._cat_lookup = [
+            (col, {str(c): int(p) for c, p in zip(cats, positions)}, strict)
+            for col, cats, positions, strict in self.cat_specs
+        ]
+        self._local = threading.local()
+
+    # -----------------------------
+    # Chemin unitaire
+    # -----------------------------
+    def _buffer(self) -> np.ndarray:
+        # un vecteur par thread : les handlers sync tournent dans un threadpool
+        buf = getattr(self._local, "x", None)
+        if buf is None:
+            buf = self._local.x = np.empty((1, self.n_features), dtype=float)
+        return buf
+
+    def encode_one(self, row: Mapping) -> np.ndarray:
+        x = self._buffer()
+        x.fill(0.0)
+        for j, col in enumerate(self.num_columns):
+            x[0, self._num_pos[j]] = (float(row[col]) - self._num_mean[j]) / self._num_scale[j]
+        for col, lookup, strict in self._cat_lookup:
+            pos = lookup.get(str(row[col]))
+            if pos is None:
+                if strict:
+                    raise ValueError(f"Catégorie inconnue pour {col}: {row[col]!r}")
+                continue
+            if pos >= 0:
+                x[0, pos] = 1.0
+        return x
+
+    def predict_proba_one(self, row: Mapping) -> float:
+        return float(self.estimator.predict_proba(self.encode_one(row))[0, 1])
+
+    def score_one(self, row: Mapping) -> tuple[int, float]:
+        """Renvoie (label, probabilité) avec une seule passe ``predict_proba``."""
+        prob = self.predict_proba_one(row)
+        return self.label_from_proba(prob), prob
+
+    def label_from_proba(self, prob: float) -> int:
+        # même règle que predict(): argmax des deux probabilités (égalité -> classe 0)
+        return int(self.classes_[1] if prob > 0.5 else self.classes_[0])
+
+    # -----------------------------
+    # Chemin vectorisé (batchs / vérification)
+    # -----------------------------
+    def encode_frame(self, df) -> np.ndarray:
+        """Encode un DataFrame (ou un dict de colonnes) en matrice de features."""
+        first = self.num_columns[0] if self.num_columns else self.cat_specs[0][0]
+        n = len(df[first])
+        X = np.zeros((n, self.n_features), dtype=float)
+        if self.num_columns:
+            num = np.column_stack([np.asarray(df[c], dtype=float) for c in self.num_columns])
+            X[:, self._num_pos] = (num - self._num_mean) / self._num_scale
+        rows = np.arange(n)
+        for col, cats, positions, strict in self.cat_specs:
+            column = df[col]
+            if hasattr(column, "cat"):
+                # pd.Categorical: on ne résout que les catégories, puis on indexe par les codes
+                labels = np.asarray(column.cat.categories).astype(str)
+                target, known = self._lookup(cats, positions, labels)
+                codes = column.cat.codes.to_numpy()
+                target = np.where(codes >= 0, target[codes], -1)
+                known = (codes >= 0) & known[codes]
+                values = labels[codes]
+            else:
+                values = np.asarray(column).astype(str)
+                target, known = self._lookup(cats, positions, values)
+            if strict and not known.all():
+                raise ValueError(f"Catégorie inconnue pour {col}: {values[~known][0]!r}")
+            hit = target >= 0
+            X[rows[hit], target[hit]] = 1.0
+        return X
+
+    @staticmethod
+    def _lookup(cats: np.ndarray, positions: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Position de sortie (-1 si supprimée/inconnue) et masque « catégorie connue » par valeur."""
+        cats_str = cats.astype(str)
+        idx = np.minimum(np.searchsorted(cats_str, values), len(cats_str) - 1)
+        known = cats_str[idx] == values
+        return np.where(known, positions[idx], -1), known
+
+    def predict_proba_frame(self, df) -> np.ndarray:
+        return self.estimator.predict_proba(self.encode_frame(df))[:, 1]
+
+    def predict_proba_rows(self, rows: list[Mapping]) -> np.ndarray:
+        columns = [c for c in self.num_columns] + [spec[0] for spec in self.cat_specs]
+        return self.predict_proba_frame({c: [r[c] for r in rows] for c in columns})
+
+    def labels_from_proba(self, probs: np.ndarray) -> np.ndarray:
+        return np.where(np.asarray(probs) > 0.5, self.classes_[1], self.classes_[0])
+
+
+def parity_gap(scorer: FastScorer, pipeline, df) -> float:
+    """Écart max de probabilité entre le moteur rapide (ligne à ligne) et le pipeline sklearn.
+
+    Renvoie ``inf`` si un label diffère.
+    """
+    return reference_gap(scorer, df.to_dict(orient="records"), df,
+                         pipeline.predict(df), pipeline.predict_proba(df)[:, 1])
+
+
+def reference_gap(scorer: FastScorer, rows: list[Mapping], columns, ref_pred: np.ndarray,
+                  ref_prob: np.ndarray) -> float:
+    """Comme ``parity_gap``, contre des labels/probabilités du pipeline déjà calculés.
+
+    ``rows`` (dicts) et ``columns`` (DataFrame ou colonnes NumPy) sont les mêmes lignes.
+    """
+    gap = 0.0
+    for i, row in enumerate(rows):
+        pred, prob = scorer.score_one(row)
+        if pred != ref_pred[i]:
+            return math.inf
+        gap = max(gap, abs(prob - ref_prob[i]))
+    gap = max(gap, float(np.max(np.abs(scorer.predict_proba_frame(columns) - ref_prob), initial=0.0)))
+    return gap
+
+
+if __name__ == "__main__":
+    # Vérification de parité : python -m backend.fast_scoring
+    import sys
+    import joblib
+    import pandas as pd
+
+    from .main import MODEL_PATH, TRAIN_DATA_PATH, PARITY_TOLERANCE
+
+    pipeline = joblib.load(MODEL_PATH)
+    scorer = FastScorer(pipeline)
+    data = pd.read_csv(TRAIN_DATA_PATH)
+    gap = parity_gap(scorer, pipeline, data)
+    print(f"{len(data)} lignes, écart max de probabilité: {gap:.3e}")
+    sys.exit(0 if gap <= PARITY_TOLERANCE else 1)
@@ -0,0 +1,347 @@
+"""File de jobs de scoring batch, persistée sur disque.
+
+Chaque job vit dans ``<root>/<job_id>/`` :
+
+- ``input.csv`` : copie du fichier soumis ;
+- ``state.json`` : statut, progression et point de reprise (remplacé atomiquement) ;
+- ``results.csv.part`` puis ``results.csv`` : scores ajoutés chunk par chunk ;
+- ``lock`` : verrou tenu par le thread qui traite le job.
+
+Les threads de traitement prennent d'abord un des ``concurrency`` créneaux
+(``<root>/.slots/<i>.lock``), puis un job en attente dont ils obtiennent le
+verrou. Les verrous de fichier valent entre processus : avec ``backend.serve``,
+tous les workers partagent la même limite et un job n'est traité qu'une fois.
+Un verrou disparaît avec le processus qui le tenait, donc après un
+redémarrage les jobs ``running`` sont repris depuis le dernier chunk écrit
+(``result_bytes``, ``rows_done``). La taille de chunk est fixée au premier
+démarrage du job (``chunk_rows``) et reprise telle quelle.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+logger = logging.getLogger(__name__)
+
+INPUT_FILE = "input.csv"
+STATE_FILE = "state.json"
+RESULT_FILE = "results.csv"
+PART_FILE = "results.csv.part"
+LOCK_FILE = "lock"
+CANCEL_FILE = "cancel"
+
+PENDING = ("queued", "running")
+FINISHED = ("done", "failed", "cancelled")
+
+
+class JobFailed(Exception):
+    """Erreur d'un chunk qui met fin au job (``detail`` est enregistré tel quel)."""
+
+    def __init__(self, detail: Any):
+        super().__init__(str(detail))
+        self.detail = detail
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _try_lock(path: Path):
+    """Verrou exclusif non bloquant: fichier ouvert (à garder) ou None si déjà pris."""
+    f = open(path, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def _release(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    f.close()
+
+
+class JobStore:
+    """Répertoires de jobs et lecture/écriture de leur état."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path(self, job_id: str) -> Path:
+        if not job_id or not all(c in "0123456789abcdef" for c in job_id):
+            raise KeyError(job_id)
+        return self.root / job_id
+
+    def create(self, fileobj, filename: str, meta: dict | None = None) -> dict:
+        """Copie le fichier soumis et enregistre un job ``queued`` (lignes comptées au passage)."""
+        job_id = uuid.uuid4().hex
+        tmp = self.root / f".{job_id}.tmp"
+        tmp.mkdir()
+        try:
+            newlines, last = 0, b"\n"
+            with open(tmp / INPUT_FILE, "wb") as out:
+                while block := fileobj.read(1 << 20):
+                    newlines += block.count(b"\n")
+                    last = block[-1:]
+                    out.write(block)
+            # estimation (un champ entre guillemets peut contenir un saut de ligne)
+            rows_total = max(newlines + (last != b"\n") - 1, 0)
+            state = {"id": job_id, "status": "queued", "filename": filename, "created": _now(),
+                     "started": None, "finished": None, "rows_total": rows_total, "rows_done": 0,
+                     "result_bytes": 0, "model_version": None, "error": None, **(meta or {})}
+            (tmp / STATE_FILE).write_text(json.dumps(state), encoding="utf-8")
+            os.replace(tmp, self.root / job_id)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return state
+
+    def read(self, job_id: str) -> dict:
+        try:
+            return json.loads((self.path(job_id) / STATE_FILE).read_text(encoding="utf-8"))
+        except (FileNotFoundError, NotADirectoryError, ValueError):
+            raise KeyError(job_id)
+
+    def write(self, state: dict):
+        d = self.path(state["id"])
+        tmp = d / f".{STATE_FILE}.{os.getpid()}.{threading.get_ident()}"
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, d / STATE_FILE)
+
+    def ids(self) -> list[str]:
+        """Jobs du plus ancien au plus récent (ordre de traitement)."""
+        jobs = []
+        for d in self.root.iterdir():
+            if d.is_dir() and not d.name.startswith("."):
+                try:
+                    jobs.append((self.read(d.name)["created"], d.name))
+                except (KeyError, OSError):
+                    continue
+        return [job_id for _, job_id in sorted(jobs)]
+
+    def result_path(self, job_id: str) -> Path:
+        return self.path(job_id) / RESULT_FILE
+
+    def cancel(self, job_id: str) -> dict:
+        """Annule un job: supprimé tout de suite s'il n'est pas en cours, sinon au prochain chunk."""
+        state = self.read(job_id)
+        d = self.path(job_id)
+        lock = _try_lock(d / LOCK_FILE)
+        if lock is None:
+            (d / CANCEL_FILE).touch()
+            return {**state, "status": "cancelling"}
+        try:
+            shutil.rmtree(d, ignore_errors=True)
+        finally:
+            lock.close()
+        return {**state, "status": "cancelled"}
+
+    def purge(self, older_than: float):
+        """Supprime les jobs terminés depuis plus de ``older_than`` secondes."""
+        limit = time.time() - older_than
+        for job_id in self.ids():
+            try:
+                state = self.read(job_id)
+            except KeyError:
+                continue
+            finished = state.get("finished")
+            if state["status"] in FINISHED and finished and datetime.fromisoformat(finished).timestamp() < limit:
+                shutil.rmtree(self.path(job_id), ignore_errors=True)
+
+
+def progress(state: dict) -> dict:
+    """État public d'un job: pourcentage et ETA (débit mesuré depuis le dernier démarrage)."""
+    out = {k: v for k, v in state.items() if not k.startswith("_") and k != "result_bytes"}
+    total, done = state.get("rows_total") or 0, state.get("rows_done", 0)
+    out["percent"] = 100.0 if state["status"] == "done" else (round(100 * min(done / total, 1), 1) if total else 0.0)
+    eta = None
+    run_rows, run_start = state.get("_run_rows", 0), state.get("_run_started")
+    if state["status"] == "running" and run_start and done - run_rows > 0:
+        rate = (done - run_rows) / max(time.time() - run_start, 1e-6)
+        eta = round(max(total - done, 0) / rate, 1)
+    out["eta_seconds"] = eta
+    return out
+
+
+class JobQueue:
+    """Threads de traitement des jobs, limités à ``concurrency`` jobs simultanés (tous processus confondus).
+
+    ``read_chunks(fileobj, chunk_rows)`` itère sur les DataFrames du fichier,
+    ``score_chunk(chunk, row_offset, model)`` renvoie le chunk scoré (lève
+    ``JobFailed`` pour une erreur de données), ``resolve_model(version)`` le
+    modèle d'un job (version None: modèle actif).
+    """
+
+    def __init__(self, store: JobStore, read_chunks: Callable[[Any, int], Iterator[pd.DataFrame]],
+                 score_chunk: Callable[[pd.DataFrame, int, Any], pd.DataFrame],
+                 resolve_model: Callable[[str | None], Any], concurrency: int = 1,
+                 chunk_rows: int = 5000, poll_interval: float = 1.0, retention: float = 7 * 86400):
+        self.store = store
+        self.read_chunks = read_chunks
+        self.score_chunk = score_chunk
+        self.resolve_model = resolve_model
+        self.concurrency = max(concurrency, 1)
+        self.chunk_rows = chunk_rows
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._slots = store.root / ".slots"
+        self._slots.mkdir(exist_ok=True)
+
+    def start(self) -> "JobQueue":
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._run, name=f"batch-job-{i}", daemon=True)
+                         for i in range(self.concurrency)]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self, timeout: float | None = 30.0):
+        """Arrête les threads après leur chunk en cours (les jobs reprendront au prochain démarrage)."""
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Réveille un thread (nouveau job soumis dans ce processus)."""
+        self._wake.set()
+
+    # -----------------------------
+    # Boucle de traitement
+    # -----------------------------
+    def _run(self):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() - last_purge > 3600:
+                last_purge = time.monotonic()
+                try:
+                    self.store.purge(self.retention)
+                except OSError as e:
+                    logger.warning("Purge des jobs impossible: %s", e)
+            try:
+                worked = self._run_once()
+            except Exception:
+                logger.exception("Erreur de la file de jobs")
+                worked = False
+            if not worked:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _acquire_slot(self):
+        for i in range(self.concurrency):
+            slot = _try_lock(self._slots / f"{i}.lock")
+            if slot is not None:
+                return slot
+        return None
+
+    def _run_once(self) -> bool:
+        """Traite un job en attente s'il y a un créneau libre. Renvoie True si un job a été traité."""
+        slot = self._acquire_slot()
+        if slot is None:
+            return False
+        try:
+            for job_id in self.store.ids():
+                try:
+                    if self.store.read(job_id)["status"] not in PENDING:
+                        continue
+                    lock = _try_lock(self.store.path(job_id) / LOCK_FILE)
+                except (KeyError, OSError):
+                    continue
+                if lock is None:
+                    continue  # traité par un autre thread ou processus
+                try:
+                    self._process(job_id)
+                finally:
+                    _release(lock)
+                return True
+            return False
+        finally:
+            _release(slot)
+
+    def _process(self, job_id: str):
+        d = self.store.path(job_id)
+        state = self.store.read(job_id)  # relu sous verrou
+        if state["status"] not in PENDING:
+            return
+        if (d / CANCEL_FILE).exists():
+            shutil.rmtree(d, ignore_errors=True)
+            return
+        model = self.resolve_model(state.get("model_version"))
+        if state.get("model_version") not in (None, model.version):
+            logger.warning("Job %s: version %s indisponible, reprise avec %s",
+                           job_id, state["model_version"], model.version)
+        resumed = state["status"] == "running"
+        # taille de chunk du premier démarrage: les offsets de reprise en dépendent
+        chunk_rows = state.setdefault("chunk_rows", self.chunk_rows)
+        state.update(status="running", model_version=model.version, started=state["started"] or _now(),
+                     _run_started=time.time(), _run_rows=state["rows_done"])
+        self.store.write(state)
+        if resumed:
+            logger.info("Job %s repris à la ligne %d", job_id, state["rows_done"])
+
+        try:
+            with open(d / INPUT_FILE, "rb") as src, open(d / PART_FILE, "a+b") as out:
+                # on repart du dernier chunk entièrement écrit
+                out.truncate(state["result_bytes"])
+                out.seek(state["result_bytes"])
+                offset = 0
+                for chunk in self.read_chunks(src, chunk_rows):
+                    done = state["rows_done"] - offset
+                    if done >= len(chunk):
+                        offset += len(chunk)  # déjà scoré avant l'arrêt
+                        continue
+                    if done > 0:
+                        # état antérieur à ``chunk_rows``: on saute exactement les lignes déjà écrites
+                        chunk, offset = chunk.iloc[done:], state["rows_done"]
+                    if self._stop.is_set():
+                        return  # reste "running": repris au prochain démarrage
+                    if (d / CANCEL_FILE).exists():
+                        out.close()
+                        shutil.rmtree(d, ignore_errors=True)
+                        return
+                    scored = self.score_chunk(chunk, offset, model)
+                    out.write(scored.to_csv(index=False, header=offset == 0).encode("utf-8"))
+                    out.flush()
+                    os.fsync(out.fileno())
+                    offset += len(chunk)
+                    state.update(rows_done=offset, result_bytes=out.tell())
+                    self.store.write(state)
+            if offset == 0:
+                raise JobFailed("Fichier vide.")
+            os.replace(d / PART_FILE, d / RESULT_FILE)
+            state.update(status="done", finished=_now(), rows_total=state["rows_done"])
+        except JobFailed as e:
+            state.update(status="failed", finished=_now(), error=e.detail)
+        except Exception as e:
+            logger.exception("Job %s en échec", job_id)
+            state.update(status="failed", finished=_now(), error=f"Impossible de traiter le fichier: {e}")
+        self.store.write(state)
@@ -0,0 +1,34 @@
+"""Import différé des dépendances lourdes (pandas).
+
+``pd = lazy_import("pandas")`` renvoie tout de suite un module mandataire : le
+vrai module n'est importé qu'au premier accès à un attribut (``pd.DataFrame``),
+donc par le premier endpoint qui en a besoin et non au démarrage du worker.
+/predict-one (moteur rapide) n'en a jamais besoin.
+
+Le mandataire n'est pas inscrit dans ``sys.modules`` : un ``import pandas``
+ailleurs importe le vrai module, sans effet sur les autres bibliothèques. Le
+premier import se fait sous verrou (plusieurs threads du threadpool peuvent y
+arriver en même temps).
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.Lock()
+
+
+class LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        # appelé seulement pour un attribut absent: avant le premier import, ou attribut inexistant
+        with _lock:
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Module ``name``, importé au premier accès à un attribut (tel quel s'il est déjà chargé)."""
+    return sys.modules.get(name) or LazyModule(name)
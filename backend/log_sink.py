@@ -0,0 +1,243 @@
+"""Écriture des logs CSV en tâche de fond.
+
+Les handlers déposent des enregistrements (dicts) dans un tampon mémoire
+borné ; un thread les écrit par paquets dès que ``flush_rows`` lignes sont en
+attente ou toutes les ``flush_interval`` secondes. Chaque paquet est écrit en
+un seul ``write`` sous verrou de fichier exclusif, ce qui permet à plusieurs
+workers uvicorn d'ajouter au même CSV sans entrelacer les lignes ni dupliquer
+l'en-tête.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Mapping
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+_warned_headers: set[Path] = set()  # logs dont l'en-tête incomplet a déjà été signalé
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Verrou exclusif inter-processus sur ``path`` (fichier .lock dédié)."""
+    with open(path, "a+b") as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+def append_csv(path: Path, records: list[Mapping], columns: list[str] | None = None) -> tuple[int, int]:
+    """Ajoute ``records`` à ``path`` sous verrou exclusif (en-tête écrit si le fichier est vide).
+
+    Si le fichier existe déjà, son en-tête fait foi : les clés inconnues sont
+    ignorées et les colonnes absentes laissées vides. Des ``columns`` absentes
+    de l'en-tête sont signalées une fois (cf. ``migrate_csv_header``). Renvoie
+    les offsets (octets) de début et de fin du bloc écrit.
+    """
+    with open(path, "a+b") as f:
+        _lock(f)
+        try:
+            f.seek(0, io.SEEK_END)
+            start = f.tell()
+            empty = start == 0
+            if empty:
+                header = list(columns) if columns else list(dict.fromkeys(k for r in records for k in r))
+            else:
+                f.seek(0)
+                header = next(csv.reader([f.readline().decode("utf-8")]))
+                f.seek(0, io.SEEK_END)
+                missing = [c for c in columns or [] if c not in header]
+                if missing and Path(path) not in _warned_headers:
+                    _warned_headers.add(Path(path))
+                    logger.warning("En-tête de %s sans %s: colonnes ignorées (cf. migrate_csv_header)",
+                                   Path(path).name, missing)
+            buf = io.StringIO()
+            writer = csv.DictWriter(buf, fieldnames=header, extrasaction="ignore", lineterminator="\n")
+            if empty:
+                writer.writeheader()
+            writer.writerows(records)
+            f.write(buf.getvalue().encode("utf-8"))
+            f.flush()
+            end = f.tell()
+        finally:
+            _unlock(f)
+    return start, end
+
+
+def migrate_csv_header(path: Path, columns: list[str]) -> bool:
+    """Réécrit ``path`` avec les ``columns`` absentes de son en-tête (cellules vides).
+
+    Un log créé par une version antérieure garde sinon son en-tête, et
+    ``append_csv`` ignorerait les nouvelles colonnes. Les colonnes existantes
+    et leur ordre sont conservés. Remplacement atomique sous verrou ; à appeler
+    au démarrage, avant tout calcul d'offsets sur le fichier. Renvoie True si
+    le fichier a été réécrit.
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return False
+    with open(path, "a+b") as lock:
+        _lock(lock)
+        try:
+            with open(path, newline="", encoding="utf-8") as src:
+                reader = csv.reader(src)
+                header = next(reader, [])
+                missing = [c for c in columns if c not in header]
+                if not missing:
+                    return False
+                tmp = path.with_name(f".{path.name}.{os.getpid()}")
+                with open(tmp, "w", newline="", encoding="utf-8") as dst:
+                    writer = csv.writer(dst, lineterminator="\n")
+                    writer.writerow([*header, *missing])
+                    pad = [""] * len(missing)
+                    for row in reader:
+                        writer.writerow([*row, *pad])
+            os.replace(tmp, path)
+        finally:
+            _unlock(lock)
+    logger.info("%s: colonnes %s ajoutées à l'en-tête", path.name, missing)
+    return True
+
+
+class LogSink:
+    """Tampon borné + thread d'écriture pour un log (CSV par défaut)."""
+
+    def __init__(self, path: Path, columns: list[str] | None = None, max_pending: int = 50_000,
+                 flush_rows: int = 1_000, flush_interval: float = 1.0, block_timeout: float = 0.1,
+                 on_write: Callable[[list[Mapping], int | None, int | None], None] | None = None,
+                 writer: Callable[[list[Mapping]], tuple[int, int] | None] | None = None):
+        self.path = Path(path)
+        self.columns = columns
+        # par défaut: ajout CSV verrouillé; sinon writer(batch) -> (début, fin) ou None
+        self.writer = writer or (lambda batch: append_csv(self.path, batch, self.columns))
+        self.max_pending = max_pending
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        # appelé après chaque écriture réussie avec (lignes, offset début, offset fin) —
+        # offsets à None pour un writer qui n'en a pas
+        self.on_write = on_write
+
+        self._buffer: list[Mapping] = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+        self.written = 0
+        self.dropped = 0
+        self.write_errors = 0
+
+    def submit(self, records: Iterable[Mapping]) -> bool:
+        """Met en file des enregistrements. Renvoie False (et les compte) s'ils sont rejetés.
+
+        Quand le tampon est plein, l'appelant attend au plus ``block_timeout``
+        secondes que le thread d'écriture le vide (backpressure) avant abandon.
+        """
+        records = list(records)
+        if not records:
+            return True
+        with self._cond:
+            if self._closed:
+                # après l'arrêt: écriture directe plutôt que perte silencieuse
+                self._write(records)
+                return True
+            self._ensure_started()
+            deadline = time.monotonic() + self.block_timeout
+            while self._buffer and len(self._buffer) + len(records) > self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.dropped += len(records)
+                    return False
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+            self._buffer.extend(records)
+            if len(self._buffer) >= self.flush_rows:
+                self._cond.notify_all()
+        return True
+
+    def flush(self):
+        """Écrit immédiatement tout ce qui est en attente."""
+        with self._write_lock:
+            with self._cond:
+                batch, self._buffer = self._buffer, []
+                self._cond.notify_all()
+            if batch:
+                self._write(batch)
+
+    def close(self, timeout: float | None = 10.0):
+        """Arrête le thread après avoir vidé le tampon (appelé à l'arrêt de l'app)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._buffer)
+        return {"pending": pending, "written": self.written,
+                "dropped": self.dropped, "write_errors": self.write_errors}
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"log-sink-{self.path.stem}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.flush_rows:
+                    self._cond.wait(self.flush_interval)
+                closing = self._closed
+            self.flush()
+            if closing:
+                break
+
+    def _write(self, batch: list[Mapping]):
+        try:
+            start, end = self.writer(batch) or (None, None)
+        except Exception as e:
+            self.write_errors += 1
+            self.dropped += len(batch)
+            logger.error("Écriture du log %s impossible (%d lignes perdues): %s", self.path.name, len(batch), e)
+            return
+        self.written += len(batch)
+        if self.on_write is not None:
+            try:
+                self.on_write(batch, start, end)
+            except Exception as e:
+                logger.error("Hook on_write du log %s en échec: %s", self.path.name, e)
@@ -1,14 +1,53 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from __future__ import annotations
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.responses import StreamingResponse, PlainTextResponse, Response, FileResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Literal, List
+from typing import Literal, List, Optional, get_args, get_type_hints
 from pathlib import Path
-import pandas as pd
 import numpy as np
-import joblib
+import asyncio
 import io
-from datetime import datetime
+import csv
+import shutil
+import tempfile
+import json
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+
+from .batching import MicroBatcher
+from .cell_table import CellTableScorer
+from .drift import DriftMonitor
+from .fast_scoring import FastScorer, UnsupportedPipeline, parity_gap, reference_gap
+from .jobs import JobFailed, JobQueue, JobStore, progress
+from .lazy import lazy_import
+from .log_sink import LogSink, migrate_csv_header
+from .metrics import Metrics, MetricsMiddleware
+from .model_registry import LoadedModel, ModelRegistry, read_parity_reference
+from .rates import RateProvider
+from .scoring_pool import ScoringExecutor
+from .response_formats import FORMATS, JSON_ROWS, encode, negotiate
+from .result_cache import ResultCache, profile_key
+from .what_if import sweep
+from .stats_store import EMPTY_STATS, STATS_COLUMNS, PredictionStats, SharedPredictionStats, StatsAccumulator
+
+try:
+    from .columnar_log import ColumnarLog
+except ImportError:  # pyarrow absent: seul le log CSV est disponible
+    ColumnarLog = None
+
+# pandas n'est importé qu'au premier endpoint qui en a besoin (batch, stats...):
+# le démarrage et /predict-one s'en passent
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
 
 # -----------------------------
 # Config & chemins
@@ -17,15 +56,114 @@ BASE_DIR = Path(__file__).resolve().parent.parent  # racine du projet
 MODELS_DIR = BASE_DIR / "models"
 DATA_DIR = BASE_DIR / "data"
 
-MODEL_PATH = MODELS_DIR / "best_model.pkl"
+# modèle servi tant que le registre est vide: artefact d'inférence exporté par
+# src/model_training.py (sans SMOTE ni imblearn), à défaut le pipeline d'entraînement
+SERVING_MODEL_PATH = MODELS_DIR / "serving_model.pkl"
+MODEL_PATH = SERVING_MODEL_PATH if SERVING_MODEL_PATH.exists() else MODELS_DIR / "best_model.pkl"
+MODEL_REGISTRY_DIR = MODELS_DIR / "registry"          # versions publiées par src/model_training.py
 RATES_PATH = DATA_DIR / "interest_rates.csv"
 PRED_LOG_PATH = DATA_DIR / "predictions_log.csv"   # log simple des prédictions
 FEEDBACK_LOG = DATA_DIR / "feedback_log.csv"
+OUTCOME_LOG = DATA_DIR / "outcomes_log.csv"       # issues réelles (réentraînement incrémental)
+PRED_STATS_PATH = DATA_DIR / "predictions_log.stats.json"  # agrégats de /stats
+# log columnaire partitionné par jour (déplaçable, ex. benchmarks: PRED_LOG_DIR=/tmp/...)
+PRED_LOG_DIR = Path(os.getenv("PRED_LOG_DIR", DATA_DIR / "predictions"))
+TRAIN_DATA_PATH = DATA_DIR / "loan_clean.csv"      # jeu de référence (contrôle de parité)
+
+# Moteur de scoring rapide pour /predict-one (désactivable: FAST_SCORING=0)
+FAST_SCORING = os.getenv("FAST_SCORING", "1") != "0"
+PARITY_TOLERANCE = 1e-6
+# Table pré-calculée par combinaison de catégorielles (opt-in: CELL_TABLE=1),
+# pour les estimateurs où elle est exacte; repli sur le moteur rapide sinon
+CELL_TABLE = os.getenv("CELL_TABLE", "0") == "1"
+
+# Artefacts chargés en mmap (lecture seule): une copie des arbres partagée par tous les workers
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") != "0"
+
+# Ratio de coût de la couche de décision (prêt accordé à tort / bon dossier refusé):
+# reprend le seuil balayé à l'entraînement pour ce ratio; vide: ratio choisi à l'entraînement
+DECISION_COST_RATIO = float(os.getenv("DECISION_COST_RATIO")) if os.getenv("DECISION_COST_RATIO") else None
+
+# Surveillance du registre (secondes, 0 pour désactiver) et jeton des endpoints /models
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "5"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Délai minimal (secondes) entre deux vérifications de interest_rates.csv
+RATES_CHECK_INTERVAL = float(os.getenv("RATES_CHECK_INTERVAL", "5"))
+
+# Micro-batching de /predict-one (opt-in: MICRO_BATCHING=1)
+MICRO_BATCHING = os.getenv("MICRO_BATCHING", "0") == "1"
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "32"))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "2"))
+MICRO_BATCH_TIMEOUT_S = float(os.getenv("MICRO_BATCH_TIMEOUT_S", "30"))  # attente maximale d'un lot
+
+# Exécuteur dédié au scoring: "thread", "process" (modèle préchargé par processus)
+# ou vide (threadpool par défaut de Starlette)
+SCORING_EXECUTOR = os.getenv("SCORING_EXECUTOR", "")
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(os.cpu_count() or 1)))
+
+# Writer de logs en tâche de fond (seuils de flush en lignes / secondes)
+LOG_FLUSH_ROWS = int(os.getenv("LOG_FLUSH_ROWS", "1000"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_MAX_PENDING = int(os.getenv("LOG_MAX_PENDING", "50000"))
+# Cache LRU des scores par profil (RESULT_CACHE_SIZE=0 pour désactiver)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "10000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+
+# Upload batch: octets lus pour détecter le séparateur, lignes par chunk en streaming
+SNIFF_BYTES = 64 * 1024
+STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "50000"))
+
+# Jobs de scoring asynchrones (/jobs): dossier, jobs simultanés (tous workers
+# confondus, pour ne pas affamer /predict-one), lignes par chunk, conservation
+JOBS_DIR = Path(os.getenv("JOBS_DIR", DATA_DIR / "jobs"))
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "1"))
+JOB_CHUNK_ROWS = int(os.getenv("JOB_CHUNK_ROWS", "5000"))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "168"))
+
+# Stockage du log de prédictions: "parquet" (segments journaliers) ou "csv" (historique)
+PRED_LOG_BACKEND = os.getenv("PRED_LOG_BACKEND", "parquet")
+
+# Dérive du trafic (/drift): fenêtre glissante (secondes) découpée en tranches,
+# lignes minimales avant de conclure; DRIFT_MONITOR=0 pour désactiver
+DRIFT_MONITOR = os.getenv("DRIFT_MONITOR", "1") != "0"
+DRIFT_WINDOW_SECONDS = float(os.getenv("DRIFT_WINDOW_SECONDS", "3600"))
+DRIFT_BUCKETS = int(os.getenv("DRIFT_BUCKETS", "12"))
+DRIFT_MIN_ROWS = int(os.getenv("DRIFT_MIN_ROWS", "200"))
+
+# Mesures par étape exposées sur /metrics (METRICS=0 pour désactiver) et
+# en-tête Server-Timing sur chaque réponse (opt-in: SERVER_TIMING=1)
+METRICS = os.getenv("METRICS", "1") != "0"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
 
 # -----------------------------
 # App FastAPI
 # -----------------------------
-app = FastAPI(title="Loan Approval API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global batcher, scoring_executor
+    if SCORING_EXECUTOR:
+        # démarré avant les autres threads (les processus de scoring sont forkés ici)
+        m = registry.active
+        scoring_executor = ScoringExecutor(SCORING_EXECUTOR, SCORING_WORKERS, m, MODEL_MMAP).start(warmup_rows()[0], m)
+    if MICRO_BATCHING:
+        batcher = MicroBatcher(score_pairs, MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT_MS).start()
+    registry.start_watching(MODEL_WATCH_INTERVAL)
+    job_queue.start()  # reprend aussi les jobs interrompus par un arrêt
+    yield
+    job_queue.stop()
+    registry.stop_watching()
+    if batcher is not None:
+        batcher.stop()
+        batcher = None
+    if scoring_executor is not None:
+        scoring_executor.shutdown()
+        scoring_executor = None
+    pred_log.close()
+    feedback_log.close()
+    outcome_log.close()
+
+app = FastAPI(title="Loan Approval API", version="1.0.0", lifespan=lifespan)
 
 # CORS (frontend Next.js en local + ouvert par défaut)
 app.add_middleware(
@@ -34,27 +172,109 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Histogrammes par endpoint/étape et compteurs (par processus worker)
+metrics = Metrics(enabled=METRICS)
+app.add_middleware(MetricsMiddleware, metrics=metrics, server_timing=SERVER_TIMING)
+
+@app.exception_handler(RequestValidationError)
+async def count_validation_errors(request, exc):
+    metrics.inc("validation_rejections_total", help="Requêtes rejetées à la validation")
+    return await request_validation_exception_handler(request, exc)
+
 # -----------------------------
 # Chargement modèle & taux
 # -----------------------------
-try:
-    model = joblib.load(MODEL_PATH)
-except Exception as e:
-    raise RuntimeError(f"Impossible de charger le modèle: {MODEL_PATH}\n{e}")
+# taux de l'année de la demande (année courante par défaut), relu si le fichier change
+rates = RateProvider(RATES_PATH, RATES_CHECK_INTERVAL)
+
+def build_fast_scorer(pipeline, path: Path | None = None):
+    """Construit le moteur rapide et vérifie sa parité avec le pipeline.
+
+    La référence est celle exportée avec l'artefact ``path`` (probabilités du
+    pipeline déjà calculées: ni pandas ni pipeline au démarrage), à défaut
+    loan_clean.csv scoré par le pipeline. Avec CELL_TABLE=1, essaie d'abord la
+    table par cellules catégorielles. Renvoie None (repli sur le pipeline
+    sklearn) si le pipeline n'est pas supporté ou si les probabilités divergent.
+    """
+    if not FAST_SCORING:
+        return None
+    fixture = read_parity_reference(path) if path is not None else None
+    reference = None
+    for cls in ([CellTableScorer] if CELL_TABLE else []) + [FastScorer]:
+        try:
+            scorer = cls(pipeline)
+            if fixture is not None:
+                gap = reference_gap(scorer, *fixture)
+            else:
+                if reference is None:
+                    reference = pd.read_csv(TRAIN_DATA_PATH)
+                gap = parity_gap(scorer, pipeline, reference)
+        except Exception as e:
+            logger.warning("Moteur %s désactivé: %s", cls.kind, e)
+            continue
+        if gap > PARITY_TOLERANCE:
+            logger.warning("Moteur %s désactivé: écart de parité %.3e", cls.kind, gap)
+            continue
+        return scorer
+    return None
+
+batcher = None  # MicroBatcher démarré au lifespan si MICRO_BATCHING=1
+scoring_executor = None  # ScoringExecutor démarré au lifespan si SCORING_EXECUTOR est défini
+
+result_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+# Chaque handler lit ``registry.active`` une seule fois (``m``) et le passe aux
+# helpers ci-dessous: une requête en cours termine sur le modèle qu'elle a vu.
+def cache_context(m: LoadedModel) -> tuple:
+    # toute entrée du cache est invalidée dès que le modèle change (le taux fait partie de la clé)
+    return (m.version,)
+
+def score_rows(rows: list[dict], m: LoadedModel) -> np.ndarray:
+    """Probabilités d'approbation pour des lignes déjà enrichies (une seule matrice)."""
+    return m.score_rows(rows)
+
+def score_pairs(items: list[tuple[LoadedModel, dict]]) -> np.ndarray:
+    """Fonction de score du micro-batcher: un passage par modèle présent dans le lot.
+
+    Pendant une bascule, un même lot peut mêler des requêtes arrivées avant et
+    après: chacune est scorée par le modèle qu'elle a capturé.
+    """
+    probs = np.empty(len(items))
+    groups: dict[int, tuple[LoadedModel, list[int]]] = {}
+    for i, (m, _) in enumerate(items):
+        groups.setdefault(id(m), (m, []))[1].append(i)
+    for m, idx in groups.values():
+        probs[idx] = score_rows([items[i][1] for i in idx], m)
+    return probs
 
-def load_interest_rate(year: int = 2025) -> float:
-    df_rates = pd.read_csv(RATES_PATH)
-    if "year" not in df_rates or "obs_value" not in df_rates:
-        raise RuntimeError("Fichier 'interest_rates.csv' invalide: colonnes attendues: year, obs_value")
-    # Tente d'abord l'année demandée, sinon prend la dernière valeur connue
-    row = df_rates.loc[df_rates["year"] == year, "obs_value"]
-    if not row.empty:
-        return float(row.values[0])
-    return float(df_rates.sort_values("year").iloc[-1]["obs_value"])
+def batcher_ready() -> bool:
+    """Le micro-batcher est actif et son dispatcher vivant (sinon scoring direct)."""
+    if batcher is None:
+        return False
+    if not batcher.alive:
+        logger.error("Dispatcher du micro-batcher arrêté: scoring direct")
+        return False
+    return True
 
-TAUX_2025 = load_interest_rate(2025)
+def score_single(row: dict, m: LoadedModel) -> tuple[int, float]:
+    """Score une ligne enrichie: via le micro-batcher s'il tourne, sinon directement."""
+    if batcher_ready():
+        prob = batcher.score((m, row), MICRO_BATCH_TIMEOUT_S)
+        return m.label_from_proba(prob), prob
+    return m.score_one(row)
+
+async def score_single_async(row: dict, m: LoadedModel) -> tuple[int, float]:
+    """score_single sans bloquer la boucle d'événements."""
+    if batcher_ready():
+        # délai dépassé ou client parti: le futur est annulé et le dispatcher écarte la ligne
+        prob = await asyncio.wait_for(asyncio.wrap_future(batcher.submit((m, row))), MICRO_BATCH_TIMEOUT_S)
+        return m.label_from_proba(prob), prob
+    if scoring_executor is not None:
+        return await asyncio.wrap_future(scoring_executor.submit_one(row, m))
+    return await run_in_threadpool(m.score_one, row)
 
 # -----------------------------
 # Schéma Pydantic (un client)
@@ -69,6 +289,19 @@ class LoanApplication(BaseModel):
     ApplicantIncome: float = Field(ge=0)
     CoapplicantIncome: float = Field(ge=0)
     LoanAmount: float = Field(gt=0)
+    ApplicationDate: Optional[date] = None  # taux de l'année de la demande (aujourd'hui si absent)
+
+class LoanOutcome(LoanApplication):
+    Loan_Status: Literal[0, 1]  # issue réelle de la demande (1 = prêt accordé)
+
+class WhatIfRequest(BaseModel):
+    application: LoanApplication
+    variable: Literal["LoanAmount", "ApplicantIncome", "CoapplicantIncome"]
+    min: float = Field(ge=0)
+    max: float = Field(gt=0)
+    points: int = Field(50, ge=2, le=2000, description="Points de la courbe")
+    threshold: Optional[float] = Field(None, gt=0, lt=1, description="Seuil d'approbation (du modèle si absent)")
+    tolerance: Optional[float] = Field(None, gt=0, description="Précision de la frontière ((max-min)/10000 par défaut)")
 
 # Colonnes minimales attendues côté banque (CSV)
 REQUIRED_COLUMNS = [
@@ -79,30 +312,34 @@ REQUIRED_COLUMNS = [
 # -----------------------------
 # Feature engineering
 # -----------------------------
+DATE_COLUMN = "ApplicationDate"  # facultative: date de la demande, ligne par ligne
+
 def add_features(df: pd.DataFrame) -> pd.DataFrame:
-    # Calculs comme dans ton Streamlit / notebook
-    df = df.copy()
-    df["LoanAmount_log"] = df["LoanAmount"].apply(lambda x: np.log(x) if x > 0 else 0)
-    df["InterestRate"] = TAUX_2025
+    # Calculs comme dans ton Streamlit / notebook (copie superficielle: pas de recopie des données)
+    df = df.copy(deep=False)
+    amount = df["LoanAmount"].to_numpy(dtype=float)
+    positive = amount > 0
+    df["LoanAmount_log"] = np.log(amount, out=np.zeros_like(amount), where=positive)
+    if DATE_COLUMN in df.columns:
+        # une seule recherche vectorisée pour tout le batch (NaT: taux courant)
+        df["InterestRate"] = rates.for_dates(df[DATE_COLUMN])
+    else:
+        df["InterestRate"] = rates.current()
     return df
 
+def application_row(client: dict) -> dict:
+    """Équivalent de add_features pour un seul client, sans DataFrame."""
+    row = dict(client)
+    row["LoanAmount_log"] = float(np.log(row["LoanAmount"])) if row["LoanAmount"] > 0 else 0.0
+    row["InterestRate"] = rates.for_date(row.get(DATE_COLUMN))
+    return row
+
 def ensure_required_columns(df: pd.DataFrame):
     missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
     if missing:
         raise HTTPException(status_code=400, detail=f"Colonnes manquantes: {missing}. "
                                                     f"Colonnes requises: {REQUIRED_COLUMNS}")
 
-# -----------------------------
-# Utils logging (simple CSV)
-# -----------------------------
-def log_predictions(df_input: pd.DataFrame, preds: np.ndarray, probs: np.ndarray):
-    out = df_input.copy()
-    out["prediction"] = preds
-    out["probability"] = probs
-    # append
-    header = not PRED_LOG_PATH.exists()
-    out.to_csv(PRED_LOG_PATH, mode="a", index=False, header=header)
-
 # -----------------------------
 # Colonnes numériques attendues
 NUMERIC_COLUMNS = ["ApplicantIncome", "CoapplicantIncome", "LoanAmount"]
@@ -111,35 +348,124 @@ CATEGORICAL_COLUMNS = [
     "Gender","Married","Dependents","Education","Self_Employed","Property_Area"
 ]
 
-def _strip_strings(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    for c in df.columns:
-        if df[c].dtype == "object":
-            df[c] = df[c].astype(str).str.strip()
-    return df
+# Colonnes numériques de la clé du cache (le taux dépend de la date de la demande)
+CACHE_KEY_NUMERIC = [*NUMERIC_COLUMNS, "InterestRate"]
+
+# -----------------------------
+# Utils logging (écrit en tâche de fond)
+# -----------------------------
+PRED_LOG_COLUMNS = [
+    *CATEGORICAL_COLUMNS, *NUMERIC_COLUMNS, "LoanAmount_log", "InterestRate", "prediction", "probability",
+    "model_version",
+]
+
+# types des colonnes du log columnaire (+ "timestamp" ajouté par ColumnarLog)
+PRED_LOG_TYPES = {
+    **{c: "string" for c in CATEGORICAL_COLUMNS},
+    **{c: "double" for c in [*NUMERIC_COLUMNS, "LoanAmount_log", "InterestRate"]},
+    "prediction": "int64",
+    "probability": "double",
+    "model_version": "string",
+}
+
+def build_prediction_log():
+    """Renvoie (store columnaire ou None, agrégats /stats, sink) selon PRED_LOG_BACKEND."""
+    if PRED_LOG_BACKEND == "parquet":
+        if ColumnarLog is None:
+            logger.warning("pyarrow introuvable: log de prédictions en CSV")
+        else:
+            try:
+                store = ColumnarLog(PRED_LOG_DIR, PRED_LOG_TYPES)
+                store.migrate_csv(PRED_LOG_PATH)
+                store.compact()
+            except Exception as e:
+                logger.error("Log columnaire indisponible, repli sur le CSV: %s", e)
+            else:
+                agg = SharedPredictionStats(PRED_LOG_DIR / "_stats.json", lambda: store.query(columns=STATS_COLUMNS))
+                sink = LogSink(PRED_LOG_DIR, None, LOG_MAX_PENDING, LOG_FLUSH_ROWS, LOG_FLUSH_INTERVAL,
+                               on_write=agg.observe, writer=store.append)
+                return store, agg, sink
+    if migrate_csv_header(PRED_LOG_PATH, PRED_LOG_COLUMNS):
+        # offsets d'octets du snapshot caducs: les agrégats sont recalculés sur le fichier réécrit
+        PRED_STATS_PATH.unlink(missing_ok=True)
+    agg = PredictionStats(PRED_LOG_PATH, PRED_STATS_PATH)
+    sink = LogSink(PRED_LOG_PATH, PRED_LOG_COLUMNS, LOG_MAX_PENDING, LOG_FLUSH_ROWS, LOG_FLUSH_INTERVAL,
+                   on_write=agg.observe)
+    return None, agg, sink
+
+pred_store, pred_stats, pred_log = build_prediction_log()
+feedback_log = LogSink(FEEDBACK_LOG, None, LOG_MAX_PENDING, LOG_FLUSH_ROWS, LOG_FLUSH_INTERVAL)
+
+# log des issues réelles: features du modèle + étiquette, lu par src/incremental_training.py
+OUTCOME_LOG_COLUMNS = [
+    *CATEGORICAL_COLUMNS, *NUMERIC_COLUMNS, "LoanAmount_log", "InterestRate", "Loan_Status", "timestamp",
+]
+outcome_log = LogSink(OUTCOME_LOG, OUTCOME_LOG_COLUMNS, LOG_MAX_PENDING, LOG_FLUSH_ROWS, LOG_FLUSH_INTERVAL)
 
-def _coerce_numeric(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
-    df = df.copy()
-    for col in cols:
+# répartition du trafic comparée au profil d'entraînement du modèle (par worker)
+drift_monitor = DriftMonitor(DRIFT_WINDOW_SECONDS, DRIFT_BUCKETS, DRIFT_MIN_ROWS) if DRIFT_MONITOR else None
+
+def log_predictions(df_input, preds: np.ndarray, probs: np.ndarray, m: LoadedModel) -> bool:
+    """Met les prédictions en file pour le writer de fond (ne bloque pas sur le disque).
+
+    ``df_input`` est un DataFrame enrichi ou une liste de lignes (dicts);
+    ``m`` est le modèle qui a produit les scores. Les mêmes lignes alimentent
+    le suivi de dérive (compteurs en mémoire, cf. backend.drift).
+    """
+    if drift_monitor is not None:
+        drift_monitor.observe(df_input, probs, m.drift_profile)
+    rows = [dict(r) for r in df_input] if isinstance(df_input, list) else df_input.to_dict(orient="records")
+    now = datetime.now(timezone.utc)  # ignoré par le log CSV (pas de colonne timestamp)
+    for row, pred, prob in zip(rows, preds, probs):
+        row["prediction"] = int(pred)
+        row["probability"] = float(prob)
+        row["model_version"] = m.version
+        row["timestamp"] = now
+    accepted = pred_log.submit(rows)
+    if not accepted:
+        metrics.inc("log_rejections_total", len(rows), help="Lignes de log refusées (file d'écriture saturée)")
+    return accepted
+
+# Vocabulaires fixes des catégorielles (ceux du schéma LoanApplication)
+CATEGORY_VOCAB = {c: list(get_args(get_type_hints(LoanApplication)[c])) for c in CATEGORICAL_COLUMNS}
+_MISSING_STRINGS = {"", "nan", "NaN", "None"}
+
+def _clean_label(value) -> str:
+    # même normalisation que l'ancien astype(str).str.strip() + remplacement des vides
+    text = str(value).strip()
+    return "Unknown" if text in _MISSING_STRINGS else text
+
+def _to_categorical(values: pd.Series, vocab: list[str]) -> pd.Categorical:
+    """Nettoie une colonne catégorielle en ne traitant que ses valeurs distinctes.
+
+    Les valeurs hors vocabulaire sont conservées (catégories ajoutées après le
+    vocabulaire) : le OneHotEncoder les encode à zéro comme avant.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype) and list(values.cat.categories) == vocab:
+        return values.array
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    labels = [_clean_label(u) for u in uniques]
+    categories = vocab + sorted({l for l in labels if l not in vocab})
+    index = {c: i for i, c in enumerate(categories)}
+    mapping = np.array([index[l] for l in labels], dtype=np.int32)
+    return pd.Categorical.from_codes(mapping[codes], categories=categories)
+
+def _to_float(values: pd.Series) -> np.ndarray:
+    """Colonne numérique en float64; le nettoyage regex n'est appliqué qu'aux cellules non numériques."""
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    parsed = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+    retry = np.isnan(parsed) & values.notna().to_numpy()
+    if retry.any():
         # supprime tout sauf chiffres, signe et point -> gère € , espaces, , ; etc.
-        df[col] = (
-            df[col]
+        cleaned = (
+            values[retry]
             .astype(str)
             .str.replace(r"[^\d\.\-]", "", regex=True)
             .replace({"": np.nan, ".": np.nan, "-": np.nan})
         )
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    return df
-
-def _force_categorical(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
-    df = df.copy()
-    for col in cols:
-        df[col] = df[col].astype(str).str.strip()
-        # normalise quelques valeurs fréquentes
-        df[col] = df[col].replace({"nan": "", "NaN": "", "None": ""})
-        # valeurs vides -> "Unknown" (si ton pipeline n’impute pas les cat.)
-        df[col] = df[col].replace({"": "Unknown"})
-    return df
+        parsed[retry] = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=float)
+    return parsed
 
 def ensure_required_columns(df: pd.DataFrame):
     missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
@@ -149,52 +475,294 @@ def ensure_required_columns(df: pd.DataFrame):
             detail=f"Colonnes manquantes: {missing}. Requis: {REQUIRED_COLUMNS}"
         )
 
-def clean_and_validate_batch(df: pd.DataFrame) -> pd.DataFrame:
-    """Nettoie les types et valide avant features/pred."""
+def clean_and_validate_batch(df: pd.DataFrame, row_offset: int = 0) -> pd.DataFrame:
+    """Nettoie les types et valide avant features/pred, en une seule passe sans recopie.
+
+    Les catégorielles deviennent des ``pd.Categorical`` (vocabulaire fixe en
+    tête), les numériques des float64 (sans conversion si déjà numériques).
+    Toutes les règles sont évaluées avant de répondre : en cas d'échec, le
+    détail reprend la première erreur (format historique) et liste toutes les
+    erreurs dans ``errors``.
+
+    ``row_offset``: nombre de lignes déjà lues avant ``df`` (chunks en streaming),
+    pour que les erreurs citent les numéros de ligne absolus du fichier.
+    """
     ensure_required_columns(df)
-    df = _strip_strings(df)
-    df = _force_categorical(df, CATEGORICAL_COLUMNS)
-    df = _coerce_numeric(df, NUMERIC_COLUMNS)
+    df = df.copy(deep=False)
+    for c in df.columns:
+        if c == DATE_COLUMN:
+            continue
+        if c in CATEGORY_VOCAB:
+            df[c] = _to_categorical(df[c], CATEGORY_VOCAB[c])
+        elif c in NUMERIC_COLUMNS:
+            df[c] = _to_float(df[c])
+        elif df[c].dtype == "object":
+            df[c] = df[c].astype(str).str.strip()
 
+    def rows_of(mask: np.ndarray) -> list[int]:
+        return [row_offset+int(i)+1 for i in mask.nonzero()[0]]
+
+    errors = []
+    values = {col: df[col].to_numpy() for col in NUMERIC_COLUMNS}
     # Lignes non numériques restantes
-    bad = {col: (df[col].isna()).to_numpy().nonzero()[0] for col in NUMERIC_COLUMNS}
-    bad = {k: [int(i)+1 for i in v] for k, v in bad.items() if len(v) > 0}
+    bad = {col: rows_of(np.isnan(v)) for col, v in values.items()}
+    bad = {k: v for k, v in bad.items() if v}
     if bad:
-        raise HTTPException(
-            status_code=400,
-            detail={"message": "Valeurs numériques invalides", "rows_by_column": bad}
-        )
-
-    # Règles simples
-    if (df["LoanAmount"] <= 0).any():
-        rows = (df["LoanAmount"] <= 0).to_numpy().nonzero()[0]
-        raise HTTPException(status_code=400,
-            detail={"message": "LoanAmount doit être > 0", "rows": [int(i)+1 for i in rows]}
-        )
+        errors.append({"message": "Valeurs numériques invalides", "rows_by_column": bad})
+    # Règles simples (les NaN, déjà signalés, ne déclenchent pas les comparaisons)
+    if (values["LoanAmount"] <= 0).any():
+        errors.append({"message": "LoanAmount doit être > 0", "rows": rows_of(values["LoanAmount"] <= 0)})
     for col in ["ApplicantIncome","CoapplicantIncome"]:
-        if (df[col] < 0).any():
-            rows = (df[col] < 0).to_numpy().nonzero()[0]
-            raise HTTPException(status_code=400,
-                detail={"message": f"{col} ne peut pas être négatif", "rows": [int(i)+1 for i in rows]}
-            )
+        if (values[col] < 0).any():
+            errors.append({"message": f"{col} ne peut pas être négatif", "rows": rows_of(values[col] < 0)})
+    if DATE_COLUMN in df.columns:
+        # dates ISO 8601; cellule vide = date du jour
+        raw = df[DATE_COLUMN]
+        if raw.dtype == object:
+            raw = raw.where(raw.astype(str).str.strip() != "")
+        dates = pd.to_datetime(raw, errors="coerce", utc=True, format="ISO8601")
+        bad_dates = (dates.isna() & raw.notna()).to_numpy()
+        if bad_dates.any():
+            errors.append({"message": f"{DATE_COLUMN} invalide (format AAAA-MM-JJ attendu)", "rows": rows_of(bad_dates)})
+        df[DATE_COLUMN] = dates
+    if errors:
+        raise HTTPException(status_code=400, detail={**errors[0], "errors": errors})
     return df
 
-def add_features(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["LoanAmount_log"] = df["LoanAmount"].apply(lambda x: np.log(x) if x > 0 else 0.0)
-    df["InterestRate"] = TAUX_2025
+def format_dates(df: pd.DataFrame) -> pd.DataFrame:
+    """Dates de demande en texte AAAA-MM-JJ (None si absente) pour les réponses JSON/CSV."""
+    if DATE_COLUMN in df.columns:
+        dates = df[DATE_COLUMN]
+        df[DATE_COLUMN] = dates.dt.strftime("%Y-%m-%d").astype(object).where(dates.notna(), None)
     return df
 
 def ensure_model_dtypes(df: pd.DataFrame) -> pd.DataFrame:
-    """Force les dtypes finaux que ton pipeline attend (évite isnan sur object)."""
-    df = df.copy()
+    """Force les dtypes finaux que ton pipeline attend (évite isnan sur object).
+
+    Ne convertit que les colonnes qui ne sont pas déjà au bon type.
+    """
+    df = df.copy(deep=False)
     num_final = ["ApplicantIncome","CoapplicantIncome","LoanAmount","LoanAmount_log","InterestRate"]
     for col in num_final:
-        df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+        if df[col].dtype != np.float64:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
     for col in CATEGORICAL_COLUMNS:
-        df[col] = df[col].astype("object")
+        if not isinstance(df[col].dtype, pd.CategoricalDtype) and df[col].dtype != object:
+            df[col] = df[col].astype("object")
     return df
 
+# -----------------------------
+# Lecture des uploads & streaming
+# -----------------------------
+def sniff_delimiter(fileobj) -> str:
+    """Détecte le séparateur sur les premiers Ko seulement (utile pour CSV français)."""
+    sample = fileobj.read(SNIFF_BYTES)
+    fileobj.seek(0)
+    if isinstance(sample, bytes):
+        sample = sample.decode("utf-8", errors="ignore")
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+def read_csv_upload(fileobj, chunksize: int | None = None):
+    """Parse un CSV uploadé avec le moteur C (DataFrame, ou itérateur de chunks)."""
+    return pd.read_csv(fileobj, sep=sniff_delimiter(fileobj), engine="c",
+                       dtype={c: str for c in CATEGORICAL_COLUMNS}, chunksize=chunksize)
+
+def score_frame(df_fe: pd.DataFrame, m: LoadedModel) -> tuple[np.ndarray, np.ndarray]:
+    """(labels, probabilités) pour un batch enrichi, via l'exécuteur de scoring s'il tourne."""
+    if scoring_executor is not None:
+        return scoring_executor.submit_frame(df_fe, m).result()
+    return m.score_frame(df_fe)
+
+async def score_frame_async(df_fe: pd.DataFrame, m: LoadedModel) -> tuple[np.ndarray, np.ndarray]:
+    if scoring_executor is not None:
+        return await asyncio.wrap_future(scoring_executor.submit_frame(df_fe, m))
+    return await run_in_threadpool(m.score_frame, df_fe)
+
+def explain_frame(df_fe: pd.DataFrame, m: LoadedModel) -> tuple[np.ndarray, np.ndarray]:
+    """(valeur de base, contributions par variable) d'un batch enrichi; 422 si le modèle n'est pas explicable."""
+    try:
+        explainer = m.explainer()
+    except UnsupportedPipeline as e:
+        raise HTTPException(status_code=422, detail=f"Explication indisponible pour ce modèle: {e}")
+    with metrics.timed("explain"):
+        return explainer.explain_frame(df_fe)
+
+def add_explanation(out: pd.DataFrame, explanation: tuple[np.ndarray, np.ndarray], m: LoadedModel) -> dict:
+    """Colonnes ``base_value`` et ``contribution_<variable>``; renvoie l'en-tête qui donne leur unité."""
+    base, contrib = explanation
+    explainer = m.explainer()
+    out["base_value"] = base
+    for j, feature in enumerate(explainer.features):
+        out[f"contribution_{feature}"] = contrib[:, j]
+    metrics.inc("rows_explained_total", len(base), help="Lignes expliquées")
+    return {"X-Explanation-Output": explainer.output}
+
+def prepare_batch(df: pd.DataFrame, row_offset: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """(batch nettoyé, batch enrichi aux dtypes du modèle)."""
+    try:
+        with metrics.timed("clean"):
+            df = clean_and_validate_batch(df, row_offset)
+    except HTTPException:
+        metrics.inc("validation_rejections_total", help="Requêtes rejetées à la validation")
+        raise
+    with metrics.timed("features"):
+        df_fe = add_features(df)
+    with metrics.timed("dtypes"):
+        return df, ensure_model_dtypes(df_fe)
+
+def response_format(accept: Optional[str]) -> str:
+    """Format négocié pour une réponse batch (406 si aucun format proposé n'est accepté)."""
+    fmt = negotiate(accept)
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Formats de réponse disponibles: {FORMATS}")
+    return fmt
+
+def finish_batch(df: pd.DataFrame, df_fe: pd.DataFrame, preds: np.ndarray, probs: np.ndarray,
+                 m: LoadedModel, fmt: str = JSON_ROWS, explanation=None) -> Response:
+    """Log des prédictions et réponse au format ``fmt`` (encodée ici, hors de la boucle d'événements)."""
+    metrics.inc("rows_scored_total", len(preds), help="Lignes scorées")
+    with metrics.timed("log"):
+        log_predictions(df_fe, preds, probs, m)
+    with metrics.timed("serialize"):
+        out = df.copy(deep=False)
+        out["prediction"] = preds
+        out["probability"] = probs
+        out["model_version"] = m.version
+        headers = {"Vary": "Accept"}
+        if explanation is not None:
+            headers.update(add_explanation(out, explanation, m))
+        return encode(format_dates(out), fmt, headers=headers)
+
+def score_chunk(chunk: pd.DataFrame, row_offset: int, m: LoadedModel, explain: bool = False) -> pd.DataFrame:
+    df, df_fe = prepare_batch(chunk, row_offset)
+    with metrics.timed("predict"):
+        preds, probs = score_frame(df_fe, m)
+    metrics.inc("rows_scored_total", len(preds), help="Lignes scorées")
+    with metrics.timed("log"):
+        log_predictions(df_fe, preds, probs, m)
+    df["prediction"] = preds
+    df["probability"] = probs
+    df["model_version"] = m.version
+    if explain:
+        add_explanation(df, explain_frame(df_fe, m), m)
+    return format_dates(df)
+
+def stream_scores(chunks, fmt: str, on_close=None, explain: bool = False):
+    """Générateur CSV/NDJSON: nettoie, score et sérialise chunk par chunk (mémoire bornée).
+
+    Le premier chunk est scoré avant l'envoi de la réponse, de sorte qu'une
+    erreur de colonnes ou de valeurs y donne un vrai 400. Une erreur sur un
+    chunk suivant arrive après l'en-tête HTTP : elle est émise comme dernière
+    ligne du flux (``{"error": ...}`` en NDJSON, ``#error,{...}`` en CSV).
+    """
+    chunks = iter(chunks)
+    m = registry.active  # tout le flux est scoré par la même version
+    try:
+        with metrics.timed("parse"):
+            first = next(chunks, None)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Impossible de lire le fichier: {e}")
+    if first is None:
+        raise HTTPException(status_code=400, detail="Fichier vide.")
+    out = score_chunk(first, 0, m, explain)
+    offset = len(first)
+
+    def render(df: pd.DataFrame, header: bool) -> str:
+        with metrics.timed("serialize"):
+            if fmt == "csv":
+                return df.to_csv(index=False, header=header)
+            text = df.to_json(orient="records", lines=True, force_ascii=False, double_precision=15)
+            return text if text.endswith("\n") else text + "\n"
+
+    def render_error(detail) -> str:
+        logger.warning("Streaming interrompu après la ligne %d: %s", offset, detail)
+        err = json.dumps({"error": detail}, ensure_ascii=False)
+        return f"#error,{err}\n" if fmt == "csv" else err + "\n"
+
+    def gen():
+        nonlocal offset
+        try:
+            yield render(out, True)
+            while True:
+                try:
+                    with metrics.timed("parse"):
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        return
+                    scored = score_chunk(chunk, offset, m, explain)
+                except HTTPException as e:
+                    yield render_error(e.detail)
+                    return
+                except Exception as e:
+                    yield render_error(f"Impossible de lire le fichier: {e}")
+                    return
+                offset += len(chunk)
+                yield render(scored, False)
+        finally:
+            if on_close is not None:
+                on_close()
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = {"X-Explanation-Output": m.explainer().output} if explain else None
+    return StreamingResponse(gen(), media_type=media_type, headers=headers)
+
+# -----------------------------
+# Registre de modèles (rechargement à chaud)
+# -----------------------------
+def warmup_rows() -> list[dict]:
+    """Quelques lignes synthétiques enrichies couvrant toutes les modalités."""
+    return [application_row({
+        **{c: vocab[i % len(vocab)] for c, vocab in CATEGORY_VOCAB.items()},
+        "ApplicantIncome": 2500.0 * (i + 1), "CoapplicantIncome": 1000.0 * i, "LoanAmount": 100.0 + 50.0 * i,
+    }) for i in range(4)]
+
+def warmup_model(m: LoadedModel):
+    """Score des lignes synthétiques avant que ``m`` ne reçoive du trafic."""
+    rows = warmup_rows()
+    probs = score_rows(rows, m)
+    if "pandas" in sys.modules:
+        # chemin batch aussi, s'il a déjà servi (sinon pandas reste non importé jusqu'au premier batch)
+        score_frame(ensure_model_dtypes(add_features(clean_and_validate_batch(pd.DataFrame(rows)))), m)
+    if not np.isfinite(probs).all():
+        raise ValueError(f"Modèle {m.version}: probabilités invalides au préchauffage")
+
+registry = ModelRegistry(MODEL_REGISTRY_DIR, MODEL_PATH, build_fast_scorer, warmup_model, mmap=MODEL_MMAP,
+                         cost_ratio=DECISION_COST_RATIO)
+try:
+    registry.load_initial()
+except Exception as e:
+    raise RuntimeError(f"Impossible de charger le modèle: {MODEL_PATH}\n{e}")
+
+# -----------------------------
+# Jobs de scoring asynchrones
+# -----------------------------
+def score_job_chunk(chunk: pd.DataFrame, row_offset: int, m: LoadedModel) -> pd.DataFrame:
+    try:
+        return score_chunk(chunk, row_offset, m)
+    except HTTPException as e:
+        raise JobFailed(e.detail)
+
+def job_model(version: Optional[str]) -> LoadedModel:
+    """Modèle d'un job: celui avec lequel il a commencé s'il est encore disponible (reprise)."""
+    m = registry.active
+    if version is None or version == m.version:
+        return m
+    try:
+        return registry.load(version)
+    except Exception:
+        return m
+
+job_store = JobStore(JOBS_DIR)
+job_queue = JobQueue(job_store, lambda f, n: read_csv_upload(f, chunksize=n), score_job_chunk, job_model,
+                     JOB_CONCURRENCY, JOB_CHUNK_ROWS, retention=JOB_RETENTION_HOURS * 3600)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+
 # -----------------------------
 # Endpoints
 # -----------------------------
@@ -204,7 +772,41 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "logs": {"predictions": pred_log.stats(), "feedback": feedback_log.stats(),
+                 "outcomes": outcome_log.stats()},
+        "cache": result_cache.stats(),
+        "model": registry.active.info(),
+        "interest_rate": rates.current(),
+    }
+
+@metrics.collector
+def runtime_metrics():
+    """Séries lues au scrape: files d'écriture des logs et cache de résultats."""
+    logs = {"predictions": pred_log.stats(), "feedback": feedback_log.stats(),
+            "outcomes": outcome_log.stats()}
+    cache = result_cache.stats()
+    for key, name, kind, help in [("pending", "log_pending", "gauge", "Lignes de log en attente d'écriture"),
+                                  ("dropped", "log_dropped_total", "counter", "Lignes de log abandonnées (file saturée)"),
+                                  ("write_errors", "log_write_errors_total", "counter", "Échecs d'écriture du log")]:
+        yield name, kind, help, [({"log": log}, s[key]) for log, s in logs.items()]
+    yield "cache_hits_total", "counter", "Résultats servis par le cache", [({}, cache["hits"])]
+    yield "cache_misses_total", "counter", "Résultats absents du cache", [({}, cache["misses"])]
+    yield "cache_entries", "gauge", "Entrées du cache de résultats", [({}, cache["size"])]
+    if drift_monitor is not None:
+        report = drift_monitor.report()
+        scores = [(name, e) for name, e in [*report["features"].items(), ("probability", report["probability"])]
+                  if e is not None and e["psi"] is not None]
+        yield "drift_psi", "gauge", "PSI de la fenêtre glissante par variable", [
+            ({"feature": name}, e["psi"]) for name, e in scores]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Mesures de ce processus au format texte Prometheus (un worker par scrape avec backend.serve)."""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Mesures désactivées (METRICS=0)")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/columns")
 def columns():
@@ -233,143 +835,324 @@ def csv_template():
                              headers={"Content-Disposition":"attachment; filename=loan_template.csv"})
 
 @app.post("/predict-one")
-def predict_one(client: LoanApplication):
-    df = pd.DataFrame([client.dict()])
-    df_fe = add_features(df)
+async def predict_one(client: LoanApplication):
+    m = registry.active
+    with metrics.timed("features"):
+        row = application_row(client.dict())
+    with metrics.timed("cache"):
+        key = profile_key(row, CATEGORICAL_COLUMNS, CACHE_KEY_NUMERIC)
+        context = cache_context(m)
+        cached = result_cache.get(key, context) if result_cache.enabled else None
+    if cached is not None:
+        pred, prob = cached
+    else:
+        try:
+            with metrics.timed("predict"):
+                pred, prob = await score_single_async(row, m)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erreur prédiction: {e}")
+        if result_cache.enabled:
+            result_cache.put(key, (int(pred), prob), context)
+
+    # log (non bloquant; les rejets sont comptés par pred_log)
+    metrics.inc("rows_scored_total", help="Lignes scorées")
+    with metrics.timed("log"):
+        log_predictions([row], [pred], [prob], m)
+
+    return {"prediction": int(pred), "probability": prob, "model_version": m.version}
+
+def what_if_frame(row: dict, variable: str, values: np.ndarray) -> pd.DataFrame:
+    """Copies de la ligne enrichie ``row`` où seule ``variable`` varie (features recalculées)."""
+    n = len(values)
+    cols = {c: np.full(n, row[c], dtype=object) for c in CATEGORICAL_COLUMNS}
+    for c in [*NUMERIC_COLUMNS, "LoanAmount_log", "InterestRate"]:
+        cols[c] = np.full(n, float(row[c]))
+    cols[variable] = np.asarray(values, dtype=float)
+    if variable == "LoanAmount":
+        cols["LoanAmount_log"] = np.log(cols["LoanAmount"])
+    return pd.DataFrame(cols)
+
+@app.post("/what-if")
+async def what_if(req: WhatIfRequest):
+    """Balaye ``variable`` sur [min, max] pour un client: courbe de probabilité et frontière d'approbation.
+
+    Remplace des centaines d'appels /predict-one (ex. montant maximal approuvé,
+    revenu minimal) par une requête; rien n'est journalisé.
+    """
+    if req.max <= req.min:
+        raise HTTPException(status_code=400, detail="max doit être supérieur à min")
+    if req.variable == "LoanAmount" and req.min <= 0:
+        raise HTTPException(status_code=400, detail="LoanAmount doit être > 0")
+    m = registry.active
+    row = application_row(req.application.dict())
+
+    async def score(values: np.ndarray) -> np.ndarray:
+        with metrics.timed("predict"):
+            return (await score_frame_async(what_if_frame(row, req.variable, values), m))[1]
+
+    tolerance = req.tolerance or (req.max - req.min) / 10_000
     try:
-        pred = model.predict(df_fe)[0]
-        prob = float(model.predict_proba(df_fe)[0][1])
+        threshold = req.threshold if req.threshold is not None else m.decision.threshold
+        result = await sweep(score, req.min, req.max, req.points, threshold, tolerance)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur prédiction: {e}")
+    metrics.inc("rows_scored_total", result["evaluations"], help="Lignes scorées")
+    return {"variable": req.variable, "threshold": threshold, "tolerance": tolerance,
+            "model_version": m.version, **result}
 
-    # log
-    try:
-        log_predictions(df_fe, np.array([pred]), np.array([prob]))
-    except Exception:
-        pass  # logging best-effort
+EXPLAIN_QUERY = Query(False, description="Ajoute base_value et contribution_<variable> à chaque ligne "
+                                         "(unité dans l'en-tête X-Explanation-Output)")
 
-    return {"prediction": int(pred), "probability": prob}
 @app.post("/predict-batch-json")
-def predict_batch_json(clients: List[LoanApplication]):
+async def predict_batch_json(clients: List[LoanApplication], accept: Optional[str] = Header(None),
+                             explain: bool = EXPLAIN_QUERY):
+    """Score une liste de clients; format de réponse selon ``Accept`` (JSON par ligne par défaut).
+
+    Chaque ligne de réponse porte ``ApplicationDate``, null si le client ne l'a
+    pas fournie : le schéma ne dépend pas des autres lignes du batch.
+    """
     if not clients:
         raise HTTPException(status_code=400, detail="Liste vide.")
-    df = pd.DataFrame([c.dict() for c in clients])
-    df = clean_and_validate_batch(df)
-    df_fe = add_features(df)
-    df_fe = ensure_model_dtypes(df_fe)
+    fmt = response_format(accept)
+    m = registry.active
+    df, df_fe = await run_in_threadpool(prepare_batch, pd.DataFrame([c.dict(exclude_none=True) for c in clients]))
+
+    # seules les lignes absentes du cache passent par le modèle
+    n = len(df_fe)
+    preds = np.empty(n, dtype=np.int64)
+    probs = np.empty(n, dtype=float)
+    miss = np.arange(n)
+    if result_cache.enabled:
+        with metrics.timed("cache"):
+            context = cache_context(m)
+            keys = [profile_key(r, CATEGORICAL_COLUMNS, CACHE_KEY_NUMERIC)
+                    for r in df_fe[[*CATEGORICAL_COLUMNS, *CACHE_KEY_NUMERIC]].to_dict(orient="records")]
+            cached = result_cache.get_many(keys, context)
+            miss = np.array([i for i, hit in enumerate(cached) if hit is None], dtype=np.intp)
+            for i, hit in enumerate(cached):
+                if hit is not None:
+                    preds[i], probs[i] = hit
+    if len(miss):
+        try:
+            with metrics.timed("predict"):
+                preds[miss], probs[miss] = await score_frame_async(df_fe.iloc[miss] if len(miss) < n else df_fe, m)
+        except Exception as e:
+            # renvoie dtypes pour debug rapide
+            raise HTTPException(status_code=500, detail=f"Erreur prédiction batch: {e}; dtypes={df_fe.dtypes.to_dict()}")
+        if result_cache.enabled:
+            result_cache.put_many(((keys[i], (int(preds[i]), float(probs[i]))) for i in miss), context)
+
+    if DATE_COLUMN not in df.columns:
+        df[DATE_COLUMN] = pd.NaT  # aucune date fournie: colonne nulle, pas de recherche de taux en plus
+    explanation = await run_in_threadpool(explain_frame, df_fe, m) if explain else None
+    return await run_in_threadpool(finish_batch, df, df_fe, preds, probs, m, fmt, explanation)
+
+@app.post("/explain-batch")
+async def explain_batch(clients: List[LoanApplication], accept: Optional[str] = Header(None)):
+    """Décision, probabilité et contribution de chaque variable, pour une liste de clients.
+
+    Par ligne, ``base_value + somme des contribution_<variable>`` redonne la
+    sortie du modèle, en log-odds ou en probabilité selon l'en-tête
+    ``X-Explanation-Output`` : la probabilité renvoyée, calibrée comprise, sauf
+    si l'en-tête commence par ``uncalibrated_`` (sortie avant calibrage, cf.
+    ``backend.explain``). Rien n'est journalisé.
+    """
+    if not clients:
+        raise HTTPException(status_code=400, detail="Liste vide.")
+    fmt = response_format(accept)
+    m = registry.active
+    _, df_fe = await run_in_threadpool(prepare_batch, pd.DataFrame([c.dict(exclude_none=True) for c in clients]))
     try:
-        preds = model.predict(df_fe)
-        probs = model.predict_proba(df_fe)[:, 1]
+        with metrics.timed("predict"):
+            preds, probs = await score_frame_async(df_fe, m)
     except Exception as e:
-        # renvoie dtypes pour debug rapide
-        raise HTTPException(status_code=500, detail=f"Erreur prédiction batch: {e}; dtypes={df_fe.dtypes.to_dict()}")
+        raise HTTPException(status_code=500, detail=f"Erreur prédiction batch: {e}")
+    explanation = await run_in_threadpool(explain_frame, df_fe, m)
 
-    try:
-        log_predictions(df_fe, preds, probs)
-    except Exception:
-        pass
+    def render() -> Response:
+        with metrics.timed("serialize"):
+            out = pd.DataFrame({"prediction": preds, "probability": probs, "model_version": m.version})
+            headers = {"Vary": "Accept", **add_explanation(out, explanation, m)}
+            return encode(out, fmt, headers=headers)
 
-    out = df.copy()
-    out["prediction"] = preds
-    out["probability"] = probs
-    return JSONResponse(out.to_dict(orient="records"))
+    return await run_in_threadpool(render)
 
-@app.post("/predict-batch-file")
-async def predict_batch_file(file: UploadFile = File(...)):
-    filename = (file.filename or "").lower()
+def read_upload(fileobj, filename: str) -> pd.DataFrame:
+    with metrics.timed("parse"):
+        return _read_upload(fileobj, filename)
+
+def _read_upload(fileobj, filename: str) -> pd.DataFrame:
     try:
         if filename.endswith(".csv"):
-            # auto-détection du séparateur (utile pour CSV français)
-            df = pd.read_csv(file.file, sep=None, engine="python")
+            # séparateur détecté sur les premiers Ko (utile pour CSV français)
+            return read_csv_upload(fileobj)
         elif filename.endswith(".xlsx") or filename.endswith(".xls"):
-            df = pd.read_excel(file.file)
+            return pd.read_excel(fileobj)
         else:
             raise HTTPException(status_code=400, detail="Format non supporté. Utilisez .csv ou .xlsx")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Impossible de lire le fichier: {e}")
 
-    df = clean_and_validate_batch(df)
-    df_fe = add_features(df)
-    df_fe = ensure_model_dtypes(df_fe)
+def open_stream(fileobj, fmt: str, explain: bool = False) -> StreamingResponse:
+    # l'UploadFile est fermé dès la fin du handler: on garde notre propre copie sur disque
+    spool = tempfile.TemporaryFile()
+    try:
+        shutil.copyfileobj(fileobj, spool)
+        spool.seek(0)
+        chunks = read_csv_upload(spool, chunksize=STREAM_CHUNK_ROWS)
+        return stream_scores(chunks, fmt, on_close=spool.close, explain=explain)
+    except BaseException:
+        spool.close()
+        raise
+
+@app.post("/predict-batch-file")
+async def predict_batch_file(
+    file: UploadFile = File(...),
+    stream: Optional[Literal["csv", "ndjson"]] = Query(
+        None, description="Réponse en flux CSV/NDJSON, scorée par chunks (mémoire bornée)"),
+    accept: Optional[str] = Header(None),
+    explain: bool = EXPLAIN_QUERY,
+):
+    # lecture, nettoyage et sérialisation dans le threadpool; le scoring dans l'exécuteur dédié
+    filename = (file.filename or "").lower()
+    if stream is not None:
+        if not filename.endswith(".csv"):
+            raise HTTPException(status_code=400, detail="Le mode streaming n'accepte que les fichiers .csv")
+        return await run_in_threadpool(open_stream, file.file, stream, explain)
+
+    fmt = response_format(accept)
+    df = await run_in_threadpool(read_upload, file.file, filename)
+    m = registry.active
+    df, df_fe = await run_in_threadpool(prepare_batch, df)
 
     try:
-        preds = model.predict(df_fe)
-        probs = model.predict_proba(df_fe)[:, 1]
+        with metrics.timed("predict"):
+            preds, probs = await score_frame_async(df_fe, m)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur prédiction batch: {e}; dtypes={df_fe.dtypes.to_dict()}")
 
+    explanation = await run_in_threadpool(explain_frame, df_fe, m) if explain else None
+    return await run_in_threadpool(finish_batch, df, df_fe, preds, probs, m, fmt, explanation)
+
+@app.post("/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...)):
+    """Enregistre un CSV à scorer en tâche de fond; renvoie tout de suite l'identifiant du job."""
+    filename = file.filename or ""
+    if not filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Les jobs n'acceptent que les fichiers .csv")
+    state = await run_in_threadpool(job_store.create, file.file, filename)
+    job_queue.notify()
+    return {**progress(state), "status_url": f"/jobs/{state['id']}", "result_url": f"/jobs/{state['id']}/result"}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """Statut, lignes traitées et ETA d'un job."""
     try:
-        log_predictions(df_fe, preds, probs)
-    except Exception:
-        pass
+        return progress(job_store.read(job_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job inconnu: {job_id}")
 
-    out = df.copy()
-    out["prediction"] = preds
-    out["probability"] = probs
-    return JSONResponse(out.to_dict(orient="records"))
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """Scores du job terminé (CSV)."""
+    try:
+        state = job_store.read(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job inconnu: {job_id}")
+    if state["status"] != "done":
+        raise HTTPException(status_code=409, detail={"message": "Job non terminé", **progress(state)})
+    return FileResponse(job_store.result_path(job_id), media_type="text/csv",
+                        filename=f"scores_{Path(state['filename']).stem}.csv")
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Annule un job (en cours: arrêt au prochain chunk) et supprime ses fichiers."""
+    try:
+        return progress(job_store.cancel(job_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Job inconnu: {job_id}")
+
+@app.get("/models", dependencies=[Depends(require_admin)])
+def list_models():
+    """Versions du registre et modèle servi par ce worker."""
+    return {"active": registry.active.info(), "pointer": registry.active_pointer(), "versions": registry.versions()}
+
+@app.post("/models/reload", dependencies=[Depends(require_admin)])
+def reload_model():
+    """Relit le pointeur ACTIVE du registre (sans attendre la surveillance périodique)."""
+    try:
+        return {"status": "ok", "active": registry.reload().info()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rechargement impossible, modèle courant conservé: {e}")
+
+@app.post("/models/{version}/activate", dependencies=[Depends(require_admin)])
+def activate_model(version: str):
+    """Charge, préchauffe et active ``version``; les autres workers suivent via le pointeur ACTIVE."""
+    if version not in {v["version"] for v in registry.versions()}:
+        raise HTTPException(status_code=404, detail=f"Version inconnue: {version}")
+    try:
+        return {"status": "ok", "active": registry.activate(version, persist=True).info()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Activation impossible, modèle courant conservé: {e}")
 
 @app.post("/feedback")
 def save_feedback(feedback: dict):
     """Enregistre un feedback facultatif envoyé par un utilisateur."""
-    try:
-        df = pd.DataFrame([feedback])
-        df["timestamp"] = datetime.utcnow().isoformat()
+    record = {**feedback, "timestamp": datetime.utcnow().isoformat()}
+    if not feedback_log.submit([record]):
+        raise HTTPException(status_code=503, detail="Impossible d'enregistrer le feedback: file d'écriture saturée")
+    return {"status": "ok", "message": "Feedback enregistré"}
 
-        header = not FEEDBACK_LOG.exists()
-        df.to_csv(FEEDBACK_LOG, mode="a", index=False, header=header)
+@app.post("/outcomes", dependencies=[Depends(require_admin)])
+def record_outcomes(outcomes: List[LoanOutcome]):
+    """Enregistre les issues réelles de demandes (Loan_Status), avec les features vues par le modèle.
 
-        return {"status": "ok", "message": "Feedback enregistré"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Impossible d'enregistrer le feedback: {e}")
+    Lues par ``src/incremental_training.py``, qui met le modèle à jour à partir
+    des seules lignes ajoutées depuis son dernier checkpoint.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [{**application_row(o.dict()), "timestamp": now} for o in outcomes]
+    if not outcome_log.submit(rows):
+        raise HTTPException(status_code=503, detail="Impossible d'enregistrer les issues: file d'écriture saturée")
+    return {"status": "ok", "recorded": len(rows)}
     
 @app.get("/stats")
-def stats():
-    # Renvoie des stats simples pour la page admin
+def stats(
+    from_: datetime | None = Query(None, alias="from", description="Début (inclus), ISO 8601, UTC si naïf"),
+    to: datetime | None = Query(None, description="Fin (exclue), ISO 8601, UTC si naïf"),
+):
+    # Renvoie des stats simples pour la page admin (agrégats incrémentaux, cf. stats_store)
+    pred_log.flush()
+    if (from_ is not None or to is not None) and pred_store is None:
+        raise HTTPException(status_code=400,
+                            detail="Filtre temporel indisponible: le log CSV n'est pas horodaté (PRED_LOG_BACKEND=parquet)")
     try:
-        if not PRED_LOG_PATH.exists():
-            return {
-                "total": 0,
-                "approved_rate": 0.0,
-                "avg_prob": 0.0,
-                "class_counts": {"approved": 0, "rejected": 0},
-                "by_property_area": {},
-                "prob_hist": [],
-            }
-        df = pd.read_csv(PRED_LOG_PATH)
-        total = len(df)
-        approved = int((df["prediction"] == 1).sum())
-        rejected = total - approved
-        approved_rate = approved / total if total else 0.0
-        avg_prob = float(df["probability"].mean()) if total else 0.0
-
-        # group by Property_Area si dispo
-        if "Property_Area" in df.columns:
-            g = (df[df["prediction"]==1]
-                 .groupby("Property_Area")["prediction"].count()
-                 .sort_index())
-            by_area = {k: int(v) for k, v in g.to_dict().items()}
-        else:
-            by_area = {}
-
-        # histogramme des probabilités (bins 0.0..1.0 step 0.05)
-        bins = np.linspace(0, 1, 21)
-        hist, edges = np.histogram(df["probability"], bins=bins)
-        prob_hist = [{"bin": f"{edges[i]:.2f}-{edges[i+1]:.2f}", "count": int(hist[i])}
-                     for i in range(len(hist))]
-
-        return {
-            "total": int(total),
-            "approved_rate": float(approved_rate),
-            "avg_prob": float(avg_prob),
-            "class_counts": {"approved": int(approved), "rejected": int(rejected)},
-            "by_property_area": by_area,
-            "prob_hist": prob_hist,
-        }
+        if from_ is not None or to is not None:
+            # ne lit que les partitions/colonnes de la fenêtre
+            window = StatsAccumulator()
+            window.fold_frame(pred_store.query(from_, to, STATS_COLUMNS))
+            return window.summary()
+        if pred_store is None and not PRED_LOG_PATH.exists():
+            return dict(EMPTY_STATS)
+        pred_stats.refresh()
+        return pred_stats.summary() if pred_stats.total else dict(EMPTY_STATS)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur stats: {e}")
 
+@app.get("/drift")
+def drift(detail: bool = Query(False, description="Bornes et parts (référence, trafic) par classe")):
+    """PSI et écart de type KS par variable, trafic de la fenêtre glissante vs données d'entraînement."""
+    if drift_monitor is None:
+        raise HTTPException(status_code=404, detail="Suivi de dérive désactivé (DRIFT_MONITOR=0)")
+    m = registry.active
+    if m.drift_profile is None:
+        raise HTTPException(status_code=404, detail=f"Pas de profil de dérive pour le modèle {m.version} "
+                                                    "(python src/model_training.py --export)")
+    return {"model_version": m.version, "worker": os.getpid(), **drift_monitor.report(detail)}
+
 @app.get("/feedback-stats")
 def feedback_stats():
+    feedback_log.flush()
     try:
         if not FEEDBACK_LOG.exists():
             return {
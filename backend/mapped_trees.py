@@ -0,0 +1,288 @@
+"""Ensembles d'arbres en tableaux plats, projetables en mémoire (mmap).
+
+Dépicklé, un arbre sklearn recopie ses noeuds dans ses propres buffers
+(``Tree.__setstate__``) et un booster XGBoost reconstruit son modèle C++ :
+chaque processus qui charge l'artefact en a sa copie privée, même avec
+``joblib.load(mmap_mode="r")``. ``MappedTrees`` garde au contraire tous les
+arbres dans quelques tableaux numpy (feature, seuil, fils gauche / droit /
+valeur manquante, valeur des feuilles). Chargés avec ``mmap_mode="r"``, ces
+tableaux restent des pages du fichier, partagées par tous les workers à
+travers le cache de pages.
+
+Le parcours est vectorisé sur les couples (arbre, ligne), un niveau par pas,
+en ne gardant que les couples pas encore arrivés à une feuille (une feuille
+pointe sur elle-même). Les comparaisons et l'ordre des sommes reproduisent
+l'estimateur d'origine : entrées en float32, ``x < seuil`` et somme float32
+pour XGBoost, ``x <= seuil`` et moyenne float64 pour sklearn.
+
+L'estimateur d'origine reste dans l'artefact, picklé dans un tableau
+d'octets lui aussi projeté : jamais lu au service (donc jamais résident), il
+est rendu par ``native()`` pour le ré-entraînement.
+
+Les noeuds internes gardent leur valeur (probabilité du noeud pour sklearn,
+poids de base pour XGBoost) : ``contributions`` en déduit, pendant le même
+parcours, la part de chaque feature dans le score (cf. ``backend.explain``).
+"""
+from __future__ import annotations
+
+import json
+import pickle
+
+import numpy as np
+
+from .fast_scoring import UnsupportedPipeline
+
+CHUNK_CELLS = 1 << 20  # couples (arbre, ligne) par passe: borne la mémoire des gros batchs
+SKLEARN_TREES = ("DecisionTreeClassifier", "RandomForestClassifier", "ExtraTreesClassifier")
+
+
+class MappedTrees:
+    """Remplaçant d'inférence (``predict``, ``predict_proba``) d'un classifieur binaire à arbres."""
+
+    def __init__(self, trees: list[dict], combine: str, base: float, strict: bool, classes, n_features: int,
+                 native=None):
+        """``trees``: dicts de tableaux (feature, threshold, left, right, missing, value), feature -1 = feuille.
+
+        ``combine``: "mean" (moyenne des probabilités des feuilles) ou
+        "logistic" (sigmoïde de ``base`` + somme des feuilles).
+        """
+        sizes = [len(t["feature"]) for t in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+        leaf = np.concatenate([np.asarray(t["feature"]) < 0 for t in trees])
+        node = np.arange(len(leaf))
+
+        def child(key):
+            c = np.concatenate([np.asarray(t[key], dtype=np.intp) + off for t, off in zip(trees, offsets)])
+            return np.where(leaf, node, c).astype(np.int32)
+
+        # float32 (et somme float32) pour XGBoost, float64 pour sklearn
+        dtype = np.float32 if combine == "logistic" else np.float64
+        self.roots = offsets.astype(np.int32)
+        self.is_leaf = leaf
+        self.feature = np.where(leaf, 0, np.concatenate([t["feature"] for t in trees])).astype(np.int32)
+        self.threshold = np.concatenate([t["threshold"] for t in trees]).astype(np.float32 if strict else np.float64)
+        # fils gauche en 2 * noeud, fils droit en 2 * noeud + 1: un seul gather par pas
+        self.children = np.column_stack([child("left"), child("right")]).ravel()
+        self.missing = child("missing")
+        self.value = np.concatenate([t["value"] for t in trees]).astype(dtype)
+        self.combine, self.base, self.strict = combine, dtype(base), strict
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.source = type(native).__name__ if native is not None else None
+        self._native = None if native is None else np.frombuffer(pickle.dumps(native, protocol=5), dtype=np.uint8)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def native(self):
+        """Estimateur d'origine (dépicklé à chaque appel), None s'il n'a pas été conservé."""
+        return None if self._native is None else pickle.loads(self._native)
+
+    def tree_dicts(self) -> tuple[list[dict], str, float, bool]:
+        """Arbres séparés (indices locaux à chaque arbre), tels que les élague ``backend.cell_table``."""
+        bounds = [*self.roots.tolist(), self.n_nodes]
+        trees = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            leaf = self.is_leaf[start:stop]
+            trees.append({
+                "feature": np.where(leaf, -1, self.feature[start:stop]),
+                "threshold": self.threshold[start:stop],
+                "left": np.where(leaf, -1, self.children[2 * start:2 * stop:2] - start),
+                "right": np.where(leaf, -1, self.children[2 * start + 1:2 * stop:2] - start),
+                "value": np.asarray(self.value[start:stop], dtype=float),
+            })
+        return trees, self.combine, float(self.base), self.strict
+
+    # -----------------------------
+    # Inférence
+    # -----------------------------
+    def _leaves(self, X: np.ndarray, contrib: np.ndarray | None = None) -> np.ndarray:
+        """Feuille atteinte par chaque couple: tableau (arbres, lignes).
+
+        ``contrib`` (lignes x features, aplati): y ajoute, pour chaque split
+        franchi, l'écart de valeur entre le fils suivi et le noeud.
+        """
+        n, n_features = X.shape
+        flat = X.ravel()
+        node = np.repeat(self.roots, n)  # position k * n + i: arbre k, ligne i
+        offset = np.tile(np.arange(n, dtype=np.int32) * np.int32(n_features), self.n_trees)
+        active = None  # None: pas complets tant que la moitié des couples descend encore
+        while True:
+            cur = node if active is None else node[active]
+            cell = (offset if active is None else offset[active]) + self.feature[cur]
+            x = flat[cell]
+            go_right = ~(x < self.threshold[cur]) if self.strict else ~(x <= self.threshold[cur])
+            nxt = self.children[2 * cur + go_right]
+            nan = np.isnan(x)
+            if nan.any():
+                nxt = np.where(nan, self.missing[cur], nxt)
+            if contrib is not None:
+                # une feuille pointe sur elle-même: écart nul
+                delta = self.value[nxt].astype(np.float64) - self.value[cur]
+                contrib += np.bincount(cell, weights=delta, minlength=contrib.size)
+            if active is None:
+                node = nxt
+                live = ~self.is_leaf[node]
+                if 2 * np.count_nonzero(live) <= node.size:
+                    active = np.flatnonzero(live)
+            else:
+                node[active] = nxt
+                active = active[~self.is_leaf[nxt]]
+            if active is not None and not active.size:
+                return node.reshape(self.n_trees, n)
+
+    def _positive_proba(self, X: np.ndarray) -> np.ndarray:
+        # réduction sur l'axe 0 (arbres): sommes séquentielles, dans l'ordre de l'estimateur d'origine
+        values = self.value[self._leaves(X)]
+        if self.combine == "mean":
+            return values.sum(axis=0) / self.n_trees
+        margin = self.base + values.sum(axis=0, dtype=np.float32)
+        one = np.float32(1)
+        return one / (one + np.exp(-margin))
+
+    def _check(self, X) -> np.ndarray:
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"{self.n_features_in_} features attendues, reçu {X.shape}")
+        return X
+
+    def _chunks(self, X: np.ndarray):
+        step = max(1, CHUNK_CELLS // max(self.n_trees, 1))
+        return (X[i:i + step] for i in range(0, len(X), step))
+
+    def predict_proba(self, X) -> np.ndarray:
+        X = self._check(X)
+        p1 = np.concatenate([self._positive_proba(chunk) for chunk in self._chunks(X)] or
+                            [np.empty(0, dtype=self.value.dtype)])
+        return np.column_stack([1 - p1, p1])
+
+    def contributions(self, X) -> tuple[float, np.ndarray]:
+        """(biais, contributions lignes x features) le long des chemins de décision (méthode de Saabas).
+
+        Chaque split attribue à sa feature l'écart de valeur entre le fils suivi
+        et le noeud; le biais vient des racines. Biais + somme d'une ligne =
+        marge (XGBoost) ou probabilité (forêts sklearn) de la ligne.
+        """
+        X = self._check(X)
+        out = []
+        for chunk in self._chunks(X):
+            contrib = np.zeros(chunk.size)
+            self._leaves(chunk, contrib)
+            out.append(contrib.reshape(chunk.shape))
+        contrib = np.concatenate(out) if out else np.zeros(X.shape)
+        root = self.value[self.roots].astype(np.float64)
+        if self.combine == "mean":
+            return float(root.mean()), contrib / self.n_trees
+        return float(self.base) + float(root.sum()), contrib
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def __repr__(self) -> str:
+        return f"MappedTrees(source={self.source}, n_trees={self.n_trees}, n_nodes={self.n_nodes})"
+
+
+# -----------------------------
+# Conversion
+# -----------------------------
+def map_estimator(est, keep_native: bool = True) -> MappedTrees:
+    """``MappedTrees`` équivalent à ``est``; ``UnsupportedPipeline`` si l'estimateur n'est pas couvert.
+
+    ``keep_native``: conserver l'estimateur d'origine (artefacts servis, cf. ``native()``).
+    """
+    name = type(est).__name__
+    if name == "XGBClassifier":
+        args = _xgboost_arrays(est)
+    elif name in SKLEARN_TREES:
+        args = _sklearn_arrays(est)
+    else:
+        raise UnsupportedPipeline(f"estimateur non projetable: {name}")
+    if len(est.classes_) != 2:
+        raise UnsupportedPipeline("classifieur binaire attendu")
+    return MappedTrees(*args, est.classes_, est.n_features_in_, native=est if keep_native else None)
+
+
+def _xgboost_arrays(est) -> tuple[list[dict], str, float, bool]:
+    if not np.isnan(est.missing):
+        raise UnsupportedPipeline("XGBoost: valeur manquante non NaN")
+    learner = json.loads(est.get_booster().save_raw("json"))["learner"]
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise UnsupportedPipeline("XGBoost: seul le booster gbtree est supporté")
+    if learner["objective"]["name"] != "binary:logistic":
+        raise UnsupportedPipeline(f"XGBoost: objectif non supporté: {learner['objective']['name']}")
+    # marge de base calculée en float32, comme XGBoost: -log(1 / p - 1)
+    p = np.float32(learner["learner_model_param"]["base_score"].strip("[]").split(",")[0])
+    base = -np.log(np.float32(1) / p - np.float32(1))
+
+    model = learner["gradient_booster"]["model"]
+    n_trees = len(model["trees"])
+    best = getattr(est, "best_iteration", None)
+    if best is not None:
+        n_trees = min(n_trees, int(model["iteration_indptr"][best + 1]))
+    trees = []
+    for tree in model["trees"][:n_trees]:
+        if int(tree["tree_param"]["size_leaf_vector"]) > 1 or any(tree["split_type"]):
+            raise UnsupportedPipeline("XGBoost: feuilles vectorielles ou splits catégoriels non supportés")
+        left = np.asarray(tree["left_children"])
+        right = np.asarray(tree["right_children"])
+        leaf = left < 0
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        trees.append({
+            "feature": np.where(leaf, -1, tree["split_indices"]),
+            "threshold": conditions,
+            "left": left,
+            "right": right,
+            "missing": np.where(np.asarray(tree["default_left"], dtype=bool), left, right),
+            "value": _node_means(left, right, np.where(leaf, conditions, 0), tree["sum_hessian"]),
+        })
+    return trees, "logistic", float(base), True
+
+
+def _node_means(left: np.ndarray, right: np.ndarray, value: np.ndarray, cover) -> np.ndarray:
+    """Valeur des feuilles (split_conditions) et, aux noeuds internes, moyenne des feuilles du sous-arbre
+    pondérée par la couverture (hessienne), comme ``approx_contribs`` de XGBoost."""
+    value = value.astype(np.float64)
+    cover = np.asarray(cover, dtype=np.float64)
+    for node in range(len(left) - 1, -1, -1):  # les fils ont un identifiant plus grand que leur parent
+        l, r = left[node], right[node]
+        if l >= 0:
+            if min(l, r) <= node:
+                raise UnsupportedPipeline("XGBoost: numérotation des noeuds inattendue")
+            value[node] = (value[l] * cover[l] + value[r] * cover[r]) / cover[node]
+    return value
+
+
+def _sklearn_arrays(est) -> tuple[list[dict], str, float, bool]:
+    trees = []
+    for tree_est in getattr(est, "estimators_", [est]):
+        t = tree_est.tree_
+        if t.n_outputs != 1 or list(tree_est.classes_) != list(est.classes_):
+            raise UnsupportedPipeline("arbres binaires à une sortie attendus")
+        # proba de la classe positive par noeud, normalisée comme DecisionTreeClassifier.predict_proba
+        counts = t.value[:, 0, :]
+        totals = counts.sum(axis=1)
+        missing_left = getattr(t, "missing_go_to_left", np.zeros(t.node_count, dtype=bool)).astype(bool)
+        trees.append({
+            "feature": np.where(t.children_left < 0, -1, t.feature),
+            "threshold": t.threshold,
+            "left": t.children_left,
+            "right": t.children_right,
+            "missing": np.where(missing_left, t.children_left, t.children_right),
+            "value": np.divide(counts[:, 1], np.where(totals > 0, totals, 1)),
+        })
+    return trees, "mean", 0.0, False
+
+
+def mapping_gap(est, mapped: MappedTrees, X) -> float:
+    """Écart max de probabilité entre ``est`` et ``mapped`` sur ``X`` (inf si un label diffère)."""
+    ref, out = est.predict_proba(X)[:, 1], mapped.predict_proba(X)[:, 1]
+    if not np.array_equal(est.predict(X), mapped.predict(X)):
+        return float("inf")
+    return float(np.max(np.abs(ref - out), initial=0.0))
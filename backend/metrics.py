@@ -0,0 +1,215 @@
+"""Mesures légères par étape (histogrammes) et compteurs, exposés au format texte Prometheus.
+
+    with metrics.timed("clean"):
+        df = clean_and_validate_batch(df)
+
+L'endpoint courant est porté par une ``ContextVar`` posée par
+``MetricsMiddleware`` (elle suit la requête dans le threadpool de Starlette) :
+les hooks n'ont pas besoin de le recevoir en argument. Le middleware peut aussi
+renvoyer les durées de la requête dans un en-tête ``Server-Timing``.
+
+Chaque processus tient ses propres mesures (avec ``backend.serve``, un scrape
+porte sur le worker qui répond).
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Callable, Iterable
+
+# secondes; la dernière classe (+Inf) est implicite
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimings:
+    __slots__ = ("endpoint", "stages")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: dict[str, float] = {}  # étape -> durée cumulée (s)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)
+        self.sum = 0.0
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "t0")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, perf_counter() - self.t0)
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class Metrics:
+    def __init__(self, prefix: str = "loan", buckets: tuple[float, ...] = DEFAULT_BUCKETS, enabled: bool = True):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hist: dict[tuple[str, str], _Histogram] = {}
+        self._counters: dict[tuple[str, str], float] = {}
+        self._help: dict[str, str] = {}
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, str, list[tuple[dict, float]]]]]] = []
+
+    # -----------------------------
+    # Hooks
+    # -----------------------------
+    def timed(self, stage: str):
+        """Contexte qui mesure ``stage`` pour l'endpoint courant (sans effet si désactivé)."""
+        return _Stage(self, stage) if self.enabled else _NO_STAGE
+
+    def observe(self, stage: str, seconds: float, endpoint: str | None = None):
+        req = _current.get()
+        if req is not None:
+            req.stages[stage] = req.stages.get(stage, 0.0) + seconds
+            endpoint = endpoint or req.endpoint
+        key = (endpoint or "-", stage)
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = _Histogram(len(self.buckets))
+            h.counts[i] += 1
+            h.sum += seconds
+
+    def inc(self, name: str, value: float = 1, help: str = ""):
+        """Incrémente le compteur ``<prefix>_<name>`` de l'endpoint courant."""
+        if not self.enabled:
+            return
+        req = _current.get()
+        key = (name, req.endpoint if req is not None else "-")
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help and name not in self._help:
+                self._help[name] = help
+
+    def collector(self, fn: Callable[[], Iterable[tuple[str, str, str, list[tuple[dict, float]]]]]):
+        """Enregistre des séries calculées au scrape: ``fn()`` -> (nom, type, aide, [(labels, valeur)])."""
+        self._collectors.append(fn)
+        return fn
+
+    # -----------------------------
+    # Export
+    # -----------------------------
+    def render(self) -> str:
+        p = self.prefix
+        lines = [f"# HELP {p}_stage_duration_seconds Durée des étapes de traitement par endpoint",
+                 f"# TYPE {p}_stage_duration_seconds histogram"]
+        with self._lock:
+            hists = [(k, list(h.counts), h.sum) for k, h in sorted(self._hist.items())]
+            counters = sorted(self._counters.items())
+        for (endpoint, stage), counts, total in hists:
+            labels = f'endpoint="{_escape(endpoint)}",stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(f'{p}_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{p}_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"{p}_stage_duration_seconds_sum{{{labels}}} {total}")
+            lines.append(f"{p}_stage_duration_seconds_count{{{labels}}} {cumulative}")
+
+        seen = set()
+        for (name, endpoint), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {p}_{name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {p}_{name} counter")
+            lines.append(f'{p}_{name}{{endpoint="{_escape(endpoint)}"}} {_num(value)}')
+
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {p}_{name} {help}")
+                lines.append(f"# TYPE {p}_{name} {kind}")
+                for labels, value in samples:
+                    label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                    lines.append(f"{p}_{name}{{{label_text}}} {_num(value)}" if label_text else f"{p}_{name} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _num(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: pose le contexte de mesure, mesure la durée totale, ajoute ``Server-Timing``.
+
+    Le label ``endpoint`` est le chemin déclaré de la route (``/models/{version}/activate``),
+    ``other`` pour les chemins inconnus: pas un label par valeur d'URL.
+    """
+
+    def __init__(self, app, metrics: Metrics, server_timing: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+        self._static: dict[str, str] | None = None
+        self._templated: list = []
+
+    def _endpoint(self, scope) -> str:
+        if self._static is None:
+            # routes lues à la première requête (toutes déclarées à ce stade)
+            routes = [r for r in getattr(scope.get("app"), "routes", []) if hasattr(r, "path_regex")]
+            self._templated = [r for r in routes if "{" in r.path]
+            self._static = {r.path: r.path for r in routes if "{" not in r.path}
+        path = scope["path"]
+        endpoint = self._static.get(path)
+        if endpoint is None:
+            endpoint = next((r.path for r in self._templated if r.path_regex.match(path)), "other")
+        return endpoint
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+        req = RequestTimings(self._endpoint(scope))
+        token = _current.set(req)
+        t0 = perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                stages = {**req.stages, "total": perf_counter() - t0}
+                value = ", ".join(f"{name};dur={sec * 1000:.2f}" for name, sec in stages.items())
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"server-timing", value.encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.observe("total", perf_counter() - t0, req.endpoint)
+            _current.reset(token)
@@ -0,0 +1,419 @@
+"""Registre de modèles versionnés et rechargement à chaud.
+
+Arborescence::
+
+    models/registry/
+        ACTIVE                  # version active (une ligne)
+        <version>/model.pkl     # pipeline d'inférence (joblib), sans sampler
+        <version>/model.parity.npz  # lignes de référence et scores du pipeline (parité)
+        <version>/model.drift.json  # profil des données d'entraînement (/drift)
+        <version>/model.decision.json  # calibrateur et seuil d'approbation (backend.decision)
+        <version>/metadata.json # date d'entraînement, scores CV, ...
+
+Le modèle actif est un ``LoadedModel`` immuable : un handler le lit une seule
+fois au début de la requête et termine avec, même si un autre modèle est
+activé entre-temps. L'activation charge, vérifie et préchauffe le nouveau
+modèle *avant* de remplacer la référence (affectation atomique).
+
+Sans registre (pas de fichier ACTIVE), on sert ``models/serving_model.pkl``
+(à défaut ``models/best_model.pkl``).
+
+Les artefacts servis sont des ``sklearn.pipeline.Pipeline`` sans sampler : SMOTE
+ne fait rien à l'inférence, et sans lui le chargement n'importe pas imblearn.
+Les lignes de référence exportées avec l'artefact permettent de vérifier le
+moteur rapide au chargement sans pandas ni appel au pipeline.
+
+Les gros ensembles d'arbres y sont stockés en ``MappedTrees`` (tableaux plats,
+cf. ``backend.mapped_trees``) et les artefacts sont chargés avec
+``mmap_mode="r"`` : les workers qui chargent le même fichier partagent une
+seule copie des arbres, celle du cache de pages. Un artefact n'est donc
+jamais réécrit en place, il est remplacé (``os.replace``).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+import joblib
+import numpy as np
+
+from .decision import DecisionPolicy, read_decision, write_decision
+from .drift import build_profile, read_profile, write_profile
+from .explain import Explainer
+from .fast_scoring import UnsupportedPipeline
+from .lazy import lazy_import
+from .mapped_trees import MappedTrees, map_estimator, mapping_gap
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE = "ACTIVE"
+MODEL_FILE = "model.pkl"
+METADATA_FILE = "metadata.json"
+# en deçà, le gain mémoire ne compense pas le parcours NumPy, plus lent que le natif sur les gros batchs
+MAP_MIN_NODES = 200_000
+MAP_TOLERANCE = 1e-6
+
+
+class LoadedModel:
+    """Un modèle prêt à servir: pipeline, moteur rapide éventuel, version et artefact d'origine.
+
+    Les probabilités renvoyées sont celles du modèle passées par le calibrateur
+    de ``decision``, et les labels comparent ces probabilités à son seuil.
+    """
+
+    def __init__(self, version: str, pipeline, fast_scorer=None, metadata: dict | None = None,
+                 path: Path | None = None, drift_profile: dict | None = None,
+                 decision: DecisionPolicy | None = None):
+        self.version = version
+        self.pipeline = pipeline
+        self.fast_scorer = fast_scorer
+        self.metadata = metadata or {}
+        self.path = path
+        self.drift_profile = drift_profile  # profil de référence de /drift (None: artefact sans profil)
+        self.decision = decision or DecisionPolicy()
+        self.classes_ = pipeline.classes_
+        self._explainer: Explainer | None = None
+
+    def explainer(self) -> Explainer:
+        """Décomposition par feature (``backend.explain``), construite à la première demande.
+
+        ``UnsupportedPipeline`` si le modèle n'est pas explicable.
+        """
+        if self._explainer is None:
+            self._explainer = Explainer(self.pipeline, self.decision)
+        return self._explainer
+
+    def info(self) -> dict:
+        est = self.pipeline.steps[-1][1]
+        return {"version": self.version, "fast_scoring": self.fast_scorer is not None,
+                "scorer": getattr(self.fast_scorer, "kind", "pipeline"),
+                "estimator": repr(est) if isinstance(est, MappedTrees) else type(est).__name__,
+                "decision": self.decision.info(), **self.metadata}
+
+    # -----------------------------
+    # Scoring (moteur rapide s'il existe, sinon pipeline sklearn), puis couche de décision
+    # -----------------------------
+    def label_from_proba(self, prob: float) -> int:
+        """Label d'une probabilité calibrée (seuil de la couche de décision)."""
+        return int(self.classes_[1] if prob > self.decision.threshold else self.classes_[0])
+
+    def score_one(self, row: dict) -> tuple[int, float]:
+        """(label, probabilité calibrée) avec une seule passe ``predict_proba``."""
+        if self.fast_scorer is not None:
+            raw = self.fast_scorer.predict_proba_one(row)
+        else:
+            raw = float(self.pipeline.predict_proba(pd.DataFrame([row]))[0][1])
+        prob = self.decision.calibrate(raw)
+        return self.label_from_proba(prob), prob
+
+    def score_rows(self, rows: list[dict]) -> np.ndarray:
+        """Probabilités d'approbation calibrées pour des lignes déjà enrichies (une seule matrice)."""
+        if self.fast_scorer is not None:
+            return self.decision.calibrate(self.fast_scorer.predict_proba_rows(rows))
+        return self.decision.calibrate(self.pipeline.predict_proba(pd.DataFrame(rows))[:, 1])
+
+    def score_frame(self, df_fe: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """(labels, probabilités calibrées) pour un batch enrichi, en une seule passe predict_proba."""
+        if self.fast_scorer is not None:
+            probs = self.fast_scorer.predict_proba_frame(df_fe)
+        else:
+            probs = self.pipeline.predict_proba(df_fe)[:, 1]
+        probs = self.decision.calibrate(probs)
+        return np.where(probs > self.decision.threshold, self.classes_[1], self.classes_[0]), probs
+
+
+def serving_pipeline(pipeline, reference=None, map_min_nodes: int = MAP_MIN_NODES):
+    """Copie d'inférence de ``pipeline``: les samplers (SMOTE...) sont retirés.
+
+    Avec ``reference`` (DataFrame de features), un ensemble d'arbres d'au
+    moins ``map_min_nodes`` noeuds est remplacé par son ``MappedTrees``, s'il
+    donne les mêmes labels et probabilités (à ``MAP_TOLERANCE`` près) sur ces
+    lignes. Les autres étapes sont partagées, pas recopiées.
+    """
+    from sklearn.pipeline import Pipeline
+
+    steps = [(name, step) for name, step in pipeline.steps if not hasattr(step, "fit_resample")]
+    if reference is None:
+        return Pipeline(steps)
+    name, est = steps[-1]
+    try:
+        mapped = map_estimator(est)
+    except UnsupportedPipeline as e:
+        logger.info("Arbres non projetés: %s", e)
+        return Pipeline(steps)
+    if mapped.n_nodes < map_min_nodes:
+        return Pipeline(steps)
+    gap = mapping_gap(est, mapped, Pipeline(steps[:-1]).transform(_reference_rows(pipeline, reference)))
+    if gap > MAP_TOLERANCE:
+        logger.warning("Arbres non projetés: écart %.3g avec %s", gap, type(est).__name__)
+        return Pipeline(steps)
+    return Pipeline([*steps[:-1], (name, mapped)])
+
+
+def native_pipeline(pipeline):
+    """Inverse de la projection: ``MappedTrees`` remplacé par l'estimateur d'origine qu'il conserve."""
+    from sklearn.pipeline import Pipeline
+
+    name, est = pipeline.steps[-1]
+    if isinstance(est, MappedTrees) and est.native() is not None:
+        return Pipeline([*pipeline.steps[:-1], (name, est.native())])
+    return pipeline
+
+
+def load_artifact(path: Path, mmap: bool = True):
+    """Charge un artefact joblib; ``mmap``: tableaux numpy projetés en lecture seule, non recopiés."""
+    return joblib.load(path, mmap_mode="r" if mmap else None)
+
+
+def parity_path(model_path: Path) -> Path:
+    return Path(model_path).with_suffix(".parity.npz")
+
+
+def _input_columns(pipeline) -> list[str]:
+    """Colonnes lues par le préprocesseur."""
+    return [c for _, trans, cols in pipeline.steps[0][1].transformers_ if trans != "drop" for c in cols]
+
+
+def _reference_rows(pipeline, reference, max_rows: int = 1000):
+    """Lignes de ``reference`` réduites aux colonnes lues par le préprocesseur, sans valeurs manquantes."""
+    return reference[_input_columns(pipeline)].dropna().head(max_rows)
+
+
+def write_parity_reference(model_path: Path, pipeline, reference, max_rows: int = 1000) -> Path:
+    """Enregistre à côté de ``model_path`` des lignes de ``reference`` (DataFrame) et leurs scores.
+
+    Seules les colonnes lues par le préprocesseur sont gardées, sans valeurs manquantes.
+    """
+    reference = _reference_rows(pipeline, reference, max_rows)
+    arrays = {f"col:{c}": (reference[c].to_numpy() if pd.api.types.is_numeric_dtype(reference[c])
+                           else reference[c].to_numpy(dtype=str)) for c in reference.columns}
+    path = parity_path(model_path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    with open(tmp, "wb") as f:
+        np.savez(f, prediction=pipeline.predict(reference), probability=pipeline.predict_proba(reference)[:, 1],
+                 **arrays)
+    os.replace(tmp, path)
+    return path
+
+
+def read_parity_reference(model_path: Path) -> tuple[list[dict], dict, np.ndarray, np.ndarray] | None:
+    """(lignes, colonnes, labels, probabilités) exportés avec ``model_path``, None s'il n'y en a pas."""
+    try:
+        with np.load(parity_path(model_path)) as data:
+            columns = {k[4:]: data[k] for k in data.files if k.startswith("col:")}
+            pred, prob = data["prediction"], data["probability"]
+    except FileNotFoundError:
+        return None
+    rows = [dict(zip(columns, values)) for values in zip(*(a.tolist() for a in columns.values()))]
+    return rows, columns, pred, prob
+
+
+def write_drift_profile(model_path: Path, pipeline, reference, decision: dict | None = None) -> Path:
+    """Enregistre à côté de ``model_path`` le profil de dérive de ``reference`` (DataFrame d'entraînement).
+
+    Toutes les lignes comptent pour les variables d'entrée ; la répartition des
+    probabilités vient des lignes sans valeurs manquantes, passées par le
+    calibrateur de ``decision`` comme celles que sert l'API.
+    """
+    reference = reference[_input_columns(pipeline)]
+    probabilities = DecisionPolicy.from_dict(decision).calibrate(pipeline.predict_proba(reference.dropna())[:, 1])
+    return write_profile(model_path, build_profile(reference, probabilities))
+
+
+def file_version(path: Path) -> str:
+    """Version d'un artefact hors registre: empreinte de son contenu (lu par blocs)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def publish_model(registry_dir: Path, pipeline, metadata: dict[str, Any] | None = None,
+                  activate: bool = True, reference=None, decision: dict | None = None,
+                  map_min_nodes: int = MAP_MIN_NODES) -> str:
+    """Ajoute ``pipeline`` au registre (et l'active par défaut). Renvoie la version créée.
+
+    Le registre reçoit la copie d'inférence (``serving_pipeline``) et, si
+    ``reference`` (DataFrame) est fourni, ses lignes de référence pour la parité
+    (elles servent aussi à valider la projection des gros ensembles d'arbres)
+    et le profil de dérive. ``decision`` (cf. ``backend.decision.fit_decision``)
+    est la couche de décision servie avec le modèle, ``map_min_nodes`` le seuil
+    de projection des arbres (cf. ``serving_pipeline``).
+    Utilisé par ``src/model_training.py``; les workers qui surveillent le
+    registre basculent sur la nouvelle version sans redémarrage.
+    """
+    registry_dir = Path(registry_dir)
+    trained_at = datetime.now(timezone.utc)
+    tmp = registry_dir / f".publish-{os.getpid()}"
+    tmp.mkdir(parents=True, exist_ok=True)
+    pipeline = serving_pipeline(pipeline, reference, map_min_nodes)
+    joblib.dump(pipeline, tmp / MODEL_FILE)
+    if reference is not None:
+        write_parity_reference(tmp / MODEL_FILE, pipeline, reference)
+        write_drift_profile(tmp / MODEL_FILE, pipeline, reference, decision)
+    if decision is not None:
+        write_decision(tmp / MODEL_FILE, decision)
+    version = f"{trained_at:%Y%m%d-%H%M%S}-{file_version(tmp / MODEL_FILE)[:8]}"
+    meta = {"trained_at": trained_at.isoformat(), **(metadata or {}), "version": version}
+    (tmp / METADATA_FILE).write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+    os.replace(tmp, registry_dir / version)
+    if activate:
+        set_active(registry_dir, version)
+    return version
+
+
+def set_active(registry_dir: Path, version: str):
+    tmp = Path(registry_dir) / f".{ACTIVE_FILE}.{os.getpid()}"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, Path(registry_dir) / ACTIVE_FILE)
+
+
+class ModelRegistry:
+    """``prepare(pipeline, path)`` construit le moteur rapide; ``warmup(loaded)`` score quelques lignes.
+
+    ``mmap``: artefacts chargés avec ``mmap_mode="r"`` (cf. ``load_artifact``).
+    ``cost_ratio``: ratio de coût imposé à la couche de décision de chaque
+    version (None: celui choisi à l'entraînement).
+    """
+
+    def __init__(self, registry_dir: Path, fallback_path: Path,
+                 prepare: Callable[[Any], Any], warmup: Callable[[LoadedModel], None], mmap: bool = True,
+                 cost_ratio: float | None = None):
+        self.registry_dir = Path(registry_dir)
+        self.fallback_path = Path(fallback_path)
+        self.mmap = mmap
+        self.cost_ratio = cost_ratio
+        self._prepare = prepare
+        self._warmup = warmup
+        self._swap_lock = threading.Lock()
+        self._active: LoadedModel | None = None
+        self._pointer_mtime = None
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def active(self) -> LoadedModel:
+        return self._active
+
+    # -----------------------------
+    # Registre
+    # -----------------------------
+    def active_pointer(self) -> str | None:
+        try:
+            return (self.registry_dir / ACTIVE_FILE).read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self) -> list[dict]:
+        if not self.registry_dir.is_dir():
+            return []
+        out = []
+        for d in sorted(self.registry_dir.iterdir()):
+            if d.is_dir() and not d.name.startswith(".") and (d / MODEL_FILE).exists():
+                try:
+                    meta = json.loads((d / METADATA_FILE).read_text(encoding="utf-8"))
+                except (FileNotFoundError, ValueError):
+                    meta = {}
+                out.append({**meta, "version": d.name})
+        return out
+
+    # -----------------------------
+    # Chargement / activation
+    # -----------------------------
+    def load(self, version: str | None) -> LoadedModel:
+        """Charge et préchauffe ``version`` (None: modèle hors registre) sans l'activer."""
+        if version is None:
+            path, meta = self.fallback_path, {"source": self.fallback_path.name}
+            version = file_version(path)
+        else:
+            path = self.registry_dir / version / MODEL_FILE
+            if not path.exists():
+                raise FileNotFoundError(f"Version inconnue: {version}")
+            try:
+                meta = json.loads((path.parent / METADATA_FILE).read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                meta = {}
+            meta.pop("version", None)
+        pipeline = load_artifact(path, self.mmap)
+        decision = read_decision(path)
+        if decision is None and self.cost_ratio is not None:
+            logger.warning("DECISION_COST_RATIO=%g ignoré: pas de couche de décision pour %s (seuil 0,5)",
+                           self.cost_ratio, version)
+        loaded = LoadedModel(version, pipeline, self._prepare(pipeline, path), meta, path, read_profile(path),
+                             DecisionPolicy.from_dict(decision, self.cost_ratio))
+        self._warmup(loaded)
+        return loaded
+
+    def activate(self, version: str | None, persist: bool = False) -> LoadedModel:
+        """Charge, préchauffe puis bascule. ``persist`` met à jour ACTIVE pour les autres workers."""
+        with self._swap_lock:
+            target = version if version is not None else file_version(self.fallback_path)
+            if self._active is not None and self._active.version == target:
+                loaded = self._active
+            else:
+                loaded = self.load(version)
+                self._active = loaded  # bascule atomique: les requêtes en cours gardent l'ancien
+                logger.info("Modèle actif: %s", loaded.version)
+            if persist and version is not None:
+                set_active(self.registry_dir, version)
+            self._pointer_mtime = self._read_pointer_mtime()
+        return loaded
+
+    def load_initial(self) -> LoadedModel:
+        """Version pointée par ACTIVE, ou à défaut le modèle hors registre."""
+        pointer = self.active_pointer()
+        if pointer is not None:
+            try:
+                return self.activate(pointer)
+            except Exception as e:
+                logger.error("Version %s inutilisable, repli sur %s: %s", pointer, self.fallback_path.name, e)
+        return self.activate(None)
+
+    def reload(self) -> LoadedModel:
+        """Relit ACTIVE et bascule si la version pointée a changé."""
+        return self.activate(self.active_pointer())
+
+    # -----------------------------
+    # Surveillance du registre
+    # -----------------------------
+    def _read_pointer_mtime(self):
+        try:
+            return (self.registry_dir / ACTIVE_FILE).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def poll(self):
+        if self._read_pointer_mtime() != self._pointer_mtime:
+            try:
+                self.reload()
+            except Exception as e:
+                # on garde le modèle courant; nouvelle tentative au prochain changement
+                self._pointer_mtime = self._read_pointer_mtime()
+                logger.error("Rechargement du modèle impossible: %s", e)
+
+    def start_watching(self, interval: float):
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.poll()
+
+        self._watcher = threading.Thread(target=loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join(5)
+            self._watcher = None
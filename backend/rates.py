@@ -0,0 +1,104 @@
+"""Taux d'intérêt annuels (data/interest_rates.csv), source unique de l'API et des scripts.
+
+Le fichier est chargé dans deux tableaux triés (années, taux). Une recherche
+porte sur une année ou une date ; pour un batch, ``searchsorted`` résout toutes
+les lignes d'un coup. Le taux d'une année est celui de la dernière année connue
+qui la précède (ou la première connue pour une année antérieure au fichier).
+
+Le fichier est relu dès que sa date de modification change (vérifiée au plus
+toutes les ``check_interval`` secondes), sans redémarrage. Un fichier invalide
+est ignoré : on garde la table précédente.
+"""
+from __future__ import annotations
+
+import csv
+import logging
+import threading
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+logger = logging.getLogger(__name__)
+
+
+def read_rates(path: Path) -> tuple[np.ndarray, np.ndarray]:
+    # module csv: lu au démarrage, sans importer pandas
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if not {"year", "obs_value"} <= set(reader.fieldnames or []):
+            raise RuntimeError(f"Fichier '{Path(path).name}' invalide: colonnes attendues: year, obs_value")
+        pairs = [(r["year"], r["obs_value"]) for r in reader]
+    table = np.array([(float(y), float(v)) for y, v in pairs if y.strip() and v.strip()]).reshape(-1, 2)
+    table = table[~np.isnan(table).any(axis=1)]
+    if not len(table):
+        raise RuntimeError(f"Fichier '{Path(path).name}' vide")
+    table = table[np.argsort(table[:, 0], kind="stable")]
+    return table[:, 0].astype(np.int64), table[:, 1]
+
+
+class RateProvider:
+    def __init__(self, path: Path, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._mtime = self.path.stat().st_mtime_ns
+        # (années, taux) remplacés d'un bloc: un lecteur voit toujours une table cohérente
+        self._table = read_rates(self.path)
+
+    def _current_table(self) -> tuple[np.ndarray, np.ndarray]:
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            with self._lock:
+                if now - self._checked >= self.check_interval:
+                    self._checked = now
+                    self._reload_if_changed()
+        return self._table
+
+    def _reload_if_changed(self):
+        try:
+            mtime = self.path.stat().st_mtime_ns
+            if mtime == self._mtime:
+                return
+            self._table = read_rates(self.path)
+            self._mtime = mtime
+            logger.info("Taux d'intérêt rechargés depuis %s", self.path.name)
+        except Exception as e:
+            logger.error("Taux d'intérêt non rechargés, table précédente conservée: %s", e)
+
+    @property
+    def version(self) -> int:
+        """Change à chaque rechargement du fichier."""
+        self._current_table()
+        return self._mtime
+
+    # -----------------------------
+    # Recherches
+    # -----------------------------
+    def for_years(self, years) -> np.ndarray:
+        """Taux pour un tableau d'années (NaN: année courante)."""
+        known, values = self._current_table()
+        years = np.asarray(years, dtype=float)
+        years = np.where(np.isnan(years), datetime.now(timezone.utc).year, years)
+        idx = np.searchsorted(known, years, side="right") - 1
+        return values[np.clip(idx, 0, len(values) - 1)]
+
+    def for_dates(self, dates) -> np.ndarray:
+        """Taux pour des dates (Series/array datetime; NaT: année courante)."""
+        return self.for_years(pd.DatetimeIndex(dates).year.to_numpy(dtype=float, na_value=np.nan))
+
+    def for_year(self, year: int) -> float:
+        return float(self.for_years([year])[0])
+
+    def for_date(self, day: date | datetime | None = None) -> float:
+        """Taux à une date (aujourd'hui par défaut)."""
+        return self.for_year((day or datetime.now(timezone.utc)).year)
+
+    def current(self) -> float:
+        return self.for_date(None)
@@ -0,0 +1,125 @@
+"""Encodage des réponses batch selon l'en-tête ``Accept``.
+
+Formats proposés (le premier est celui par défaut, attendu par le frontend) :
+
+- ``application/json`` : une ligne par objet ``[{"Gender": ..., "prediction": ...}, ...]``;
+- ``application/vnd.loan.columns+json`` : une liste par colonne
+  ``{"rows": n, "columns": {"Gender": [...], "prediction": [...]}}``;
+- ``text/csv``;
+- ``application/vnd.apache.arrow.stream`` : flux Arrow IPC (si pyarrow est installé).
+
+Tous les formats sont encodés colonne par colonne depuis les tableaux NumPy
+(encodeur C de pandas, orjson, pyarrow), sans construire un dict Python par
+ligne comme ``to_dict(orient="records")`` + ``json``. Le JSON par ligne garde
+15 chiffres significatifs, comme le flux NDJSON.
+"""
+from __future__ import annotations
+
+import json
+from typing import Mapping
+
+import numpy as np
+from starlette.responses import Response
+
+from .lazy import lazy_import
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+try:
+    import orjson
+except ImportError:  # repli sur json (listes Python construites par tolist())
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow indisponible: le format n'est pas proposé
+    pa = None
+
+JSON_ROWS = "application/json"
+JSON_COLUMNS = "application/vnd.loan.columns+json"
+CSV = "text/csv"
+ARROW = "application/vnd.apache.arrow.stream"
+
+FORMATS = [JSON_ROWS, JSON_COLUMNS, CSV] + ([ARROW] if pa is not None else [])
+
+
+def negotiate(accept: str | None) -> str | None:
+    """Format à utiliser pour l'en-tête ``Accept`` (None si aucun n'est acceptable).
+
+    Respecte les poids ``q``; à poids égal, l'ordre de FORMATS départage
+    (``*/*`` ou en-tête absent: JSON par ligne).
+    """
+    if not accept or not accept.strip():
+        return JSON_ROWS
+    best, best_q = None, 0.0
+    for part in accept.split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        media = media.lower()
+        q = 1.0
+        for p in params:
+            key, _, value = p.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q <= 0:
+            continue
+        if media in ("*/*", "application/*"):
+            candidates = [JSON_ROWS]
+        elif media == "text/*":
+            candidates = [CSV]
+        else:
+            candidates = [f for f in FORMATS if f == media]
+        for fmt in candidates:
+            if q > best_q or (q == best_q and FORMATS.index(fmt) < FORMATS.index(best)):
+                best, best_q = fmt, q
+    return best
+
+
+def encode(df: pd.DataFrame, fmt: str, headers: Mapping[str, str] | None = None) -> Response:
+    """Réponse HTTP pour ``df`` au format ``fmt`` (une valeur de FORMATS)."""
+    if fmt == JSON_ROWS:
+        body = df.to_json(orient="records", force_ascii=False, double_precision=15)
+    elif fmt == JSON_COLUMNS:
+        body = encode_columns(df)
+    elif fmt == CSV:
+        body = df.to_csv(index=False)
+    elif fmt == ARROW and pa is not None:
+        body = encode_arrow(df)
+    else:
+        raise ValueError(f"Format de réponse inconnu: {fmt}")
+    return Response(body, media_type=fmt, headers=dict(headers or {}))
+
+
+def _column_values(values: pd.Series):
+    """Valeurs d'une colonne pour le JSON columnaire (tableau NumPy si orjson sait l'encoder)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # une seule chaîne par modalité; take() sur les codes, pas de boucle Python
+        labels = np.asarray(values.cat.categories, dtype=object)
+        codes = values.cat.codes.to_numpy()
+        out = labels.take(codes.clip(0))
+        if (codes < 0).any():
+            out[codes < 0] = None
+        return out.tolist()
+    array = values.to_numpy()
+    if array.dtype.kind == "f" and np.isnan(array).any():
+        return values.astype(object).where(values.notna(), None).tolist()
+    if orjson is not None and array.dtype.kind in "fiub":
+        return array
+    return array.tolist()
+
+
+def encode_columns(df: pd.DataFrame) -> bytes:
+    payload = {"rows": len(df), "columns": {c: _column_values(df[c]) for c in df.columns}}
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def encode_arrow(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
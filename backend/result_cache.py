@@ -0,0 +1,91 @@
+"""Cache LRU (avec TTL) des scores par profil de client.
+
+La clé est le profil normalisé (catégorielles nettoyées, numériques en float),
+taux d'intérêt de l'année de la demande compris. Le cache est lié à un
+« contexte » (la version du modèle) : dès que le contexte change, toutes les
+entrées sont invalidées.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Mapping, Sequence
+
+
+def profile_key(row: Mapping, categorical: Sequence[str], numeric: Sequence[str]) -> tuple:
+    return (tuple(str(row[c]).strip() for c in categorical)
+            + tuple(float(row[c]) for c in numeric))
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 10_000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, tuple[int, float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._context: Hashable = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _bind(self, context: Hashable):
+        # appelé sous verrou
+        if context != self._context:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._context = context
+
+    def get_many(self, keys: Sequence[Hashable], context: Hashable) -> list[tuple[int, float] | None]:
+        """Résultat (label, probabilité) par clé, ou None si absent/expiré."""
+        now = time.monotonic()
+        out: list[tuple[int, float] | None] = []
+        with self._lock:
+            self._bind(context)
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or entry[0] < now:
+                    if entry is not None:
+                        del self._data[key]
+                    self.misses += 1
+                    out.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    out.append(entry[1])
+        return out
+
+    def put_many(self, items: Iterable[tuple[Hashable, tuple[int, float]]], context: Hashable):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._bind(context)
+            for key, value in items:
+                self._data[key] = (expires, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get(self, key: Hashable, context: Hashable) -> tuple[int, float] | None:
+        return self.get_many([key], context)[0]
+
+    def put(self, key: Hashable, value: tuple[int, float], context: Hashable):
+        self.put_many([(key, value)], context)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {"size": size, "max_entries": self.max_entries, "ttl_seconds": self.ttl,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations}
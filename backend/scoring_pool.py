@@ -0,0 +1,107 @@
+"""Exécuteur dédié au scoring, hors de la boucle d'événements.
+
+- ``thread`` : pool de threads (XGBoost et numpy relâchent le GIL pendant le
+  calcul) ;
+- ``process`` : pool de processus. Chaque processus reçoit le modèle actif à
+  son démarrage (hérité par fork, donc partagé en copie sur écriture, là où
+  fork existe) et charge lui-même une nouvelle version, depuis son artefact
+  (projeté en mémoire comme dans le processus principal), à la première tâche
+  qui la demande.
+
+Les tâches transportent la version du modèle capturé par la requête (et sa
+couche de décision) : une requête en cours termine sur ce modèle même après
+une bascule.
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .lazy import lazy_import
+from .decision import DecisionPolicy
+from .model_registry import LoadedModel, load_artifact
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+EXECUTOR_KINDS = ("thread", "process")
+
+# -----------------------------
+# Côté processus de scoring
+# -----------------------------
+_worker_models: dict[str, LoadedModel] = {}
+_WORKER_MAX_MODELS = 2  # version active + précédente (requêtes en cours pendant une bascule)
+_worker_mmap = True
+
+
+def _init_worker(preloaded: LoadedModel, mmap: bool):
+    global _worker_mmap
+    _worker_models[preloaded.version] = preloaded
+    _worker_mmap = mmap
+
+
+def _worker_model(version: str, path: Path, scorer_cls: type | None, decision: DecisionPolicy) -> LoadedModel:
+    m = _worker_models.get(version)
+    if m is None:
+        # la parité du moteur rapide a déjà été vérifiée par le processus principal
+        pipeline = load_artifact(path, _worker_mmap)
+        m = LoadedModel(version, pipeline, scorer_cls(pipeline) if scorer_cls else None, path=path,
+                        decision=decision)
+        while len(_worker_models) >= _WORKER_MAX_MODELS:
+            _worker_models.pop(next(iter(_worker_models)))
+        _worker_models[version] = m
+    return m
+
+
+def scorer_class(m: LoadedModel) -> type | None:
+    """Classe du moteur de ``m``, reconstruit tel quel dans les processus de scoring."""
+    return type(m.fast_scorer) if m.fast_scorer is not None else None
+
+
+def _score_one(version: str, path: Path, scorer_cls: type | None, decision: DecisionPolicy,
+               row: dict) -> tuple[int, float]:
+    return _worker_model(version, path, scorer_cls, decision).score_one(row)
+
+
+def _score_frame(version: str, path: Path, scorer_cls: type | None, decision: DecisionPolicy,
+                 df_fe: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    return _worker_model(version, path, scorer_cls, decision).score_frame(df_fe)
+
+
+# -----------------------------
+# Côté API
+# -----------------------------
+class ScoringExecutor:
+    def __init__(self, kind: str, workers: int, preload: LoadedModel, mmap: bool = True):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Exécuteur inconnu: {kind!r} (attendu: {', '.join(EXECUTOR_KINDS)})")
+        self.kind = kind
+        self.workers = workers
+        self._pool: Executor
+        if kind == "thread":
+            self._pool = ThreadPoolExecutor(workers, thread_name_prefix="scoring")
+        else:
+            ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else None
+            self._pool = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                                             initargs=(preload, mmap))
+
+    def start(self, warmup_row: dict, m: LoadedModel) -> "ScoringExecutor":
+        """Démarre tous les workers tout de suite (et les préchauffe), pas à la première requête."""
+        for fut in [self.submit_one(warmup_row, m) for _ in range(self.workers)]:
+            fut.result()
+        return self
+
+    def submit_one(self, row: dict, m: LoadedModel) -> Future:
+        if self.kind == "thread":
+            return self._pool.submit(m.score_one, row)
+        return self._pool.submit(_score_one, m.version, m.path, scorer_class(m), m.decision, row)
+
+    def submit_frame(self, df_fe: pd.DataFrame, m: LoadedModel) -> Future:
+        if self.kind == "thread":
+            return self._pool.submit(m.score_frame, df_fe)
+        return self._pool.submit(_score_frame, m.version, m.path, scorer_class(m), m.decision, df_fe)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,118 @@
+"""Lanceur multi-workers de l'API (modèle partagé en copie sur écriture).
+
+Le processus maître importe ``backend.main`` (modèle, moteur rapide, taux,
+registre) puis ouvre la socket d'écoute et forke N workers uvicorn. Les
+workers héritent du modèle déjà chargé : les pages mémoire restent partagées
+tant qu'elles ne sont pas modifiées (``gc.freeze`` évite que le ramasse-miettes
+ne les touche). Un worker qui meurt est relancé.
+
+    python -m backend.serve --workers 4 --port 8000
+    SCORING_EXECUTOR=thread SCORING_WORKERS=2 python -m backend.serve --workers 4
+
+Chaque worker a sa propre boucle d'événements, son cache de résultats et son
+writer de logs (les logs sont prévus pour plusieurs écrivains). OMP_NUM_THREADS
+vaut 1 par défaut : un cœur par worker, sans sur-souscription des threads
+OpenMP de XGBoost. Sans fork (Windows), repli sur ``uvicorn --workers`` :
+chaque worker charge alors son propre modèle.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import socket
+import sys
+
+os.environ.setdefault("OMP_NUM_THREADS", "1")  # avant tout import de numpy/XGBoost
+
+
+def run_worker(sock: socket.socket, args) -> None:
+    import uvicorn
+
+    from . import main
+
+    config = uvicorn.Config(main.app, log_level=args.log_level, loop=args.loop, timeout_keep_alive=5)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            run_worker(sock, args)
+        except BaseException:
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(args) -> None:
+    import gc
+
+    from . import main  # noqa: F401  (chargé une fois, avant le fork)
+
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    stopping = False
+    workers: set[int] = set()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    workers.update(spawn(sock, args) for _ in range(args.workers))
+    print(f"{args.workers} workers sur http://{args.host}:{args.port} (pid maître {os.getpid()})", flush=True)
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"worker {pid} arrêté (statut {status}), relance", file=sys.stderr, flush=True)
+            workers.add(spawn(sock, args))
+    sock.close()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--loop", default="auto", choices=["auto", "asyncio", "uvloop"])
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        import uvicorn
+
+        print("fork indisponible: chaque worker charge son propre modèle", file=sys.stderr)
+        uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers,
+                    loop=args.loop, log_level=args.log_level)
+        return
+    serve(args)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,248 @@
+"""Agrégats incrémentaux du log de prédictions (pour /stats).
+
+Les compteurs (total, approbations, somme des probabilités, approbations par
+Property_Area, histogramme 20 classes) sont mis à jour à chaque écriture du
+log et persistés dans un petit snapshot JSON à côté du log.
+
+- ``PredictionStats`` (log CSV) mémorise l'offset (octets) du CSV couvert :
+  si un autre worker a écrit entre-temps, seule la fin du fichier au-delà de
+  cet offset est relue ; le CSV complet n'est relu que si le snapshot est
+  absent (ou si le log a été tronqué).
+- ``SharedPredictionStats`` (log columnaire) met à jour le snapshot sous
+  verrou de fichier à chaque écriture ; il n'est reconstruit à partir des
+  segments que s'il est absent.
+"""
+from __future__ import annotations
+
+import io
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Mapping
+
+import numpy as np
+
+from .lazy import lazy_import
+from .log_sink import file_lock
+
+pd = lazy_import("pandas")  # importé au premier usage (cf. backend.lazy)
+
+logger = logging.getLogger(__name__)
+
+HIST_BINS = np.linspace(0, 1, 21)  # 0.0..1.0 pas de 0.05, comme l'ancien /stats
+STATS_COLUMNS = ["prediction", "probability", "Property_Area"]
+
+EMPTY_STATS = {
+    "total": 0,
+    "approved_rate": 0.0,
+    "avg_prob": 0.0,
+    "class_counts": {"approved": 0, "rejected": 0},
+    "by_property_area": {},
+    "prob_hist": [],
+}
+
+
+class StatsAccumulator:
+    """Compteurs de /stats, alimentables par paquets et sérialisables en JSON."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self.total = 0
+        self.approved = 0
+        self.prob_sum = 0.0
+        self.prob_count = 0
+        self.by_area: dict[str, int] = {}
+        self.hist = np.zeros(len(HIST_BINS) - 1, dtype=np.int64)
+
+    def fold(self, preds: np.ndarray, probs: np.ndarray, areas: np.ndarray | None):
+        approved = preds == 1
+        probs = probs[~np.isnan(probs)]
+        self.total += len(preds)
+        self.approved += int(approved.sum())
+        self.prob_sum += float(probs.sum())
+        self.prob_count += len(probs)
+        self.hist += np.histogram(probs, bins=HIST_BINS)[0]
+        if areas is not None:
+            for area in areas[approved]:
+                if area is not None and area == area:  # ni None ni NaN (sans pandas: chemin de /predict-one)
+                    self.by_area[str(area)] = self.by_area.get(str(area), 0) + 1
+
+    def fold_records(self, records: list[Mapping]):
+        self.fold(np.array([r.get("prediction") for r in records], dtype=float),
+                  np.array([r.get("probability") for r in records], dtype=float),
+                  np.array([r.get("Property_Area") for r in records], dtype=object))
+
+    def fold_frame(self, df: pd.DataFrame):
+        if len(df):
+            areas = df["Property_Area"].to_numpy(dtype=object) if "Property_Area" in df.columns else None
+            self.fold(df["prediction"].to_numpy(dtype=float), df["probability"].to_numpy(dtype=float), areas)
+
+    def summary(self) -> dict:
+        """Même schéma que l'ancien /stats calculé à partir du CSV complet."""
+        total = self.total
+        edges = HIST_BINS
+        return {
+            "total": int(total),
+            "approved_rate": float(self.approved / total) if total else 0.0,
+            "avg_prob": float(self.prob_sum / self.prob_count) if self.prob_count else 0.0,
+            "class_counts": {"approved": int(self.approved), "rejected": int(total - self.approved)},
+            "by_property_area": {k: int(self.by_area[k]) for k in sorted(self.by_area)},
+            "prob_hist": [{"bin": f"{edges[i]:.2f}-{edges[i+1]:.2f}", "count": int(self.hist[i])}
+                          for i in range(len(self.hist))],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "offset": self.offset,
+            "total": self.total,
+            "approved": self.approved,
+            "prob_sum": self.prob_sum,
+            "prob_count": self.prob_count,
+            "by_area": self.by_area,
+            "hist": self.hist.tolist(),
+        }
+
+    def load_dict(self, snap: dict):
+        self.offset = int(snap["offset"])
+        self.total = int(snap["total"])
+        self.approved = int(snap["approved"])
+        self.prob_sum = float(snap["prob_sum"])
+        self.prob_count = int(snap["prob_count"])
+        self.by_area = {str(k): int(v) for k, v in snap["by_area"].items()}
+        self.hist = np.asarray(snap["hist"], dtype=np.int64)
+        if len(self.hist) != len(HIST_BINS) - 1:
+            raise ValueError("histogramme incompatible")
+
+
+def _read_snapshot(acc: StatsAccumulator, path: Path) -> bool:
+    """Charge ``path`` dans ``acc``. Renvoie False (et remet à zéro) si absent ou illisible."""
+    try:
+        acc.load_dict(json.loads(path.read_text(encoding="utf-8")))
+        return True
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("Snapshot %s illisible, reconstruction: %s", path.name, e)
+    acc._reset()
+    return False
+
+
+def _write_snapshot(acc: StatsAccumulator, path: Path):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        tmp.write_text(json.dumps(acc.to_dict()), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("Snapshot %s non écrit: %s", path.name, e)
+
+
+class PredictionStats(StatsAccumulator):
+    """Agrégats du log CSV, rattrapés par offset d'octets."""
+
+    def __init__(self, log_path: Path, snapshot_path: Path | None = None):
+        super().__init__()
+        self.log_path = Path(log_path)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else self.log_path.with_suffix(".stats.json")
+        self._lock = threading.Lock()
+        _read_snapshot(self, self.snapshot_path)
+
+    def observe(self, records: list[Mapping], start: int, end: int):
+        """Hook du LogSink: ``records`` viennent d'être écrits entre les octets ``start`` et ``end``."""
+        with self._lock:
+            if start != self.offset:
+                # un autre worker a écrit avant nous: refresh() relira la fin du fichier
+                return
+            self.fold_records(records)
+            self.offset = end
+            _write_snapshot(self, self.snapshot_path)
+
+    def refresh(self):
+        """Rattrape les lignes écrites au-delà de l'offset connu (autres workers, snapshot ancien)."""
+        with self._lock:
+            if not self.log_path.exists():
+                if self.offset:
+                    self._reset()
+                    _write_snapshot(self, self.snapshot_path)
+                return
+            size = self.log_path.stat().st_size
+            if size == self.offset:
+                return
+            if size < self.offset:
+                logger.warning("Log %s tronqué: reconstruction des stats", self.log_path.name)
+                self._reset()
+            self._consume_tail(size)
+            _write_snapshot(self, self.snapshot_path)
+
+    def _consume_tail(self, size: int):
+        with open(self.log_path, "rb") as f:
+            header = f.readline()
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        # ignore une éventuelle ligne en cours d'écriture par un autre worker
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        if not chunk:
+            return
+        consumed = len(chunk)
+        if self.offset > 0:
+            chunk = header + chunk
+        self.fold_frame(pd.read_csv(io.BytesIO(chunk), usecols=lambda c: c in STATS_COLUMNS))
+        self.offset += consumed
+
+    def summary(self) -> dict:
+        with self._lock:
+            return super().summary()
+
+
+class SharedPredictionStats(StatsAccumulator):
+    """Agrégats partagés entre workers: lecture-modification-écriture du snapshot sous verrou.
+
+    ``rebuild`` renvoie un DataFrame (colonnes ``STATS_COLUMNS``) couvrant tout
+    l'historique ; il n'est appelé que si le snapshot est absent.
+    """
+
+    def __init__(self, snapshot_path: Path, rebuild: Callable[[], pd.DataFrame]):
+        super().__init__()
+        self.snapshot_path = Path(snapshot_path)
+        self._lock_path = self.snapshot_path.with_suffix(".lock")
+        self._rebuild = rebuild
+        self._lock = threading.Lock()
+        self._mtime = None
+
+    def observe(self, records: list[Mapping], start=None, end=None):
+        with self._lock, file_lock(self._lock_path):
+            if self._load_or_rebuild():
+                # (une reconstruction inclut déjà ces lignes, écrites avant le hook)
+                self.fold_records(records)
+                _write_snapshot(self, self.snapshot_path)
+                self._mtime = self.snapshot_path.stat().st_mtime_ns
+
+    def refresh(self):
+        """Recharge le snapshot s'il a été modifié par un autre worker."""
+        with self._lock:
+            try:
+                mtime = self.snapshot_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime is not None and mtime == self._mtime:
+                return
+            with file_lock(self._lock_path):
+                self._load_or_rebuild()
+
+    def _load_or_rebuild(self) -> bool:
+        """Charge le snapshot; s'il est absent, le reconstruit et renvoie False."""
+        loaded = _read_snapshot(self, self.snapshot_path)
+        if not loaded:
+            logger.info("Snapshot %s absent: reconstruction depuis le log", self.snapshot_path.name)
+            self.fold_frame(self._rebuild())
+            _write_snapshot(self, self.snapshot_path)
+        self._mtime = self.snapshot_path.stat().st_mtime_ns
+        return loaded
+
+    def summary(self) -> dict:
+        with self._lock:
+            return super().summary()
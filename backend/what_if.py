@@ -0,0 +1,80 @@
+"""Balayage « what-if » d'une variable et recherche de la frontière d'approbation.
+
+La courbe est évaluée en un seul appel sur une grille régulière. Chaque
+changement de décision entre deux points voisins est ensuite affiné par
+k-section groupée : à chaque tour, ``refine_points`` points intérieurs de
+chaque intervalle encore trop large sont scorés ensemble, en un seul appel.
+L'intervalle se réduit d'un facteur ``refine_points + 1`` par tour.
+
+Un changement de décision plus étroit que le pas de la grille initiale peut
+passer inaperçu : augmenter ``points`` pour un modèle très irrégulier.
+"""
+from __future__ import annotations
+
+from typing import Awaitable, Callable
+
+import numpy as np
+
+ScoreValues = Callable[[np.ndarray], Awaitable[np.ndarray]]
+
+
+async def sweep(score: ScoreValues, lo: float, hi: float, points: int, threshold: float,
+                tolerance: float, refine_points: int = 15, max_rounds: int = 20) -> dict:
+    """Courbe de ``score`` sur [lo, hi] et frontières (décision: probabilité > ``threshold``).
+
+    ``score(values)`` renvoie les probabilités d'approbation pour un tableau de
+    valeurs de la variable balayée. Chaque frontière est donnée par la valeur
+    approuvée la plus proche du changement de décision (à ``tolerance`` près),
+    et ``approved`` indique de quel côté se trouvent les valeurs approuvées.
+    """
+    values = np.linspace(lo, hi, points)
+    probs = np.asarray(await score(values), dtype=float)
+    above = probs > threshold
+    calls, evaluations = 1, len(values)
+
+    idx = np.flatnonzero(above[:-1] != above[1:])
+    left, right = values[idx].copy(), values[idx + 1].copy()
+    left_above = above[idx]
+    steps = np.arange(1, refine_points + 1) / (refine_points + 1)
+    for _ in range(max_rounds):
+        open_ = np.flatnonzero(right - left > tolerance)
+        if not len(open_):
+            break
+        # points intérieurs de tous les intervalles ouverts, scorés en un seul appel
+        grid = left[open_, None] + (right - left)[open_, None] * steps
+        sub = np.asarray(await score(grid.ravel()), dtype=float).reshape(grid.shape) > threshold
+        calls += 1
+        evaluations += grid.size
+        for row, k in enumerate(open_):
+            flipped = np.flatnonzero(sub[row] != left_above[k])
+            if len(flipped):
+                j = flipped[0]
+                right[k] = grid[row, j]
+                if j > 0:
+                    left[k] = grid[row, j - 1]
+            else:
+                left[k] = grid[row, -1]
+
+    boundaries = [{"value": float(l if a else r), "approved": "below" if a else "above",
+                   "width": float(r - l)} for l, r, a in zip(left, right, left_above)]
+
+    # intervalles approuvés de [lo, hi], bornés par les valeurs approuvées des frontières
+    intervals, start = [], (float(values[0]) if above[0] else None)
+    for b in boundaries:
+        if b["approved"] == "below":
+            intervals.append([start, b["value"]])
+            start = None
+        else:
+            start = b["value"]
+    if start is not None:
+        intervals.append([start, float(values[-1])])
+
+    return {
+        "curve": {"values": values.tolist(), "probabilities": probs.tolist()},
+        "boundaries": boundaries,
+        "approved_intervals": intervals,
+        "min_approved": intervals[0][0] if intervals else None,
+        "max_approved": intervals[-1][1] if intervals else None,
+        "evaluations": evaluations,
+        "model_calls": calls,
+    }
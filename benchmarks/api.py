@@ -0,0 +1,276 @@
+"""Banc de charge de l'API : débit et latences p50/p95/p99, comparés à une référence.
+
+Scénarios (``--scenarios``) : predict-one, predict-batch-json (``--batch-size``
+demandeurs par requête), predict-batch-file (CSV de ``--file-rows`` lignes) et
+stats. Chaque scénario tourne ``--duration`` secondes avec ``--concurrency``
+clients simultanés, sur des demandeurs synthétiques tirés des distributions de
+data/loan_clean.csv.
+
+Sans ``--url``, l'application est démarrée dans ce processus (uvicorn dans un
+thread, log de prédictions dans un dossier temporaire) : pratique pour
+comparer deux révisions sur une même machine, mais client et serveur se
+partagent le GIL. Avec ``--url``, le banc vise un serveur déjà lancé
+(``python -m backend.serve``...).
+
+    python -m benchmarks.api --output bench.json
+    python -m benchmarks.api --baseline benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.api --url http://127.0.0.1:8000 --concurrency 64 --save-baseline benchmarks/baseline.json
+
+Avec ``--baseline``, tout scénario dont le débit baisse ou dont la latence p95
+augmente de plus de ``--threshold`` (fraction) est signalé et le code de
+sortie vaut 1.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA = ROOT / "data" / "loan_clean.csv"
+CATEGORICAL = ["Gender", "Married", "Dependents", "Education", "Self_Employed", "Property_Area"]
+NUMERIC = ["ApplicantIncome", "CoapplicantIncome", "LoanAmount"]
+SCENARIOS = ["predict-one", "predict-batch-json", "predict-batch-file", "stats"]
+
+
+# -----------------------------
+# Demandeurs synthétiques
+# -----------------------------
+class SyntheticApplicants:
+    """Catégorielles selon leurs fréquences observées, numériques par quantiles empiriques interpolés."""
+
+    def __init__(self, path: Path = DATA, seed: int = 0):
+        data = pd.read_csv(path, dtype={"Dependents": str})
+        self.rng = np.random.default_rng(seed)
+        self.freqs = {c: data[c].dropna().value_counts(normalize=True) for c in CATEGORICAL}
+        self.levels = np.linspace(0, 1, 101)
+        self.quantiles = {c: np.quantile(data[c].dropna(), self.levels) for c in NUMERIC}
+
+    def frame(self, n: int) -> pd.DataFrame:
+        cols = {c: self.rng.choice(f.index.to_numpy(), size=n, p=f.to_numpy()) for c, f in self.freqs.items()}
+        for c, q in self.quantiles.items():
+            cols[c] = np.round(np.interp(self.rng.random(n), self.levels, q), 2)
+        return pd.DataFrame(cols)[CATEGORICAL + NUMERIC]
+
+    def records(self, n: int) -> list[dict]:
+        return self.frame(n).to_dict(orient="records")
+
+    def csv(self, n: int) -> bytes:
+        buf = io.StringIO()
+        self.frame(n).to_csv(buf, index=False)
+        return buf.getvalue().encode()
+
+
+# -----------------------------
+# Scénarios
+# -----------------------------
+def build_requests(name: str, gen: SyntheticApplicants, args) -> list:
+    """Requêtes pré-générées (rejouées en boucle) : la génération n'entre pas dans les mesures."""
+    if name == "predict-one":
+        return [dict(json=r) for r in gen.records(2000)]
+    if name == "predict-batch-json":
+        return [dict(json=gen.records(args.batch_size)) for _ in range(16)]
+    if name == "predict-batch-file":
+        return [dict(files={"file": ("bench.csv", gen.csv(args.file_rows), "text/csv")}) for _ in range(4)]
+    return [{}]
+
+
+def rows_per_request(name: str, args) -> int:
+    return {"predict-batch-json": args.batch_size, "predict-batch-file": args.file_rows}.get(name, 1)
+
+
+async def run_scenario(url: str, name: str, requests: list, concurrency: int, duration: float,
+                       warmup: float = 1.0) -> dict:
+    method = "GET" if name == "stats" else "POST"
+    latencies: list[float] = []
+    errors = 0
+    measuring = False
+
+    async def user(k: int, http: httpx.AsyncClient, deadline: float):
+        nonlocal errors
+        i = k
+        while time.perf_counter() < deadline:
+            req = requests[i % len(requests)]
+            i += concurrency
+            t0 = time.perf_counter()
+            try:
+                r = await http.request(method, f"/{name}", **req)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if measuring:
+                latencies.append(time.perf_counter() - t0)
+                errors += not ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as http:
+        if warmup > 0:
+            deadline = time.perf_counter() + warmup
+            await asyncio.gather(*(user(k, http, deadline) for k in range(concurrency)))
+        measuring = True
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(user(k, http, deadline) for k in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    lat = np.array(latencies) * 1000 if latencies else np.array([np.nan])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "mean_ms": float(np.mean(lat)),
+    }
+
+
+# -----------------------------
+# Serveur dans le processus
+# -----------------------------
+class InProcessServer:
+    """L'application servie par uvicorn dans un thread, sur un port libre."""
+
+    def __init__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix="loan-bench-")
+        os.environ.setdefault("PRED_LOG_DIR", self._tmp.name)
+        import uvicorn
+
+        from backend import main
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(main.app, port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "InProcessServer":
+        self.thread.start()
+        deadline = time.monotonic() + 60
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("serveur non démarré")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(30)
+        self._tmp.cleanup()
+
+
+# -----------------------------
+# Résultats & comparaison
+# -----------------------------
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Régressions (débit en baisse ou p95 en hausse au-delà de ``threshold``)."""
+    regressions = []
+    for name, cur in current["scenarios"].items():
+        ref = baseline.get("scenarios", {}).get(name)
+        if ref is None:
+            continue
+        if ref["throughput_rps"] > 0 and cur["throughput_rps"] < ref["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: débit {cur['throughput_rps']:.1f} req/s "
+                               f"(référence {ref['throughput_rps']:.1f}, {cur['throughput_rps'] / ref['throughput_rps'] - 1:+.0%})")
+        if ref["p95_ms"] > 0 and cur["p95_ms"] > ref["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {cur['p95_ms']:.1f} ms "
+                               f"(référence {ref['p95_ms']:.1f}, {cur['p95_ms'] / ref['p95_ms'] - 1:+.0%})")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict | None):
+    print(f"{'scénario':20s} {'req/s':>9s} {'lignes/s':>10s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'erreurs':>7s}")
+    for name, r in results["scenarios"].items():
+        line = (f"{name:20s} {r['throughput_rps']:9.1f} {r['rows_per_s']:10.1f} {r['p50_ms']:6.1f}ms "
+                f"{r['p95_ms']:6.1f}ms {r['p99_ms']:6.1f}ms {r['errors']:7d}")
+        ref = (baseline or {}).get("scenarios", {}).get(name)
+        if ref:
+            line += f"   vs réf: débit {r['throughput_rps'] / ref['throughput_rps'] - 1:+.0%}, p95 {r['p95_ms'] / ref['p95_ms'] - 1:+.0%}"
+        print(line)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="serveur existant (sinon: application démarrée dans ce processus)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="secondes par scénario")
+    parser.add_argument("--warmup", type=float, default=1.0, help="secondes non mesurées avant chaque scénario")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--file-rows", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="écrit les résultats en JSON")
+    parser.add_argument("--baseline", type=Path, help="résultats de référence (JSON) à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="écart toléré (0.10 = 10 %%)")
+    parser.add_argument("--save-baseline", type=Path, help="écrit aussi les résultats comme nouvelle référence")
+    args = parser.parse_args()
+
+    gen = SyntheticApplicants(seed=args.seed)
+    requests = {name: build_requests(name, gen, args) for name in args.scenarios}
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "target": args.url or "in-process",
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "params": {k: v for k, v in vars(args).items() if k in
+                       ("concurrency", "duration", "warmup", "batch_size", "file_rows", "seed")},
+        },
+        "scenarios": {},
+    }
+
+    def run_all(url: str):
+        for name in args.scenarios:
+            r = asyncio.run(run_scenario(url, name, requests[name], args.concurrency, args.duration, args.warmup))
+            r["rows_per_s"] = r["throughput_rps"] * rows_per_request(name, args)
+            results["scenarios"][name] = r
+
+    if args.url:
+        run_all(args.url.rstrip("/"))
+    else:
+        with InProcessServer() as server:
+            run_all(server.url)
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline else None
+    print_table(results, baseline)
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRégressions au-delà de {args.threshold:.0%} :")
+            for msg in regressions:
+                print(f"  - {msg}")
+            sys.exit(1)
+        print(f"\nAucune régression au-delà de {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main_cli()
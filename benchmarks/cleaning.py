@@ -0,0 +1,111 @@
+"""Benchmark du nettoyage batch : pipeline historique vs passe unique vectorisée.
+
+Compare, sur des batchs synthétiques (tirés de data/loan_clean.csv, tels que
+les renvoie ``pd.read_csv``), le temps et le pic mémoire (tracemalloc) de
+clean_and_validate_batch + add_features + ensure_model_dtypes.
+
+    python -m benchmarks.cleaning --sizes 10000 100000 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from backend import main
+
+# -----------------------------
+# Implémentation historique (référence figée)
+# -----------------------------
+def legacy_strip_strings(df):
+    df = df.copy()
+    for c in df.columns:
+        if df[c].dtype == "object":
+            df[c] = df[c].astype(str).str.strip()
+    return df
+
+def legacy_coerce_numeric(df, cols):
+    df = df.copy()
+    for col in cols:
+        df[col] = (
+            df[col].astype(str)
+            .str.replace(r"[^\d\.\-]", "", regex=True)
+            .replace({"": np.nan, ".": np.nan, "-": np.nan})
+        )
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+def legacy_force_categorical(df, cols):
+    df = df.copy()
+    for col in cols:
+        df[col] = df[col].astype(str).str.strip()
+        df[col] = df[col].replace({"nan": "", "NaN": "", "None": ""})
+        df[col] = df[col].replace({"": "Unknown"})
+    return df
+
+def legacy_pipeline(df):
+    df = legacy_strip_strings(df)
+    df = legacy_force_categorical(df, main.CATEGORICAL_COLUMNS)
+    df = legacy_coerce_numeric(df, main.NUMERIC_COLUMNS)
+    df = df.copy()
+    df["LoanAmount_log"] = df["LoanAmount"].apply(lambda x: np.log(x) if x > 0 else 0.0)
+    df["InterestRate"] = main.rates.current()
+    df = df.copy()
+    for col in ["ApplicantIncome", "CoapplicantIncome", "LoanAmount", "LoanAmount_log", "InterestRate"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+    for col in main.CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype("object")
+    return df
+
+def current_pipeline(df):
+    return main.ensure_model_dtypes(main.add_features(main.clean_and_validate_batch(df)))
+
+# -----------------------------
+# Mesure
+# -----------------------------
+def synthetic_batch(n: int, seed: int = 0) -> pd.DataFrame:
+    """Batch de n lignes passé par un aller-retour CSV (mêmes dtypes qu'un upload)."""
+    src = pd.read_csv(main.TRAIN_DATA_PATH, dtype={"Dependents": str})[main.REQUIRED_COLUMNS]
+    batch = src.sample(n=n, replace=True, random_state=seed)
+    buf = io.StringIO()
+    batch.to_csv(buf, index=False)
+    buf.seek(0)
+    return pd.read_csv(buf, dtype={c: str for c in main.CATEGORICAL_COLUMNS})
+
+def measure(fn, df) -> tuple[float, float]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(df)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+def timeit(fn, df) -> float:
+    t0 = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - t0
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'lignes':>9} | {'historique':>20} | {'passe unique':>20} | gain")
+    for n in args.sizes:
+        df = synthetic_batch(n)
+        # tracemalloc ralentit les deux versions de la même façon; le temps est pris sans lui
+        t_old = min(timeit(legacy_pipeline, df) for _ in range(2))
+        t_new = min(timeit(current_pipeline, df) for _ in range(2))
+        _, m_old = measure(legacy_pipeline, df)
+        _, m_new = measure(current_pipeline, df)
+        print(f"{n:>9} | {t_old*1000:9.1f} ms {m_old:7.1f} Mo | {t_new*1000:9.1f} ms {m_new:7.1f} Mo "
+              f"| x{t_old / t_new:.1f} temps, x{m_old / max(m_new, 1e-9):.1f} mémoire")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,103 @@
+"""Coût des mesures par étape (``backend.metrics``) : par appel et de bout en bout.
+
+1. coût unitaire d'un ``metrics.timed(...)`` et d'un ``metrics.inc(...)``, hooks
+   actifs (dans un contexte de requête) ou désactivés;
+2. prepare_batch + scoring + finish_batch sur des batchs synthétiques, hooks
+   actifs puis désactivés (même données, passes alternées, meilleur temps).
+
+    python -m benchmarks.metrics_overhead --sizes 1 100 10000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault("PRED_LOG_DIR", tempfile.mkdtemp(prefix="loan-bench-"))
+os.environ.setdefault("RESULT_CACHE_SIZE", "0")
+
+from backend import main  # noqa: E402
+from backend.metrics import RequestTimings, _current  # noqa: E402
+
+from .api import SyntheticApplicants  # noqa: E402
+
+
+def per_call_ns(fn, n: int = 200_000) -> float:
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - t0) / n
+
+
+def hook_costs() -> dict:
+    metrics = main.metrics
+
+    def timed():
+        with metrics.timed("bench"):
+            pass
+
+    def inc():
+        metrics.inc("bench_total")
+
+    def empty():
+        pass
+
+    token = _current.set(RequestTimings("/bench"))
+    try:
+        base = per_call_ns(empty)
+        out = {}
+        for enabled in (True, False):
+            metrics.enabled = enabled
+            out[enabled] = {"timed": per_call_ns(timed) - base, "inc": per_call_ns(inc) - base}
+    finally:
+        metrics.enabled = True
+        _current.reset(token)
+    return out
+
+
+def end_to_end(df, m, repeat: int) -> dict:
+    def once():
+        token = _current.set(RequestTimings("/bench"))
+        try:
+            t0 = time.perf_counter()
+            clean, df_fe = main.prepare_batch(df)
+            preds, probs = main.score_frame(df_fe, m)
+            main.finish_batch(clean, df_fe, preds, probs, m)
+            return time.perf_counter() - t0
+        finally:
+            _current.reset(token)
+
+    best = {True: float("inf"), False: float("inf")}
+    once()
+    for _ in range(repeat):
+        for enabled in (True, False):
+            main.metrics.enabled = enabled
+            best[enabled] = min(best[enabled], once())
+    main.metrics.enabled = True
+    return best
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    costs = hook_costs()
+    print("coût par appel (ns)      timed     inc")
+    for enabled, label in ((True, "actif"), (False, "désactivé")):
+        print(f"  {label:20s} {costs[enabled]['timed']:7.0f} {costs[enabled]['inc']:7.0f}")
+
+    gen = SyntheticApplicants()
+    m = main.registry.active
+    print("\nbatch       avec mesures   sans mesures   surcoût")
+    for n in args.sizes:
+        best = end_to_end(gen.frame(n), m, args.repeat)
+        print(f"{n:8d}  {best[True] * 1000:11.3f}ms  {best[False] * 1000:11.3f}ms  "
+              f"{best[True] / best[False] - 1:+7.2%}")
+    main.pred_log.close()
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,80 @@
+"""Benchmark de charge du scoring unitaire : chemin direct vs micro-batching.
+
+Simule N clients concurrents qui scorent chacun des profils tirés de
+data/loan_clean.csv (sans passer par le log CSV), puis affiche le débit et
+les latences p50/p99 des deux chemins.
+
+    python -m benchmarks.microbatch --concurrency 32 --requests 4000
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend import main
+from backend.batching import MicroBatcher
+
+
+def sample_rows(n: int, seed: int = 0) -> list[dict]:
+    data = pd.read_csv(main.TRAIN_DATA_PATH, dtype={"Dependents": str})
+    picked = data.sample(n=n, replace=True, random_state=seed)[main.REQUIRED_COLUMNS]
+    return [main.application_row(r) for r in picked.to_dict(orient="records")]
+
+
+def run(rows: list[dict], concurrency: int) -> dict:
+    m = main.registry.active
+    latencies = np.empty(len(rows))
+    chunks = np.array_split(np.arange(len(rows)), concurrency)
+
+    def worker(idx):
+        for i in idx:
+            t0 = time.perf_counter()
+            main.score_single(rows[i], m)
+            latencies[i] = time.perf_counter() - t0
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput_rps": len(rows) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=main.MICRO_BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=main.MICRO_BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    rows = sample_rows(args.requests)
+    main.score_single(rows[0], main.registry.active)  # échauffement
+
+    results = {"direct": run(rows, args.concurrency)}
+    main.batcher = MicroBatcher(main.score_pairs, args.max_batch, args.max_wait_ms).start()
+    try:
+        results["micro-batch"] = run(rows, args.concurrency)
+        avg = main.batcher.rows / max(main.batcher.batches, 1)
+    finally:
+        main.batcher.stop()
+        main.batcher = None
+
+    print(f"{args.requests} requêtes, concurrence {args.concurrency}, "
+          f"max_batch={args.max_batch}, max_wait={args.max_wait_ms}ms (lot moyen: {avg:.1f})")
+    for name, r in results.items():
+        print(f"{name:12s} {r['throughput_rps']:9.1f} req/s   p50 {r['p50_ms']:7.2f} ms   p99 {r['p99_ms']:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,167 @@
+"""Mémoire par worker d'un gros modèle servi par N processus (artefact natif ou projeté).
+
+Construit une forêt volumineuse (``--trees`` arbres sur ``--rows`` demandeurs
+rééchantillonnés, labels tirés des probabilités du modèle servi : bruités,
+donc des arbres profonds), l'exporte en deux artefacts d'inférence
+(estimateur natif, ``MappedTrees``) puis, pour chaque scénario, lance
+``--workers`` processus qui chargent l'artefact (``load_artifact``) et scorent
+un lot. La mémoire de chaque worker est lue dans ``/proc/<pid>/smaps_rollup``
+pendant que tous sont vivants :
+
+- RSS : pages résidentes, partagées comprises ;
+- PSS : pages partagées divisées par le nombre de processus qui les mappent ;
+- USS : pages privées du worker.
+
+Le scénario « chargé avant fork » est celui de ``backend.serve`` au
+démarrage ; les versions activées ensuite sont chargées par chaque worker,
+comme dans les scénarios sans fork. Linux uniquement (smaps_rollup).
+
+    python -m benchmarks.model_memory --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+
+from backend.mapped_trees import MappedTrees
+from backend.model_registry import load_artifact, read_parity_reference, serving_pipeline
+
+from .api import ROOT
+
+SERVING_MODEL_PATH = ROOT / "models" / "serving_model.pkl"
+
+# (libellé, artefact, mmap_mode, chargé avant fork)
+SCENARIOS = [
+    ("sans modèle", None, False, False),
+    ("natif", "native", False, False),
+    ("natif, mmap_mode", "native", True, False),
+    ("natif, chargé avant fork", "native", False, True),
+    ("MappedTrees, mmap_mode", "mapped", True, False),
+]
+
+PROBE = r"""
+import os, sys
+import numpy as np
+from backend.model_registry import load_artifact
+path, mmap, fork, workers = sys.argv[1], sys.argv[2] == "1", sys.argv[3] == "1", int(sys.argv[4])
+X = np.load(sys.argv[5])
+
+def work(pipeline):
+    if pipeline is not None:
+        pipeline.steps[-1][1].predict_proba(X)
+    print("ready", os.getpid(), flush=True)
+    sys.stdin.read()  # vivant jusqu'à la fin des mesures
+
+load = lambda: load_artifact(path, mmap) if path else None
+if fork:
+    pipeline, pids = load(), []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            work(pipeline)
+            os._exit(0)
+        pids.append(pid)
+    for pid in pids:
+        os.waitpid(pid, 0)
+else:
+    work(load())
+"""
+
+
+def build_forest(rows: int, trees: int, seed: int) -> tuple[Pipeline, pd.DataFrame]:
+    served = load_artifact(SERVING_MODEL_PATH, mmap=False)
+    _, columns, _, _ = read_parity_reference(SERVING_MODEL_PATH)
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(columns).iloc[rng.integers(0, len(columns["ApplicantIncome"]), rows)].reset_index(drop=True)
+    for c in ("ApplicantIncome", "CoapplicantIncome", "LoanAmount_log"):
+        df[c] = df[c] * rng.lognormal(0, 0.2, rows)
+    y = (rng.random(rows) < served.predict_proba(df)[:, 1]).astype(int)
+    pre = served.steps[0][1]
+    forest = RandomForestClassifier(trees, n_jobs=-1, random_state=seed).fit(pre.transform(df), y)
+    return Pipeline([("preprocessor", pre), ("model", forest)]), df
+
+
+def smaps(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                values[key] = int(rest.split()[0]) / 1024
+    return {"rss": values["Rss"], "pss": values["Pss"], "uss": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def measure(path: str | None, mmap: bool, fork: bool, workers: int, matrix: str) -> list[dict]:
+    args = [path or "", "1" if mmap else "0", "1" if fork else "0", str(workers), matrix]
+    cmd = [sys.executable, "-c", PROBE, *args]
+    env = {**os.environ, "OMP_NUM_THREADS": "1"}
+    procs = [subprocess.Popen(cmd, cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(1 if fork else workers)]
+    try:
+        pids = []
+        for proc in procs:
+            for _ in range(workers if fork else 1):
+                line = proc.stdout.readline()
+                if not line:
+                    raise RuntimeError(f"worker arrêté (code {proc.wait()})")
+                pids.append(int(line.split()[1]))
+        return [smaps(pid) for pid in pids]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--trees", type=int, default=300, help="arbres de la forêt")
+    parser.add_argument("--rows", type=int, default=20000, help="lignes d'entraînement de la forêt")
+    parser.add_argument("--batch", type=int, default=1000, help="lignes scorées par chaque worker")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    pipeline, df = build_forest(args.rows, args.trees, args.seed)
+    print(f"Forêt: {args.trees} arbres, {args.rows} lignes ({time.perf_counter() - t0:.0f} s)")
+    with tempfile.TemporaryDirectory(prefix="bench-memory-") as tmp:
+        paths = {"native": os.path.join(tmp, "native.pkl"), "mapped": os.path.join(tmp, "mapped.pkl")}
+        mapped = serving_pipeline(pipeline, df, map_min_nodes=0)
+        if not isinstance(mapped.steps[-1][1], MappedTrees):
+            raise SystemExit("projection refusée (écart avec la forêt native)")
+        joblib.dump(serving_pipeline(pipeline), paths["native"])
+        joblib.dump(mapped, paths["mapped"])
+        matrix = os.path.join(tmp, "batch.npy")
+        np.save(matrix, pipeline.steps[0][1].transform(df.head(args.batch)))
+        print(f"{mapped.steps[-1][1]!r}; artefacts: natif {os.path.getsize(paths['native']) / 2**20:.0f} Mo, "
+              f"projeté {os.path.getsize(paths['mapped']) / 2**20:.0f} Mo (estimateur natif inclus)")
+
+        results = {}
+        for label, artifact, mmap, fork in SCENARIOS:
+            per_worker = measure(paths.get(artifact), mmap, fork, args.workers, matrix)
+            results[label] = {k: statistics.median(w[k] for w in per_worker) for k in ("rss", "pss", "uss")}
+            results[label]["pss_total"] = sum(w["pss"] for w in per_worker)
+
+    print(f"\nMémoire par worker (Mo, médiane sur {args.workers} workers)")
+    print(f"{'':28s}{'RSS':>9s}{'PSS':>9s}{'USS':>9s}{'PSS total':>11s}")
+    for label, r in results.items():
+        print(f"{label:28s}{r['rss']:9.1f}{r['pss']:9.1f}{r['uss']:9.1f}{r['pss_total']:11.1f}")
+    native, mapped = results["natif"], results["MappedTrees, mmap_mode"]
+    print(f"\nÉconomie par worker (MappedTrees vs natif): {native['pss'] - mapped['pss']:.1f} Mo de PSS, "
+          f"{native['uss'] - mapped['uss']:.1f} Mo d'USS; "
+          f"total {args.workers} workers: {native['pss_total'] - mapped['pss_total']:.1f} Mo")
+
+
+if __name__ == "__main__":
+    main_cli()
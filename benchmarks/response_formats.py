@@ -0,0 +1,59 @@
+"""Encodage des réponses batch : ``to_dict(orient="records")`` + JSONResponse vs formats négociés.
+
+Mesure, sur des batchs synthétiques déjà scorés, le temps d'encodage et la
+taille de la réponse pour chaque format de ``backend.response_formats``.
+
+    python -m benchmarks.response_formats --sizes 1000 100000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+from starlette.responses import JSONResponse
+
+from backend import main
+from backend.response_formats import FORMATS, encode
+
+from .api import SyntheticApplicants
+
+
+def scored_frame(n: int, gen: SyntheticApplicants):
+    df = main.clean_and_validate_batch(gen.frame(n))
+    rng = np.random.default_rng(0)
+    out = df.copy(deep=False)
+    out["prediction"] = rng.integers(0, 2, n)
+    out["probability"] = rng.random(n).astype(np.float32)
+    out["model_version"] = "bench"
+    return out
+
+
+def best_of(fn, repeat: int) -> tuple[float, int]:
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = len(fn().body)
+        best = min(best, time.perf_counter() - t0)
+    return best, size
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    gen = SyntheticApplicants()
+    for n in args.sizes:
+        out = scored_frame(n, gen)
+        ref, ref_size = best_of(lambda: JSONResponse(out.to_dict(orient="records")), args.repeat)
+        print(f"\n{n} lignes")
+        print(f"  {'to_dict + JSONResponse (historique)':40s} {ref * 1000:9.2f} ms  {ref_size / 1e6:7.2f} Mo")
+        for fmt in FORMATS:
+            t, size = best_of(lambda: encode(out, fmt), args.repeat)
+            print(f"  {fmt:40s} {t * 1000:9.2f} ms  {size / 1e6:7.2f} Mo  x{ref / t:5.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
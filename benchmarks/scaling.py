@@ -0,0 +1,104 @@
+"""Débit de l'API selon le nombre de workers (lanceur ``python -m backend.serve``).
+
+Pour chaque nombre de workers demandé, démarre le serveur sur un port local,
+envoie pendant ``--duration`` secondes des requêtes concurrentes (demandeurs
+synthétiques et scénarios de ``benchmarks.api``) puis affiche le débit et la
+latence p50/p99.
+Le cache de résultats est désactivé et les prédictions sont journalisées dans
+un dossier temporaire (le log de data/ n'est pas touché).
+
+Le client tourne dans ``--clients`` processus pour ne pas devenir le goulot
+d'étranglement ; sur une petite machine, laisser des cœurs au client.
+
+    python -m benchmarks.scaling --workers 1 2 4 --endpoint predict-one
+    python -m benchmarks.scaling --workers 1 2 4 --endpoint predict-batch-json --batch-size 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .api import ROOT, SCENARIOS, SyntheticApplicants, build_requests, rows_per_request, run_scenario
+
+
+def client_process(task: tuple) -> dict:
+    url, endpoint, per_client, seed, args = task
+    requests = build_requests(endpoint, SyntheticApplicants(seed=seed), args)
+    return asyncio.run(run_scenario(url, endpoint, requests, per_client, args.duration, warmup=1.0))
+
+
+def wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("le serveur s'est arrêté au démarrage")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("serveur non prêt")
+
+
+def run(workers: int, args, log_dir: str) -> dict:
+    url = f"http://127.0.0.1:{args.port}"
+    env = {**os.environ, "RESULT_CACHE_SIZE": "0", "PRED_LOG_DIR": log_dir}
+    server = subprocess.Popen([sys.executable, "-m", "backend.serve", "--workers", str(workers),
+                               "--port", str(args.port)], cwd=ROOT, env=env)
+    try:
+        wait_ready(url, server)
+        per_client = max(args.concurrency // args.clients, 1)
+        tasks = [(url, args.endpoint, per_client, seed, args) for seed in range(args.clients)]
+        with mp.get_context("spawn").Pool(args.clients) as pool:
+            results = pool.map(client_process, tasks)
+    finally:
+        server.terminate()
+        server.wait(30)
+    # chaque client mesure sur la même fenêtre: débits additionnés, latences pondérées par le volume
+    n = sum(r["requests"] for r in results)
+    rps = sum(r["throughput_rps"] for r in results)
+    return {
+        "workers": workers,
+        "requests_per_s": rps,
+        "rows_per_s": rps * rows_per_request(args.endpoint, args),
+        "p50_ms": sum(r["p50_ms"] * r["requests"] for r in results) / max(n, 1),
+        "p99_ms": max(r["p99_ms"] for r in results),
+        "errors": sum(r["errors"] for r in results),
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--endpoint", default="predict-one", choices=SCENARIOS)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--file-rows", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=2, help="processus clients")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{args.endpoint}, concurrence {args.concurrency}, {args.clients} processus clients, "
+          f"{args.duration:.0f}s par palier ({os.cpu_count()} cœurs)")
+    base = None
+    with tempfile.TemporaryDirectory(prefix="loan-bench-") as log_dir:
+        for n in args.workers:
+            r = run(n, args, log_dir)
+            base = base or r["rows_per_s"]
+            print(f"{n:3d} workers  {r['requests_per_s']:9.1f} req/s  {r['rows_per_s']:10.1f} lignes/s  "
+                  f"x{r['rows_per_s'] / base:4.2f}  p50 {r['p50_ms']:7.2f} ms  p99 {r['p99_ms']:7.2f} ms"
+                  + (f"  ({r['errors']} erreurs)" if r["errors"] else ""))
+
+
+if __name__ == "__main__":
+    main_cli()
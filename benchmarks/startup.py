@@ -0,0 +1,103 @@
+"""Démarrage à froid d'un worker : import de ``backend.main`` et premières requêtes.
+
+Chaque mesure tourne dans un processus neuf : durée de l'import (chargement et
+vérification du modèle compris), du lifespan, de la première requête
+/predict-one puis du premier /predict-batch-json, et modules lourds déjà
+importés après l'import. Une première exécution non mesurée prépare le dossier
+de log et le cache disque.
+
+``--baseline <révision git>`` mesure aussi cette révision (extraite dans un
+worktree temporaire) pour comparer avant/après.
+
+    python -m benchmarks.startup --runs 5 --baseline HEAD~1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from .api import ROOT
+
+HEAVY_MODULES = ["pandas", "imblearn", "openpyxl", "pyarrow", "sklearn", "xgboost"]
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import backend.main as main
+t_import = time.perf_counter() - t0
+loaded = [m for m in %(modules)r if m in sys.modules]
+from fastapi.testclient import TestClient
+client = {
+    "Gender": "Male", "Married": "Yes", "Dependents": "0", "Education": "Graduate",
+    "Self_Employed": "No", "Property_Area": "Urban",
+    "ApplicantIncome": 5000, "CoapplicantIncome": 1500, "LoanAmount": 150000,
+}
+t0 = time.perf_counter()
+with TestClient(main.app) as c:
+    t_lifespan = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    assert c.post("/predict-one", json=client).status_code == 200
+    t_one = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    assert c.post("/predict-batch-json", json=[client] * 10).status_code == 200
+    t_batch = time.perf_counter() - t0
+print(json.dumps({"import": t_import, "lifespan": t_lifespan, "predict_one": t_one,
+                  "predict_batch": t_batch, "loaded": loaded}))
+"""
+
+METRICS = [("import", "import backend.main", 1.0, "s"), ("lifespan", "lifespan", 1000.0, "ms"),
+           ("predict_one", "1re /predict-one", 1000.0, "ms"), ("predict_batch", "1er batch (10 lignes)", 1000.0, "ms")]
+
+
+def probe(tree: str, log_dir: str) -> dict:
+    env = {**os.environ, "PRED_LOG_DIR": log_dir, "JOBS_DIR": os.path.join(log_dir, "jobs"),
+           "RESULT_CACHE_SIZE": "0", "MODEL_WATCH_INTERVAL": "0"}
+    out = subprocess.run([sys.executable, "-c", PROBE % {"modules": HEAVY_MODULES}], cwd=tree, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def measure(tree: str, runs: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as log_dir:
+        probe(tree, log_dir)  # migration du log, cache disque
+        samples = [probe(tree, log_dir) for _ in range(runs)]
+    result = {key: statistics.median(s[key] for s in samples) for key, *_ in METRICS}
+    result["loaded"] = samples[-1]["loaded"]
+    return result
+
+
+def report(results: dict[str, dict]):
+    names = list(results)
+    print(f"{'':24s}" + "".join(f"{n:>16s}" for n in names))
+    for key, label, scale, unit in METRICS:
+        print(f"{label + ' (' + unit + ')':24s}" + "".join(f"{results[n][key] * scale:16.2f}" for n in names))
+    for n in names:
+        print(f"modules chargés à l'import ({n}): {', '.join(results[n]['loaded'])}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="processus mesurés par arbre (médiane)")
+    parser.add_argument("--baseline", help="révision git à comparer (ex. HEAD~1)")
+    args = parser.parse_args()
+
+    results = {}
+    if args.baseline:
+        with tempfile.TemporaryDirectory(prefix="bench-baseline-") as tmp:
+            tree = os.path.join(tmp, "tree")
+            subprocess.run(["git", "worktree", "add", "--detach", "--quiet", tree, args.baseline], cwd=ROOT, check=True)
+            try:
+                results[args.baseline] = measure(tree, args.runs)
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", tree], cwd=ROOT, check=True)
+    results["courant"] = measure(str(ROOT), args.runs)
+    report(results)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -17,6 +17,16 @@ export async function predictOne(payload) {
   });
 }
 
+// Courbe de probabilité et frontière d'approbation en une requête
+// payload: { application, variable: "LoanAmount" | "ApplicantIncome" | "CoapplicantIncome", min, max, points?, threshold? }
+export async function whatIf(payload) {
+  return jsonFetch(`${API}/what-if`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+}
+
 export async function predictBatchFile(file) {
   const fd = new FormData();
   fd.append("file", file);
@@ -0,0 +1,297 @@
+"""Réentraînement incrémental à partir des issues réelles journalisées par l'API.
+
+``POST /outcomes`` ajoute des demandes étiquetées (``Loan_Status``) à
+``data/outcomes_log.csv``. Ce script ne lit que les lignes ajoutées depuis le
+dernier checkpoint (offset en octets persistant), met l'estimateur à jour sans
+repartir de zéro, réévalue sur une fenêtre de validation et publie le résultat
+dans le registre. Sa durée dépend du nombre de nouvelles lignes, pas de
+l'historique.
+
+Mise à jour selon l'estimateur du pipeline :
+
+- XGBoost : ``INCR_TREES`` arbres de plus, ajustés sur les nouvelles lignes
+  (poursuite du boosting) ;
+- forêts (RandomForest, ExtraTrees) : ``warm_start``, ``INCR_TREES`` arbres de plus ;
+- estimateurs à ``partial_fit`` (SGD, naïf bayésien, ...) : une passe.
+
+Le préprocesseur (StandardScaler + OneHotEncoder) reste celui du checkpoint :
+les nouvelles lignes sont transformées, jamais réajustées. Les autres
+estimateurs (régression logistique, LDA, arbre, AdaBoost) n'ont pas de mise à
+jour partielle : relancer ``src/model_training.py``.
+
+Une nouvelle ligne sur ``INCR_HOLDOUT_EVERY`` va dans la fenêtre de validation
+(les ``INCR_HOLDOUT_MAX`` plus récentes sont gardées). L'ancien et le nouveau
+modèle y sont comparés ; la nouvelle version n'est activée, et ne devient la
+base des mises à jour suivantes, que si son F1 ne baisse pas de plus de
+``INCR_MAX_F1_DROP`` (ou avec ``--force``). Refusée, elle est tout de même
+publiée (inactive) et ses lignes d'entraînement ne sont pas réutilisées
+(``--reset`` relit tout le log). Tant que la fenêtre compte moins de
+``INCR_HOLDOUT_MIN`` lignes (ou une seule classe), rien n'est entraîné et
+l'offset n'avance pas : les lignes sont relues avec les suivantes.
+
+La couche de décision (calibrateur et seuil, cf. ``backend.decision``) est
+celle du modèle de départ : elle sert aux deux modèles comparés et est
+publiée telle quelle avec chaque nouvelle version.
+
+Checkpoint (``models/incremental/``) : ``state.json`` (offset, versions,
+compteurs) désigne le pipeline et la fenêtre de validation courants ; il est
+remplacé en dernier, de façon atomique, donc un arrêt en cours de route laisse
+le checkpoint précédent intact.
+
+    python src/incremental_training.py            # ingère les nouvelles issues
+    python src/incremental_training.py --reset    # repart du modèle actif du registre
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+from imblearn.over_sampling import SMOTE
+
+from model_training import (BEST_MODEL_PATH, LOAN_CSV_PATH, ROOT_DIR, MODELS_DIR, SERVING_MODEL_PATH,
+                            cat_features, num_features, stage)
+
+sys.path.insert(0, ROOT_DIR)
+from backend.decision import DecisionPolicy, decision_path, read_decision, write_decision
+from backend.model_registry import ACTIVE_FILE, MODEL_FILE, native_pipeline, publish_model
+
+OUTCOME_LOG = os.path.join(ROOT_DIR, "data", "outcomes_log.csv")
+REGISTRY_DIR = os.path.join(MODELS_DIR, "registry")
+CHECKPOINT_DIR = os.path.join(MODELS_DIR, "incremental")
+STATE_FILE = "state.json"
+TARGET = "Loan_Status"
+
+INCR_TREES = int(os.getenv("INCR_TREES", "50"))             # arbres ajoutés par mise à jour
+INCR_MIN_ROWS = int(os.getenv("INCR_MIN_ROWS", "50"))       # en dessous: on attend d'autres lignes
+INCR_HOLDOUT_EVERY = int(os.getenv("INCR_HOLDOUT_EVERY", "5"))
+INCR_HOLDOUT_MAX = int(os.getenv("INCR_HOLDOUT_MAX", "5000"))
+INCR_HOLDOUT_MIN = int(os.getenv("INCR_HOLDOUT_MIN", "30"))  # en dessous: pas d'évaluation
+INCR_MAX_F1_DROP = float(os.getenv("INCR_MAX_F1_DROP", "0.01"))
+
+FEATURES = [*cat_features, *num_features]
+
+
+# -----------------------------
+# Checkpoint
+# -----------------------------
+def read_state():
+    try:
+        with open(os.path.join(CHECKPOINT_DIR, STATE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(state, pipeline, holdout, decision=None):
+    """Écrit pipeline, décision et fenêtre de validation sous de nouveaux noms, puis bascule ``state.json``."""
+    n = state["updates"]
+    state["checkpoint"], state["holdout"] = f"pipeline-{n}.pkl", f"holdout-{n}.csv"
+    joblib.dump(pipeline, os.path.join(CHECKPOINT_DIR, state["checkpoint"]))
+    if decision is not None:
+        write_decision(os.path.join(CHECKPOINT_DIR, state["checkpoint"]), decision)
+    holdout.to_csv(os.path.join(CHECKPOINT_DIR, state["holdout"]), index=False)
+    tmp = os.path.join(CHECKPOINT_DIR, f".{STATE_FILE}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, os.path.join(CHECKPOINT_DIR, STATE_FILE))
+    # les fichiers des checkpoints précédents ne sont plus référencés
+    current = (state["checkpoint"], state["holdout"], decision_path(state["checkpoint"]).name)
+    for name in os.listdir(CHECKPOINT_DIR):
+        if name.startswith(("pipeline-", "holdout-")) and name not in current:
+            os.remove(os.path.join(CHECKPOINT_DIR, name))
+
+
+def load_checkpoint(state):
+    path = os.path.join(CHECKPOINT_DIR, state["checkpoint"])
+    holdout = read_outcomes(os.path.join(CHECKPOINT_DIR, state["holdout"]))
+    return joblib.load(path), holdout, read_decision(path)
+
+
+def init_checkpoint():
+    """Checkpoint initial: modèle actif du registre (à défaut celui servi hors registre), offset 0."""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    try:
+        with open(os.path.join(REGISTRY_DIR, ACTIVE_FILE), encoding="utf-8") as f:
+            version = f.read().strip()
+        path = os.path.join(REGISTRY_DIR, version, MODEL_FILE)
+        with open(os.path.join(REGISTRY_DIR, version, "metadata.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        version, meta = None, {}
+        path = SERVING_MODEL_PATH if os.path.exists(SERVING_MODEL_PATH) else BEST_MODEL_PATH
+    # un artefact servi peut contenir des MappedTrees: on repart de l'estimateur d'origine
+    pipeline = native_pipeline(joblib.load(path))
+    state = {
+        "version": version,
+        "model": meta.get("model") or type(pipeline.named_steps["model"]).__name__,
+        "offset": 0,
+        "rows_ingested": 0,
+        "rows_trained": 0,
+        "n_train_rows": meta.get("n_train_rows"),
+        "updates": 0,
+    }
+    write_checkpoint(state, pipeline, pd.DataFrame(columns=[*FEATURES, TARGET]), read_decision(path))
+    print("Checkpoint initialisé depuis", version or os.path.basename(path))
+    return state
+
+
+# -----------------------------
+# Lecture des nouvelles issues
+# -----------------------------
+def read_outcomes(source):
+    # catégorielles en chaînes, comme à l'entraînement ("0", "1", ... et non 0, 1)
+    return pd.read_csv(source, dtype={c: str for c in cat_features}, usecols=lambda c: c in (*FEATURES, TARGET))
+
+
+def read_new_outcomes(path, offset):
+    """(lignes ajoutées après ``offset``, nouvel offset); une ligne en cours d'écriture est laissée."""
+    if not os.path.exists(path):
+        return None, offset
+    size = os.path.getsize(path)
+    if size < offset:
+        print(f"Log {os.path.basename(path)} tronqué: relecture depuis le début")
+        offset = 0
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(offset)
+        chunk = f.read(size - offset)
+    chunk = chunk[: chunk.rfind(b"\n") + 1]
+    if offset == 0:
+        chunk = chunk[len(header):]
+        offset = len(header)
+    if not chunk:
+        return None, offset
+    return read_outcomes(io.BytesIO(header + chunk)), offset + len(chunk)
+
+
+# -----------------------------
+# Mise à jour et évaluation
+# -----------------------------
+def update_estimator(pipeline, X, y):
+    """Met à jour en place l'estimateur de ``pipeline`` avec les lignes brutes ``X``; renvoie la méthode."""
+    est = pipeline.named_steps["model"]
+    Xt = pipeline.named_steps["preprocessor"].transform(X)
+    # les artefacts servis n'ont plus d'étape SMOTE: même rééquilibrage qu'à l'entraînement
+    smote = pipeline.named_steps.get("smote") or SMOTE(random_state=42)
+    if np.bincount(y).min() > smote.k_neighbors:
+        Xt, y = smote.fit_resample(Xt, y)
+
+    if hasattr(est, "get_booster"):
+        total = est.get_booster().num_boosted_rounds() + INCR_TREES
+        est.set_params(n_estimators=INCR_TREES)
+        est.fit(Xt, y, xgb_model=est.get_booster())
+        est.set_params(n_estimators=total)
+        return "boosting"
+    if hasattr(est, "estimators_") and "warm_start" in est.get_params():
+        est.set_params(warm_start=True, n_estimators=len(est.estimators_) + INCR_TREES)
+        est.fit(Xt, y)
+        return "warm_start"
+    if hasattr(est, "partial_fit"):
+        est.partial_fit(Xt, y, classes=est.classes_)
+        return "partial_fit"
+    raise SystemExit(f"{type(est).__name__} n'a pas de mise à jour incrémentale: "
+                     "relancer src/model_training.py")
+
+
+def evaluate(pipeline, holdout, policy):
+    """Scores des décisions de ``policy`` sur la fenêtre de validation.
+
+    None si la fenêtre est trop petite ou d'une seule classe.
+    """
+    y = holdout[TARGET].to_numpy(dtype=int)
+    if len(holdout) < INCR_HOLDOUT_MIN or len(np.unique(y)) < 2:
+        return None
+    probs = policy.calibrate(pipeline.predict_proba(holdout[FEATURES])[:, 1])
+    preds = np.where(probs > policy.threshold, pipeline.classes_[1], pipeline.classes_[0])
+    return {
+        "accuracy": float(accuracy_score(y, preds)),
+        "f1": float(f1_score(y, preds)),
+        "roc_auc": float(roc_auc_score(y, probs)),
+        "n_rows": int(len(holdout)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", default=OUTCOME_LOG, help="log des issues (CSV de POST /outcomes)")
+    parser.add_argument("--reset", action="store_true", help="repartir du modèle actif et relire tout le log")
+    parser.add_argument("--force", action="store_true", help="activer la nouvelle version sans condition")
+    args = parser.parse_args()
+
+    state = None if args.reset else read_state()
+    if state is None:
+        state = init_checkpoint()
+
+    with stage("lecture des nouvelles issues"):
+        new, offset = read_new_outcomes(args.log, state["offset"])
+    n_new = 0 if new is None else len(new)
+    print(f"Nouvelles lignes depuis l'offset {state['offset']}: {n_new}")
+    if n_new < INCR_MIN_ROWS:
+        print(f"Moins de {INCR_MIN_ROWS} nouvelles lignes: rien à faire (offset inchangé)")
+        return
+
+    # une ligne sur INCR_HOLDOUT_EVERY (numérotation globale, donc stable) va en validation
+    held = (state["rows_ingested"] + np.arange(n_new)) % INCR_HOLDOUT_EVERY == 0
+    train = new[~held]
+    y_train = train[TARGET].to_numpy(dtype=int)
+    if len(np.unique(y_train)) < 2:
+        print("Nouvelles lignes d'une seule classe: rien à faire (offset inchangé)")
+        return
+
+    pipeline, holdout, decision = load_checkpoint(state)
+    policy = DecisionPolicy.from_dict(decision)
+    holdout = (new[held] if holdout.empty else pd.concat([holdout, new[held]])).tail(INCR_HOLDOUT_MAX)
+    before = evaluate(pipeline, holdout, policy)
+    if before is None and not args.force:
+        # lignes laissées dans le log: relues avec les suivantes jusqu'à une fenêtre suffisante
+        print(f"Fenêtre de validation insuffisante ({len(holdout)} lignes, il en faut {INCR_HOLDOUT_MIN} "
+              "des deux classes): rien à faire (offset inchangé)")
+        return
+    candidate = copy.deepcopy(pipeline)
+    with stage(f"mise à jour ({len(train)} lignes)"):
+        method = update_estimator(candidate, train[FEATURES], y_train)
+    with stage(f"évaluation ({len(holdout)} lignes de validation)"):
+        after = evaluate(candidate, holdout, policy)
+    print(" Validation  avant:", before)
+    print(" Validation  après:", after)
+
+    accepted = args.force or after["f1"] >= before["f1"] - INCR_MAX_F1_DROP
+    if not accepted:
+        print("Nouvelle version publiée sans être activée (F1 en baisse)")
+
+    with stage("checkpoint et publication"):
+        parent = state["version"]
+        n_train_rows = (state["n_train_rows"] or 0) + len(train)
+        version = publish_model(REGISTRY_DIR, candidate, {
+            "model": state["model"],
+            "n_train_rows": n_train_rows,
+            "holdout_scores": {"before": before, "after": after},
+            "incremental": {
+                "parent": parent,
+                "method": method,
+                "rows_new": n_new,
+                "rows_trained": len(train),
+                "rows_holdout": int(held.sum()),
+                "log_offset": offset,
+            },
+        }, activate=accepted, reference=pd.read_csv(LOAN_CSV_PATH, nrows=1000, dtype={c: str for c in cat_features}),
+            decision=decision)
+        state.update({"offset": offset, "rows_ingested": state["rows_ingested"] + n_new,
+                      "updates": state["updates"] + 1})
+        if accepted:
+            state.update({"version": version, "rows_trained": state["rows_trained"] + len(train),
+                          "n_train_rows": n_train_rows})
+            pipeline = candidate
+        write_checkpoint(state, pipeline, holdout.reset_index(drop=True), decision)
+    print(f"Version {version} ({method}, parent {parent})" + (" activée" if accepted else ""))
+
+
+if __name__ == "__main__":
+    main()
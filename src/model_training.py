@@ -1,7 +1,58 @@
+"""Sélection, évaluation et publication du modèle d'approbation de prêt.
+
+Chaque (modèle, fold) est entraîné une fois et scoré par un seul
+``predict_proba`` : toutes les métriques en découlent (ROC AUC sur les
+probabilités), et les probabilités hors fold sont gardées. Les 6 x 5 tâches
+sont réparties sur un pool de processus
+(TRAIN_N_JOBS, -1 = tous les cœurs). Le ColumnTransformer et la sortie de
+SMOTE sont mis en cache par fold (joblib ``Memory``) : calculés une fois, ils
+servent aux six modèles. Mêmes folds et mêmes graines que la version
+séquentielle, donc même choix de modèle et mêmes scores.
+
+Les features sont encodées une seule fois en une matrice float64
+(numériques + codes des catégorielles, codes dans l'ordre trié des modalités,
+comme le OneHotEncoder) écrite sur disque et ouverte en ``np.memmap`` : joblib
+transmet aux workers une référence au fichier, pas une copie des données.
+Chaque tâche ne matérialise que les lignes de son fold. Le modèle final est
+entraîné sur le DataFrame d'origine (c'est lui que sert l'API). Le pic de
+mémoire (RSS) du processus principal et des workers est affiché en fin de
+validation croisée.
+
+Le pipeline d'entraînement est sauvegardé tel quel (``best_model.pkl``) ; l'API
+sert un artefact d'inférence exporté à côté (``serving_model.pkl``) : même
+préprocesseur et même estimateur, sans SMOTE (inutile à la prédiction), donc
+chargeable sans imblearn, accompagné de lignes de référence et de leurs scores
+pour vérifier le moteur rapide au démarrage. ``--export`` refait seulement cet
+export depuis ``best_model.pkl``.
+
+Les probabilités hors fold du modèle retenu servent à sa couche de décision
+(``backend.decision``) : calibrateur (``--calibration``) et seuil de coût
+minimal pour le ratio ``--cost-ratio`` (coût d'un prêt accordé à tort
+rapporté à celui d'un bon dossier refusé), choisi parmi un balayage de 2001
+ratios. Elle est exportée avec l'artefact et appliquée par l'API ; les scores
+sur test sont ceux de ces décisions. Une couche inexploitable (AUC hors fold
+proche de 0,5, seuil qui accorde ou refuse tout, cf.
+``backend.decision.decision_issue``) n'est pas exportée : l'API garde alors
+les probabilités brutes et le seuil 0,5.
+"""
+import argparse
 import os
+import sys
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: pas de mesure du pic RSS
+    resource = None
+
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score, StratifiedKFold
+from joblib import Memory, Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, cross_val_predict, StratifiedKFold
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
 from sklearn.metrics import (accuracy_score, precision_score, recall_score,
@@ -18,24 +69,45 @@ from sklearn.metrics import confusion_matrix
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LOAN_CSV_PATH = os.path.join(ROOT_DIR, "data", "loan_clean.csv")
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+BEST_MODEL_PATH = os.path.join(MODELS_DIR, "best_model.pkl")
+SERVING_MODEL_PATH = os.path.join(MODELS_DIR, "serving_model.pkl")
 
-print("Current working directory:", os.getcwd())
-loan_csv_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "Loan_clean.csv"))
-print("Loan CSV path:", loan_csv_path)
-loan_df = pd.read_csv(loan_csv_path)
+# publication dans le registre et export de l'artefact servi par l'API
+sys.path.insert(0, ROOT_DIR)
+from backend.decision import (CALIBRATIONS, DecisionPolicy, decision_issue, fit_decision, remove_decision,
+                              write_decision)
+from backend.model_registry import (MAP_MIN_NODES, publish_model, serving_pipeline, write_drift_profile,
+                                   write_parity_reference)
 
-X = loan_df.drop("Loan_Status", axis=1)
-y = loan_df["Loan_Status"]
+# Processus pour la validation croisée; cache persistant optionnel (sinon dossier temporaire)
+N_JOBS = int(os.getenv("TRAIN_N_JOBS", "-1"))
+CACHE_DIR = os.getenv("TRAIN_CACHE_DIR")
 
+METRICS = ["accuracy", "precision", "recall", "f1", "roc_auc"]
+
+# découpage train/test et folds de validation croisée (mêmes graines partout)
+CV = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+COST_RATIO = 1.0  # coût d'un prêt accordé à tort / coût d'un bon dossier refusé (--cost-ratio)
 
 num_features = ["ApplicantIncome", "CoapplicantIncome", "LoanAmount_log", "InterestRate"]
 cat_features = ["Gender", "Married", "Dependents", "Education", "Self_Employed", "Property_Area"]
 
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("num", StandardScaler(), num_features),
-        ("cat", OneHotEncoder(drop="first", handle_unknown="ignore"), cat_features)
-    ]
+def build_preprocessor(num_cols, cat_cols):
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), num_cols),
+            ("cat", OneHotEncoder(drop="first", handle_unknown="ignore"), cat_cols)
+        ]
+    )
+
+# sur le DataFrame (modèle publié) / sur la matrice encodée (validation croisée)
+preprocessor = build_preprocessor(num_features, cat_features)
+encoded_preprocessor = build_preprocessor(
+    list(range(len(num_features))),
+    list(range(len(num_features), len(num_features) + len(cat_features))),
 )
 
 models = {
@@ -51,133 +123,323 @@ models = {
     "LDA": LinearDiscriminantAnalysis(solver="lsqr", shrinkage="auto")
 }
 
-#train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, stratify=y, random_state=42
-)
 
-#cross-validation
-results = {}
-cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+@contextmanager
+def stage(name):
+    """Affiche la durée (horloge murale) d'une étape."""
+    t0 = time.perf_counter()
+    yield
+    print(f"[temps] {name}: {time.perf_counter() - t0:.1f} s")
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus courant (Mo), None si non mesurable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # octets sur macOS, Ko ailleurs
+
 
-for name, model in models.items():
-    clf = ImbPipeline(steps=[
-        ("preprocessor", preprocessor),
+def make_pipeline(model, memory=None, preproc=preprocessor):
+    return ImbPipeline(steps=[
+        ("preprocessor", preproc),
         ("smote", SMOTE(random_state=42)),
         ("model", model)
-    ])
-    
-    scores = cross_val_score(clf, X_train, y_train, cv=cv, scoring="f1")
-    results[name] = {
-        "CV F1 mean": np.mean(scores),
-        "CV F1 std": np.std(scores)
+    ], memory=memory)
+
+
+def export_serving_model(pipeline, reference, map_min_nodes=MAP_MIN_NODES, decision=None):
+    """Écrit l'artefact d'inférence servi par l'API et ses fichiers annexes.
+
+    Annexes : lignes de référence, profil de dérive et, si fourni, ``decision``
+    (cf. ``backend.decision.fit_decision``; sinon celle d'un export précédent
+    est retirée). ``reference``: features
+    d'entraînement (DataFrame). Les workers chargent l'artefact en mmap: il est
+    remplacé (``os.replace``), jamais réécrit en place.
+    """
+    slim = serving_pipeline(pipeline, reference, map_min_nodes)
+    tmp = SERVING_MODEL_PATH + f".{os.getpid()}.tmp"
+    joblib.dump(slim, tmp)
+    os.replace(tmp, SERVING_MODEL_PATH)
+    write_parity_reference(SERVING_MODEL_PATH, slim, reference)
+    write_drift_profile(SERVING_MODEL_PATH, slim, reference, decision)
+    if decision is not None:
+        write_decision(SERVING_MODEL_PATH, decision)
+    else:
+        remove_decision(SERVING_MODEL_PATH)
+    print(f"Artefact d'inférence: {SERVING_MODEL_PATH} (étapes: {', '.join(slim.named_steps)}; "
+          f"estimateur: {slim.steps[-1][1]!r:.80})")
+
+
+def encode_features(df):
+    """Matrice float64 [numériques | codes des catégorielles] d'un DataFrame.
+
+    Codes dans l'ordre trié des modalités (valeur manquante en dernier), comme
+    les catégories apprises par le OneHotEncoder : même encodage one-hot que sur
+    les chaînes, donc mêmes modèles et mêmes scores.
+    """
+    X = np.empty((len(df), len(num_features) + len(cat_features)))
+    X[:, :len(num_features)] = df[num_features].to_numpy(dtype=float)
+    for j, col in enumerate(cat_features, start=len(num_features)):
+        values = df[col].astype(object).where(df[col].notna(), None)
+        cats = sorted({v for v in values if v is not None})
+        codes = pd.Categorical(values, categories=cats).codes.astype(float)
+        codes[codes < 0] = len(cats)
+        X[:, j] = codes
+    return X
+
+
+def to_memmap(array, path):
+    """Écrit ``array`` dans ``path`` (.npy) et le rouvre en lecture seule, projeté en mémoire."""
+    np.save(path, np.ascontiguousarray(array))
+    return np.load(path, mmap_mode="r")
+
+
+def split_positions(y):
+    """Positions (train, test) du découpage 80/20 stratifié (mêmes lignes: DataFrame et matrice encodée)."""
+    return train_test_split(np.arange(len(y)), test_size=0.2, stratify=y, random_state=42)
+
+
+def scores_from_proba(y_true, probs, threshold=0.5):
+    """Métriques de ``METRICS`` pour des probabilités (décision: probabilité > ``threshold``)."""
+    y_pred = (np.asarray(probs) > threshold).astype(int)
+    return {
+        "accuracy": float(accuracy_score(y_true, y_pred)),
+        "precision": float(precision_score(y_true, y_pred, zero_division=0)),
+        "recall": float(recall_score(y_true, y_pred)),
+        "f1": float(f1_score(y_true, y_pred)),
+        "roc_auc": float(roc_auc_score(y_true, probs)),
     }
 
-results_df = pd.DataFrame(results).T
-print("cross validation sur train:")
-print(results_df.sort_values("CV F1 mean", ascending=False))
 
+def decision_cost(y_true, probs, threshold, cost_ratio):
+    """Coût moyen par dossier des décisions: ``cost_ratio`` par faux accord, 1 par faux refus."""
+    y_true, approved = np.asarray(y_true), np.asarray(probs) > threshold
+    return float((cost_ratio * np.sum(approved & (y_true == 0)) + np.sum(~approved & (y_true == 1))) / len(y_true))
 
-best_model_name = results_df["CV F1 mean"].idxmax()
-print(f" Modèle sélectionné : {best_model_name}")
 
-best_model = ImbPipeline(steps=[
-    ("preprocessor", preprocessor),
-    ("smote", SMOTE(random_state=42)),
-    ("model", models[best_model_name])
-])
+def score_fold(name, fold, train_idx, test_idx, X, y, memory):
+    """Probabilités hors fold et métriques d'un modèle sur un fold (un fit, un predict_proba), pic RSS du worker."""
+    pipeline = make_pipeline(clone(models[name]), memory, encoded_preprocessor)
+    pipeline.fit(X[train_idx], y[train_idx])
+    probs = pipeline.predict_proba(X[test_idx])[:, 1]
+    return name, fold, scores_from_proba(y[test_idx], probs), probs, os.getpid(), peak_rss_mb()
 
 
-best_model.fit(X_train, y_train)
-y_pred = best_model.predict(X_test)
+def cross_validate_all(X, y, train_idx, cv, cache_dir):
+    """Scores par (modèle, métrique) -> tableau des scores de chaque fold.
 
-print("\n Évaluation sur TEST :")
-print("Accuracy :", accuracy_score(y_test, y_pred))
-print("F1 Score :", f1_score(y_test, y_pred))
-print("Recall   :", recall_score(y_test, y_pred))
-print("Precision:", precision_score(y_test, y_pred))
-print("ROC AUC  :", roc_auc_score(y_test, y_pred))
+    ``X``/``y`` : tableaux complets (memmaps partagés); ``train_idx`` : lignes
+    d'entraînement, découpées en folds par ``cv``. Renvoie aussi les
+    probabilités hors fold de chaque modèle (alignées sur ``train_idx``) et le
+    pic RSS (Mo) de chaque worker.
+    """
+    memory = Memory(os.path.join(cache_dir, "pipeline"), verbose=0)
+    y_train = np.asarray(y[train_idx])
+    splits = list(cv.split(np.zeros(len(train_idx)), y_train))
+    folds = [(train_idx[tr], train_idx[te]) for tr, te in splits]
+    # ordre modèle puis fold: le premier modèle remplit le cache de chaque fold en parallèle
+    tasks = [delayed(score_fold)(name, k, tr, te, X, y, memory)
+             for name in models for k, (tr, te) in enumerate(folds)]
+    scores = {name: {m: np.empty(len(folds)) for m in METRICS} for name in models}
+    oof = {name: np.empty(len(train_idx)) for name in models}
+    worker_rss = {}
+    for name, k, fold_scores, probs, pid, rss in Parallel(n_jobs=N_JOBS)(tasks):
+        for m, v in fold_scores.items():
+            scores[name][m][k] = v
+        oof[name][splits[k][1]] = probs
+        if rss is not None:
+            worker_rss[pid] = max(rss, worker_rss.get(pid, 0.0))
+    return scores, oof, worker_rss
 
 
-best_model.fit(X, y)
+def tune_decision(oof, y_train, cost_ratio, calibration):
+    """Couche de décision ajustée sur les probabilités hors fold, avec un résumé affiché.
 
-# Sauvegarde du modèle
-models_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "models"))
-os.makedirs(models_dir, exist_ok=True)
-joblib.dump(best_model, os.path.join(models_dir, "best_model.pkl"))
+    None si elle est inexploitable (cf. ``decision_issue``): probabilités brutes et seuil 0,5.
+    """
+    t0 = time.perf_counter()
+    decision = fit_decision(oof, y_train, cost_ratio, calibration)
+    elapsed = time.perf_counter() - t0
+    sweep = decision["sweep"]
+    policy = DecisionPolicy.from_dict(decision)
+    calibrated = policy.calibrate(oof)
+    print(f"\n Couche de décision ({len(oof)} probabilités hors fold, AUC {decision['oof_auc']:.4f}, "
+          f"{len(sweep['cost_ratios'])} ratios de coût balayés en {elapsed * 1000:.0f} ms):")
+    brier = decision["brier"]
+    print(f"Calibrage   : {policy.method} (Brier {brier['raw']:.4f} -> {brier['calibrated']:.4f})")
+    print(f"Ratio de coût {cost_ratio:g}: seuil {policy.threshold:.4f}, {decision['approval_rate']:.1%} d'accords "
+          f"(seuil théorique si bien calibré: {cost_ratio / (1 + cost_ratio):.4f})")
+    print(f"Coût moyen hors fold: seuil 0.5 brut {decision_cost(y_train, oof, 0.5, cost_ratio):.4f}, "
+          f"seuil ajusté {decision_cost(y_train, calibrated, policy.threshold, cost_ratio):.4f}")
+    issue = decision_issue(decision)
+    if issue is not None:
+        print(f"Couche de décision non exportée ({issue}): probabilités brutes et seuil 0.5")
+        return None
+    return decision
 
-#### Visualisations ####
 
-# Matrice de confusion
-cm = confusion_matrix(y_test, y_pred)
-plt.figure(figsize=(5,4))
-sns.heatmap(cm, annot=True, fmt="d", cmap="Blues", cbar=False)
-plt.xlabel("Prédit")
-plt.ylabel("Réel")
-plt.title("Matrice de confusion sur TEST")
-plt.show()
+def main(cost_ratio=COST_RATIO, calibration="sigmoid", map_min_nodes=MAP_MIN_NODES):
+    print("Current working directory:", os.getcwd())
+    print("Loan CSV path:", LOAN_CSV_PATH)
+    loan_df = pd.read_csv(LOAN_CSV_PATH)
 
-# Comparaison des modèles selon plusieurs métriques 
-metrics = ["accuracy", "precision", "recall", "f1", "roc_auc"]
-metrics_results = {}
+    X = loan_df.drop("Loan_Status", axis=1)
+    y = loan_df["Loan_Status"]
 
-for name, model in models.items():
-    clf = ImbPipeline(steps=[
-        ("preprocessor", preprocessor),
-        ("smote", SMOTE(random_state=42)),
-        ("model", model)
-    ])
-    scores = {}
-    for metric in metrics:
-        if metric == "roc_auc":
-            try:
-                score = cross_val_score(clf, X_train, y_train, cv=cv, scoring=metric)
-            except ValueError:
-                score = np.array([np.nan]*cv.get_n_splits())
-        else:
-            score = cross_val_score(clf, X_train, y_train, cv=cv, scoring=metric)
-        scores[metric] = np.mean(score)
-    metrics_results[name] = scores
-metrics_df = pd.DataFrame(metrics_results).T
-
-# Comparaison des modèles selon plusieurs métriques (graphique)
-metrics_df_plot = metrics_df.sort_values("f1", ascending=False)
-ax = metrics_df_plot.plot(kind="bar", figsize=(10,6))
-plt.ylabel("Score (CV moyenne)")
-plt.xlabel("Modèle")
-plt.title("Comparaison des modèles selon plusieurs métriques (cross-validation)")
-plt.ylim(0, 1)
-plt.legend(title="Métrique")
-plt.tight_layout()
-plt.show()
-
-
-# Affichage d'un graphique en barre pour comparer les modèles selon le F1 score 
-f1_scores = results_df["CV F1 mean"].sort_values(ascending=False)
-
-plt.figure(figsize=(8, 5))
-ax = f1_scores.plot(kind="bar", color="cornflowerblue")
-plt.ylabel("F1 Score (CV moyenne)")
-plt.xlabel("Modèle")
-plt.title("Comparaison des modèles selon le F1 score (cross-validation)")
-plt.ylim(0, 1)
-plt.tight_layout()
-for i, v in enumerate(f1_scores):
-    ax.text(i, v + 0.01, f"{v:.2f}", ha="center", va="bottom", fontsize=10)
-
-plt.show()
-
-# Sélection des modèles proches en F1-score et ROC-AUC
-candidats = metrics_df[["f1", "roc_auc"]].copy()
-candidats.columns = ["F1", "ROC-AUC"]
-
-plt.figure(figsize=(8, 4))
-plt.scatter(candidats["F1"], candidats["ROC-AUC"], color="orange", s=100)
-for idx in candidats.index:
-    plt.text(candidats.loc[idx, "F1"], candidats.loc[idx, "ROC-AUC"], idx, fontsize=12)
-plt.xlabel("F1-score")
-plt.ylabel("ROC-AUC")
-plt.title("Sélection des modèles proches en F1-score et ROC-AUC")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+    #train-test split (sur les positions: les mêmes lignes servent au DataFrame et à la matrice encodée)
+    train_idx, test_idx = split_positions(y)
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+
+    #cross-validation (toutes les métriques en une passe, données partagées par memmap)
+    cv = CV
+    cache_dir = CACHE_DIR or tempfile.mkdtemp(prefix="loan-cv-")
+    try:
+        with stage("encodage des features"):
+            data_dir = os.path.join(cache_dir, "dataset")
+            os.makedirs(data_dir, exist_ok=True)
+            X_enc = to_memmap(encode_features(X), os.path.join(data_dir, "X.npy"))
+            y_enc = to_memmap(y.to_numpy(), os.path.join(data_dir, "y.npy"))
+            print(f"matrice partagée: {X_enc.shape[0]} x {X_enc.shape[1]}, {X_enc.nbytes / 2**20:.1f} Mo")
+        with stage(f"validation croisée ({len(models)} modèles x {cv.get_n_splits()} folds, n_jobs={N_JOBS})"):
+            cv_scores, oof, worker_rss = cross_validate_all(X_enc, y_enc, train_idx, cv, cache_dir)
+        del X_enc, y_enc
+    finally:
+        if CACHE_DIR is None:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    main_rss = peak_rss_mb()
+    if main_rss is not None:
+        print(f"[mémoire] pic RSS: principal {main_rss:.0f} Mo, "
+              f"workers max {max(worker_rss.values(), default=0):.0f} Mo "
+              f"({len(worker_rss)} workers, total {main_rss + sum(worker_rss.values()):.0f} Mo)")
+
+    results = {name: {"CV F1 mean": np.mean(s["f1"]), "CV F1 std": np.std(s["f1"])}
+               for name, s in cv_scores.items()}
+    results_df = pd.DataFrame(results).T
+    print("cross validation sur train:")
+    print(results_df.sort_values("CV F1 mean", ascending=False))
+
+    metrics_df = pd.DataFrame({name: {m: np.mean(s[m]) for m in METRICS} for name, s in cv_scores.items()}).T
+
+    best_model_name = results_df["CV F1 mean"].idxmax()
+    print(f" Modèle sélectionné : {best_model_name}")
+
+    best_model = make_pipeline(models[best_model_name])
+    decision = tune_decision(oof[best_model_name], y_train.to_numpy(), cost_ratio, calibration)
+    policy = DecisionPolicy.from_dict(decision)
+
+    with stage("évaluation sur test"):
+        best_model.fit(X_train, y_train)
+        raw_test = best_model.predict_proba(X_test)[:, 1]
+    prob_test = policy.calibrate(raw_test)
+    y_pred = (prob_test > policy.threshold).astype(int)
+
+    test_scores = scores_from_proba(y_test, prob_test, policy.threshold)
+    test_scores["cost"] = decision_cost(y_test, prob_test, policy.threshold, cost_ratio)
+    default_scores = scores_from_proba(y_test, raw_test)
+    default_scores["cost"] = decision_cost(y_test, raw_test, 0.5, cost_ratio)
+    print("\n Évaluation sur TEST (seuil 0.5 brut -> couche de décision) :")
+    for key, label in [("accuracy", "Accuracy "), ("f1", "F1 Score "), ("recall", "Recall   "),
+                       ("precision", "Precision"), ("roc_auc", "ROC AUC  "), ("cost", "Coût     ")]:
+        print(f"{label}: {default_scores[key]:.4f} -> {test_scores[key]:.4f}")
+
+    with stage("entraînement final et publication"):
+        best_model.fit(X, y)
+
+        # Sauvegarde du modèle (pipeline d'entraînement) et de l'artefact servi
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        joblib.dump(best_model, BEST_MODEL_PATH)
+        export_serving_model(best_model, X, map_min_nodes, decision)
+
+        # Publication dans le registre versionné: l'API bascule dessus sans redémarrage
+        version = publish_model(os.path.join(MODELS_DIR, "registry"), best_model, {
+            "model": best_model_name,
+            "cv_f1_mean": float(results_df.loc[best_model_name, "CV F1 mean"]),
+            "cv_f1_std": float(results_df.loc[best_model_name, "CV F1 std"]),
+            "cv_scores": {name: float(v) for name, v in results_df["CV F1 mean"].items()},
+            "test_scores": {k: float(v) for k, v in test_scores.items()},
+            "test_scores_threshold_0_5": {k: float(v) for k, v in default_scores.items()},
+            "decision": {**policy.info(), "brier": decision["brier"]} if decision else None,
+            "n_train_rows": int(len(X)),
+            "peak_rss_mb": {"main": main_rss, "workers_max": max(worker_rss.values(), default=None)},
+        }, reference=X, decision=decision, map_min_nodes=map_min_nodes)
+        print("Version publiée dans le registre :", version)
+
+    #### Visualisations ####
+
+    # Matrice de confusion
+    cm = confusion_matrix(y_test, y_pred)
+    plt.figure(figsize=(5,4))
+    sns.heatmap(cm, annot=True, fmt="d", cmap="Blues", cbar=False)
+    plt.xlabel("Prédit")
+    plt.ylabel("Réel")
+    plt.title("Matrice de confusion sur TEST")
+    plt.show()
+
+    # Comparaison des modèles selon plusieurs métriques (graphique, scores de la validation croisée)
+    metrics_df_plot = metrics_df.sort_values("f1", ascending=False)
+    ax = metrics_df_plot.plot(kind="bar", figsize=(10,6))
+    plt.ylabel("Score (CV moyenne)")
+    plt.xlabel("Modèle")
+    plt.title("Comparaison des modèles selon plusieurs métriques (cross-validation)")
+    plt.ylim(0, 1)
+    plt.legend(title="Métrique")
+    plt.tight_layout()
+    plt.show()
+
+
+    # Affichage d'un graphique en barre pour comparer les modèles selon le F1 score
+    f1_scores = results_df["CV F1 mean"].sort_values(ascending=False)
+
+    plt.figure(figsize=(8, 5))
+    ax = f1_scores.plot(kind="bar", color="cornflowerblue")
+    plt.ylabel("F1 Score (CV moyenne)")
+    plt.xlabel("Modèle")
+    plt.title("Comparaison des modèles selon le F1 score (cross-validation)")
+    plt.ylim(0, 1)
+    plt.tight_layout()
+    for i, v in enumerate(f1_scores):
+        ax.text(i, v + 0.01, f"{v:.2f}", ha="center", va="bottom", fontsize=10)
+
+    plt.show()
+
+    # Sélection des modèles proches en F1-score et ROC-AUC
+    candidats = metrics_df[["f1", "roc_auc"]].copy()
+    candidats.columns = ["F1", "ROC-AUC"]
+
+    plt.figure(figsize=(8, 4))
+    plt.scatter(candidats["F1"], candidats["ROC-AUC"], color="orange", s=100)
+    for idx in candidats.index:
+        plt.text(candidats.loc[idx, "F1"], candidats.loc[idx, "ROC-AUC"], idx, fontsize=12)
+    plt.xlabel("F1-score")
+    plt.ylabel("ROC-AUC")
+    plt.title("Sélection des modèles proches en F1-score et ROC-AUC")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--export", action="store_true",
+                        help="réexporter serving_model.pkl depuis best_model.pkl, sans réentraîner")
+    parser.add_argument("--map-min-nodes", type=int, default=MAP_MIN_NODES,
+                        help="noeuds à partir desquels les arbres sont exportés en MappedTrees (mmap)")
+    parser.add_argument("--cost-ratio", type=float, default=COST_RATIO,
+                        help="coût d'un prêt accordé à tort rapporté à celui d'un bon dossier refusé")
+    parser.add_argument("--calibration", choices=CALIBRATIONS, default="sigmoid", help="calibrateur des probabilités")
+    args = parser.parse_args()
+    if args.export:
+        loan_df = pd.read_csv(LOAN_CSV_PATH)
+        X, y = loan_df.drop("Loan_Status", axis=1), loan_df["Loan_Status"]
+        best_model = joblib.load(BEST_MODEL_PATH)
+        # probabilités hors fold recalculées (mêmes folds que l'entraînement): 5 fits, pas de réentraînement
+        train_idx, _ = split_positions(y)
+        with stage("probabilités hors fold"):
+            oof = cross_val_predict(clone(best_model), X.iloc[train_idx], y.iloc[train_idx], cv=CV,
+                                    method="predict_proba", n_jobs=N_JOBS)[:, 1]
+        decision = tune_decision(oof, y.iloc[train_idx].to_numpy(), args.cost_ratio, args.calibration)
+        export_serving_model(best_model, X, args.map_min_nodes, decision)
+    else:
+        main(args.cost_ratio, args.calibration, args.map_min_nodes)
@@ -1,13 +1,17 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 import joblib
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.rates import RateProvider
+
 # Charger pipeline complet
 model = joblib.load("models/best_model.pkl")
 
-# Charger les taux
-df_rates = pd.read_csv("data/interest_rates.csv")
-taux_2025 = df_rates.loc[df_rates["year"] == 2025, "obs_value"].values[0]
+# Charger les taux (même source que l'API)
+rates = RateProvider("data/interest_rates.csv")
 
 # Exemple d'un nouveau client 
 new_client = {
@@ -26,8 +30,8 @@ new_client = {
 # Ajouter LoanAmount_log
 new_client["LoanAmount_log"] = np.log(new_client["LoanAmount"]) if new_client["LoanAmount"] > 0 else 0
 
-# Ajouter InterestRate = valeur 2025
-new_client["InterestRate"] = taux_2025
+# Ajouter InterestRate = taux de l'année en cours
+new_client["InterestRate"] = rates.current()
 
 # Convertir en DataFrame
 X_new = pd.DataFrame([new_client])
@@ -1,12 +1,17 @@
+import os
+import sys
 import joblib
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.rates import RateProvider
+
 # Charger modèle, encoder, scaler
 model = joblib.load("models/best_model.pkl")
 
-# Taux d’intérêt par défaut (2025)
-DEFAULT_INTEREST_RATE = 3.5
+# Taux d’intérêt de l'année en cours (même source que l'API)
+rates = RateProvider("data/interest_rates.csv")
 
 # Profils de test
 test_clients = [
@@ -61,11 +66,11 @@ test_clients = [
 ]
 
 def preprocess_client(client):
-    """Prépare un client pour la prédiction (ajout log + taux d'intérêt 2025)."""
+    """Prépare un client pour la prédiction (ajout log + taux d'intérêt de l'année en cours)."""
     df = pd.DataFrame([client])
     
-    # Ajouter InterestRate fixe 2025
-    df["InterestRate"] = DEFAULT_INTEREST_RATE
+    # Ajouter InterestRate de l'année en cours
+    df["InterestRate"] = rates.current()
     
     # Transformer LoanAmount en LoanAmount_log
     df["LoanAmount_log"] = df["LoanAmount"].apply(lambda x: np.log(x) if x > 0 else 0)
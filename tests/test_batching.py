@@ -0,0 +1,42 @@
+import threading
+
+import numpy as np
+
+from backend.batching import MicroBatcher
+
+
+def test_cancelled_request_does_not_stop_dispatcher():
+    gate = threading.Event()
+    seen = []
+
+    def score(rows):
+        gate.wait(5)
+        seen.append(list(rows))
+        return np.asarray(rows, dtype=float)
+
+    batcher = MicroBatcher(score, max_batch=1).start()
+    try:
+        first = batcher.submit(1)  # lot d'une ligne, bloqué dans le score
+        dropped = batcher.submit(2)  # encore en file: l'appelant abandonne
+        assert dropped.cancel()
+        gate.set()
+        assert first.result(5) == 1.0
+        assert batcher.score(3, timeout=5) == 3.0
+        assert batcher.alive
+        assert all(2 not in rows for rows in seen)
+    finally:
+        batcher.stop()
+
+
+def test_scoring_error_reaches_every_caller():
+    def score(rows):
+        raise RuntimeError("modèle indisponible")
+
+    batcher = MicroBatcher(score, max_batch=4, max_wait_ms=20).start()
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        for fut in futures:
+            assert isinstance(fut.exception(5), RuntimeError)
+        assert batcher.alive
+    finally:
+        batcher.stop()
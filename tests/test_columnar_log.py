@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest.importorskip("pyarrow")
+
+from backend import main  # noqa: E402
+from backend.columnar_log import ColumnarLog  # noqa: E402
+
+ROW = {"Gender": "Male", "Property_Area": "Urban", "prediction": 1, "probability": 0.8,
+       "timestamp": datetime(2026, 1, 1, 23, 30, tzinfo=timezone.utc)}
+PLUS_TWO = timezone(timedelta(hours=2))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ColumnarLog(tmp_path, main.PRED_LOG_TYPES)
+    store.append([ROW])
+    return store
+
+
+def test_query_normalises_aware_bounds_to_utc(store):
+    start = datetime(2026, 1, 2, 1, 0, tzinfo=PLUS_TWO)  # 2026-01-01T23:00Z, jour local suivant
+    assert len(store.query(start)) == 1
+    assert len(store.query(start.astimezone(timezone.utc))) == 1
+    assert len(store.query(None, start)) == 0
+
+
+def test_append_partitions_by_utc_day(tmp_path):
+    store = ColumnarLog(tmp_path, main.PRED_LOG_TYPES)
+    store.append([{**ROW, "timestamp": datetime(2026, 1, 2, 0, 30, tzinfo=PLUS_TWO)}])
+    assert [p.name for p in store.partitions()] == ["date=2026-01-01"]
+
+
+def test_stats_window_with_offset(store, monkeypatch):
+    monkeypatch.setattr(main, "pred_store", store)
+    client = TestClient(main.app)
+    response = client.get("/stats", params={"from": "2026-01-02T01:00:00+02:00"})
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert client.get("/stats", params={"from": "2026-01-02T02:00:00+02:00"}).json()["total"] == 0
@@ -0,0 +1,75 @@
+import logging
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+
+from backend.decision import DecisionPolicy, decision_issue, fit_decision, sweep_costs
+from backend.model_registry import ModelRegistry
+
+
+def brute_force_cost(probs, y, ratio):
+    """Coût minimal sur tous les seuils candidats, recalculé naïvement."""
+    candidates = np.r_[0.0, np.unique(probs), 1.0]
+    return min(ratio * np.sum((probs > t) & (y == 0)) + np.sum((probs <= t) & (y == 1)) for t in candidates)
+
+
+@pytest.fixture
+def scores():
+    rng = np.random.default_rng(1)
+    y = rng.integers(0, 2, 400)
+    probs = np.round(np.clip(0.35 * y + 0.65 * rng.random(400), 0, 1), 2)  # scores ex aequo
+    return probs, y
+
+
+def test_sweep_thresholds_minimise_cost(scores):
+    probs, y = scores
+    ratios = np.array([0.05, 0.5, 1.0, 2.0, 20.0])
+    table = sweep_costs(probs, y, ratios)
+    for i, ratio in enumerate(ratios):
+        t = table["thresholds"][i]
+        approved = probs > t
+        cost = ratio * np.sum(approved & (y == 0)) + np.sum(~approved & (y == 1))
+        assert cost == pytest.approx(brute_force_cost(probs, y, ratio))
+        assert table["expected_cost"][i] == pytest.approx(cost / len(y))
+        assert table["approval_rate"][i] == pytest.approx(approved.mean())
+    # un faux accord plus coûteux ne peut pas abaisser le seuil
+    assert np.all(np.diff(table["thresholds"]) >= 0)
+
+
+def test_fit_decision_threshold_matches_served_policy(scores):
+    probs, y = scores
+    decision = fit_decision(probs, y, cost_ratio=1.0)
+    assert decision_issue(decision) is None
+    policy = DecisionPolicy.from_dict(decision)
+    calibrated = policy.calibrate(probs)
+    assert np.mean(calibrated > policy.threshold) == pytest.approx(decision["approval_rate"])
+    assert DecisionPolicy.from_dict(decision, cost_ratio=20.0).threshold >= policy.threshold
+
+
+def test_uninformative_scores_are_not_served():
+    rng = np.random.default_rng(2)
+    y = rng.integers(0, 2, 400)
+    decision = fit_decision(rng.random(400), y, cost_ratio=1.0)
+    assert "AUC" in decision_issue(decision)
+
+
+def test_rubber_stamp_threshold_is_not_served():
+    rng = np.random.default_rng(3)
+    probs = rng.integers(0, 10, 2000) / 10
+    y = (rng.random(2000) < 0.3 + 0.5 * probs).astype(int)  # chaque score distinct compte des bons dossiers
+    decision = fit_decision(probs, y, cost_ratio=0.01)  # faux accords quasi gratuits: tout est accordé
+    assert decision["oof_auc"] >= 0.55
+    assert decision["approval_rate"] == 1.0
+    assert "accorde" in decision_issue(decision)
+
+
+def test_cost_ratio_without_decision_layer_is_reported(tmp_path, caplog):
+    path = tmp_path / "model.pkl"
+    joblib.dump(LogisticRegression().fit([[0.0], [1.0]], [0, 1]), path)  # pas de .decision.json
+    registry = ModelRegistry(tmp_path, path, lambda pipeline, p: None, lambda loaded: None, cost_ratio=2.0)
+    with caplog.at_level(logging.WARNING, logger="backend.model_registry"):
+        loaded = registry.load(None)
+    assert "DECISION_COST_RATIO=2 ignoré" in caplog.text
+    assert loaded.decision.threshold == 0.5
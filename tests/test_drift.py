@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.drift import DriftMonitor, build_profile, psi
+
+
+@pytest.fixture
+def reference():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        "Income": rng.lognormal(8, 0.5, n),
+        "Area": rng.choice(["Rural", "Semiurban", "Urban"], n),
+    })
+    probs = rng.random(n)
+    return df, probs
+
+
+def test_row_and_frame_paths_count_the_same_cells(reference):
+    df, probs = reference
+    profile = build_profile(df, probs)
+    sample = pd.concat([df.head(50), pd.DataFrame({"Income": [np.nan], "Area": ["Inconnue"]})], ignore_index=True)
+    sample_probs = np.r_[probs[:50], 0.5]
+
+    by_rows, by_frame = DriftMonitor(min_rows=1), DriftMonitor(min_rows=1)
+    by_rows.observe(sample.to_dict(orient="records"), list(sample_probs), profile, now=0)
+    by_frame.observe(sample, sample_probs, profile, now=0)
+    np.testing.assert_array_equal(by_rows.window_counts(now=0)[2], by_frame.window_counts(now=0)[2])
+
+    detail = by_frame.report(detail=True, now=0)
+    assert detail["rows"] == 51
+    assert detail["features"]["Income"]["live"][-1] == pytest.approx(1 / 51)  # classe hors référence
+    assert detail["features"]["Area"]["live"][-1] == pytest.approx(1 / 51)
+
+
+def test_reference_traffic_is_stable_and_shift_is_detected(reference):
+    df, probs = reference
+    profile = build_profile(df, probs)
+
+    monitor = DriftMonitor(min_rows=100)
+    monitor.observe(df, probs, profile, now=0)
+    report = monitor.report(now=0)
+    assert report["status"] == "stable"
+    assert report["max_psi"] == pytest.approx(0, abs=1e-9)
+
+    shifted = DriftMonitor(min_rows=100)
+    shifted.observe(df.assign(Income=df["Income"] * 2), probs, profile, now=0)
+    report = shifted.report(now=0)
+    assert report["features"]["Income"]["status"] == "drift"
+    assert report["features"]["Area"]["status"] == "stable"
+
+
+def test_counts_leave_the_window(reference):
+    df, probs = reference
+    profile = build_profile(df, probs)
+    monitor = DriftMonitor(window_seconds=60, buckets=6, min_rows=1)
+    monitor.observe(df.head(10), probs[:10], profile, now=0)
+    monitor.observe(df.head(5), probs[:5], profile, now=30)
+    assert monitor.report(now=55)["rows"] == 15
+    assert monitor.report(now=65)["rows"] == 5  # la tranche de t=0 est sortie de la fenêtre
+    assert monitor.report(now=100)["rows"] == 0
+
+
+def test_psi_is_zero_for_identical_shares():
+    shares = np.array([0.2, 0.3, 0.5])
+    assert psi(shares, shares) == 0
+    assert psi(shares, np.array([0.5, 0.3, 0.2])) > 0.25
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.special import expit
+
+from backend.decision import DecisionPolicy
+from backend.explain import Explainer
+from backend.model_registry import load_artifact
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return load_artifact(ROOT / "models" / "serving_model.pkl")
+
+
+@pytest.fixture(scope="module")
+def data():
+    return pd.read_csv(ROOT / "data" / "loan_clean.csv")
+
+
+@pytest.mark.parametrize("calibration", [None, {"method": "sigmoid", "a": 0.6, "b": -0.3}])
+def test_contributions_add_up_to_served_probability(pipeline, data, calibration):
+    policy = DecisionPolicy(calibration=calibration)
+    explainer = Explainer(pipeline, policy)
+    assert explainer.output == "log_odds"
+    base, contrib = explainer.explain_frame(data)
+    served = policy.calibrate(pipeline.predict_proba(data)[:, 1])
+    np.testing.assert_allclose(expit(base + contrib.sum(axis=1)), served, atol=1e-5)
+
+
+def test_non_affine_calibration_is_labelled(pipeline, data):
+    policy = DecisionPolicy(calibration={"method": "isotonic", "x": [0.0, 1.0], "y": [0.1, 0.9]})
+    explainer = Explainer(pipeline, policy)
+    assert explainer.output == "uncalibrated_log_odds"
+    base, contrib = explainer.explain_frame(data)
+    np.testing.assert_allclose(expit(base + contrib.sum(axis=1)), pipeline.predict_proba(data)[:, 1], atol=1e-5)
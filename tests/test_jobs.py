@@ -0,0 +1,46 @@
+import io
+
+import pandas as pd
+import pytest
+
+from backend.jobs import JobQueue, JobStore
+
+
+class Model:
+    version = "v1"
+
+
+def read_chunks(fileobj, chunk_rows):
+    return pd.read_csv(fileobj, chunksize=chunk_rows)
+
+
+def make_queue(store, chunk_rows, stop_after=None):
+    def score_chunk(chunk, row_offset, model):
+        scored = chunk.assign(score=chunk["x"] * 2)
+        if stop_after is not None and row_offset + len(chunk) >= stop_after:
+            queue._stop.set()  # arrêt du serveur après ce chunk
+        return scored
+
+    queue = JobQueue(store, read_chunks, score_chunk, lambda version: Model(), chunk_rows=chunk_rows)
+    return queue
+
+
+@pytest.mark.parametrize("legacy_state", [False, True])
+def test_resume_with_other_chunk_size_scores_each_row_once(tmp_path, legacy_state):
+    store = JobStore(tmp_path)
+    data = pd.DataFrame({"x": range(10)})
+    job = store.create(io.BytesIO(data.to_csv(index=False).encode()), "input.csv")
+
+    assert make_queue(store, chunk_rows=3, stop_after=3)._run_once()
+    state = store.read(job["id"])
+    assert (state["status"], state["rows_done"]) == ("running", 3)
+    if legacy_state:
+        del state["chunk_rows"]  # job démarré avant que la taille de chunk soit enregistrée
+        store.write(state)
+
+    assert make_queue(store, chunk_rows=4)._run_once()
+    state = store.read(job["id"])
+    assert (state["status"], state["rows_done"]) == ("done", 10)
+    result = pd.read_csv(store.result_path(job["id"]))
+    assert result["x"].tolist() == list(range(10))
+    assert result["score"].tolist() == [2 * x for x in range(10)]
@@ -0,0 +1,43 @@
+import csv
+import logging
+
+from backend.log_sink import append_csv, migrate_csv_header
+
+COLUMNS = ["Gender", "prediction", "probability", "model_version"]
+ROW = {"Gender": "Male", "prediction": 1, "probability": 0.75, "model_version": "v2"}
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_header_written_once_and_offsets_cover_block(tmp_path):
+    path = tmp_path / "log.csv"
+    start, end = append_csv(path, [ROW], COLUMNS)
+    assert start == 0
+    start2, end2 = append_csv(path, [ROW, {**ROW, "extra": "ignorée"}], COLUMNS)
+    assert start2 == end and end2 == path.stat().st_size
+    text = path.read_text(encoding="utf-8")
+    assert text.count("model_version") == 1
+    assert len(read_rows(path)) == 3
+
+
+def test_existing_header_wins_and_missing_columns_are_reported(tmp_path, caplog):
+    path = tmp_path / "log.csv"
+    path.write_text("Gender,prediction,probability\nFemale,0,0.25\n", encoding="utf-8")
+    with caplog.at_level(logging.WARNING, logger="backend.log_sink"):
+        append_csv(path, [ROW], COLUMNS)
+    assert "model_version" in caplog.text
+    assert read_rows(path)[-1] == {"Gender": "Male", "prediction": "1", "probability": "0.75"}
+
+
+def test_migrate_header_keeps_rows_and_adds_columns(tmp_path):
+    path = tmp_path / "log.csv"
+    path.write_text("Gender,prediction,probability\nFemale,0,0.25\n", encoding="utf-8")
+    assert migrate_csv_header(path, COLUMNS)
+    assert not migrate_csv_header(path, COLUMNS)
+    append_csv(path, [ROW], COLUMNS)
+    rows = read_rows(path)
+    assert rows[0] == {"Gender": "Female", "prediction": "0", "probability": "0.25", "model_version": ""}
+    assert rows[1]["model_version"] == "v2"
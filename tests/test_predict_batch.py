@@ -0,0 +1,19 @@
+from fastapi.testclient import TestClient
+
+from backend import main
+
+CLIENT = {"Gender": "Male", "Married": "Yes", "Dependents": "0", "Education": "Graduate",
+          "Self_Employed": "No", "Property_Area": "Urban", "ApplicantIncome": 5000,
+          "CoapplicantIncome": 1500, "LoanAmount": 120}
+
+
+def predict_batch(clients):
+    response = TestClient(main.app).post("/predict-batch-json", json=clients)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_application_date_is_always_emitted():
+    dated = {**CLIENT, "ApplicationDate": "2024-03-01"}
+    assert [r["ApplicationDate"] for r in predict_batch([dated, CLIENT])] == ["2024-03-01", None]
+    assert [r["ApplicationDate"] for r in predict_batch([CLIENT, CLIENT])] == [None, None]
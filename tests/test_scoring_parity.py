@@ -0,0 +1,53 @@
+"""Parité des moteurs de scoring avec le pipeline sklearn servi."""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+
+from backend.cell_table import CellTableScorer
+from backend.fast_scoring import FastScorer, parity_gap, reference_gap
+from backend.mapped_trees import map_estimator, mapping_gap
+from backend.model_registry import MAP_TOLERANCE, load_artifact, read_parity_reference
+
+ROOT = Path(__file__).resolve().parents[1]
+MODEL_PATH = ROOT / "models" / "serving_model.pkl"
+TRAIN_DATA_PATH = ROOT / "data" / "loan_clean.csv"
+TOLERANCE = 1e-9
+# parcours NumPy en float64 des arbres XGBoost (float32 en natif): cf. PARITY_TOLERANCE de main
+TREE_TOLERANCE = 1e-6
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return load_artifact(MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def data():
+    return pd.read_csv(TRAIN_DATA_PATH)
+
+
+@pytest.mark.parametrize("scorer_cls, tolerance", [(FastScorer, TOLERANCE), (CellTableScorer, TREE_TOLERANCE)])
+def test_scorer_matches_pipeline(scorer_cls, tolerance, pipeline, data):
+    scorer = scorer_cls(pipeline)
+    np.testing.assert_array_equal(scorer.labels_from_proba(scorer.predict_proba_frame(data)), pipeline.predict(data))
+    assert parity_gap(scorer, pipeline, data) < tolerance
+
+
+def test_scorer_matches_exported_reference(pipeline):
+    fixture = read_parity_reference(MODEL_PATH)
+    assert fixture is not None
+    assert reference_gap(FastScorer(pipeline), *fixture) < TOLERANCE
+
+
+def test_mapped_trees_match_native_estimator(pipeline, data):
+    *preprocess, (name, est) = pipeline.steps
+    mapped = map_estimator(est)
+    X = Pipeline(preprocess).transform(data)
+    assert mapping_gap(est, mapped, X) < MAP_TOLERANCE
+    mapped_pipeline = Pipeline([*preprocess, (name, mapped)])
+    np.testing.assert_array_equal(mapped_pipeline.predict(data), pipeline.predict(data))
+    assert parity_gap(FastScorer(mapped_pipeline), mapped_pipeline, data) < TREE_TOLERANCE
+    assert parity_gap(CellTableScorer(mapped_pipeline), mapped_pipeline, data) < TREE_TOLERANCE